@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+# app/analytics.py
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import and_, case, func, insert, select, union_all
+from sqlalchemy.orm import Session
+
+from app.archive_model import OrderArchive, PositionArchive
+from app.model import Position
+from app.order_model import Order
+from app.pnl import IST, _avg, _to_ist
+from app.summary_model import DailySummary
+from app.symbols import parse_option, underlying_of
+
+UTC = ZoneInfo("UTC")
+
+# Positions closed within this long before the last refresh are re-checked,
+# covering commits that landed after their closed_at timestamp.
+REFRESH_MARGIN = timedelta(minutes=10)
+
+
+# ---------- helpers ----------
+def _utc_bounds(start: date, end: date) -> Tuple[datetime, datetime]:
+    """[start, end] IST days -> naive UTC [lo, hi) as stored in the DB."""
+    lo = datetime.combine(start, time.min, IST).astimezone(UTC).replace(tzinfo=None)
+    hi = datetime.combine(end + timedelta(days=1), time.min, IST).astimezone(UTC).replace(tzinfo=None)
+    return lo, hi
+
+
+def _runs(days: Iterable[date]) -> List[Tuple[date, date]]:
+    """Collapses a set of days into contiguous [start, end] runs."""
+    out: List[Tuple[date, date]] = []
+    for d in sorted(set(days)):
+        if out and d - out[-1][1] == timedelta(days=1):
+            out[-1] = (out[-1][0], d)
+        else:
+            out.append((d, d))
+    return out
+
+
+def _default_range(start: Optional[date], end: Optional[date]) -> Tuple[date, date]:
+    end = end or datetime.now(IST).date()
+    return start or end - timedelta(days=365), end
+
+
+# ---------- materialization ----------
+def _closed_select(P, O, lo: datetime, hi: datetime):
+    live = ~func.upper(func.coalesce(O.status, "")).in_(["CANCELLED", "REJECTED"])
+    is_buy = and_(func.upper(O.side) == "BUY", live)
+    is_sell = and_(func.upper(O.side) == "SELL", live)
+    return (
+        select(
+            P.id,
+            P.symbol,
+            P.closed_at,
+            func.sum(case((is_buy, O.qty), else_=0)).label("buy_qty"),
+            func.sum(case((is_buy, O.qty * O.price), else_=0.0)).label("buy_amt"),
+            func.sum(case((is_sell, O.qty), else_=0)).label("sell_qty"),
+            func.sum(case((is_sell, O.qty * O.price), else_=0.0)).label("sell_amt"),
+        )
+        .join(O, O.position_id == P.id)
+        .where(P.status == "CLOSED", P.closed_at >= lo, P.closed_at < hi)
+        .group_by(P.id, P.symbol, P.closed_at)
+    )
+
+
+def _closed_positions(db: Session, lo: datetime, hi: datetime):
+    """Closed positions in [lo, hi) (naive UTC), hot and archived, with buy/sell totals aggregated in SQL."""
+    return db.execute(union_all(
+        _closed_select(Position, Order, lo, hi),
+        _closed_select(PositionArchive, OrderArchive, lo, hi),
+    )).all()
+
+
+def _realised(row) -> float:
+    # Same average-price convention as app/pnl.py
+    buy_qty, sell_qty = int(row.buy_qty or 0), int(row.sell_qty or 0)
+    return min(buy_qty, sell_qty) * (_avg(row.sell_amt or 0.0, sell_qty) - _avg(row.buy_amt or 0.0, buy_qty))
+
+
+def realised_on(db: Session, day: date) -> float:
+    """Realised P&L of positions closed on an IST day, straight from the order rows."""
+    return sum(_realised(r) for r in _closed_positions(db, *_utc_bounds(day, day)))
+
+
+def refresh_range(db: Session, start: date, end: date) -> int:
+    """
+    Rebuilds daily_summary rows for IST days [start, end] from closed positions.
+    Caller commits.
+    """
+    rows = _closed_positions(db, *_utc_bounds(start, end))
+
+    groups: Dict[Tuple[date, str, Optional[date]], Dict[str, Any]] = {}
+    for r in rows:
+        realised = _realised(r)
+        opt = parse_option(r.symbol)
+        key = (_to_ist(r.closed_at).date(), underlying_of(r.symbol), opt.expiry if opt else None)
+        g = groups.setdefault(key, dict(positions=0, wins=0, losses=0, realised=0.0,
+                                        gross_profit=0.0, gross_loss=0.0, premium_sold=0.0))
+        g["positions"] += 1
+        g["realised"] += realised
+        g["premium_sold"] += float(r.sell_amt or 0.0)
+        if realised > 0:
+            g["wins"] += 1
+            g["gross_profit"] += realised
+        elif realised < 0:
+            g["losses"] += 1
+            g["gross_loss"] += realised
+
+    db.query(DailySummary).filter(DailySummary.day >= start, DailySummary.day <= end).delete(synchronize_session=False)
+    now = datetime.utcnow()
+    if groups:
+        db.execute(insert(DailySummary), [
+            dict(day=d, underlying=u, expiry=e, refreshed_at=now, **g) for (d, u, e), g in groups.items()
+        ])
+    return len(groups)
+
+
+def refresh_incremental(db: Session) -> List[str]:
+    """
+    Refreshes only the days touched since the last refresh (a full rebuild the
+    first time). Returns the refreshed day ranges. Caller commits.
+    """
+    watermark = db.query(func.max(DailySummary.refreshed_at)).scalar()
+    q = db.query(Position.closed_at).filter(Position.status == "CLOSED", Position.closed_at.isnot(None))
+    if watermark is not None:
+        q = q.filter(Position.closed_at >= watermark - REFRESH_MARGIN)
+    days = {_to_ist(c).date() for (c,) in q.all()}
+
+    runs = _runs(days)
+    for start, end in runs:
+        refresh_range(db, start, end)
+    return [f"{s}..{e}" for s, e in runs]
+
+
+# ---------- queries ----------
+def _filtered(start: date, end: date, underlying: Optional[str]):
+    cond = [DailySummary.day >= start, DailySummary.day <= end]
+    if underlying:
+        cond.append(DailySummary.underlying == underlying.upper())
+    return cond
+
+
+def _daily_select(start: date, end: date, underlying: Optional[str] = None):
+    """Per-day totals with running P&L and drawdown from peak, via window functions."""
+    d = (
+        select(
+            DailySummary.day.label("day"),
+            func.sum(DailySummary.realised).label("pnl"),
+            func.sum(DailySummary.positions).label("positions"),
+            func.sum(DailySummary.wins).label("wins"),
+            func.sum(DailySummary.losses).label("losses"),
+        )
+        .where(*_filtered(start, end, underlying))
+        .group_by(DailySummary.day)
+        .subquery()
+    )
+    c = select(d, func.sum(d.c.pnl).over(order_by=d.c.day).label("cum_pnl")).subquery()
+    peak = func.max(c.c.cum_pnl).over(order_by=c.c.day)
+    return select(c, (c.c.cum_pnl - case((peak > 0, peak), else_=0.0)).label("drawdown")).order_by(c.c.day)
+
+
+def daily(db: Session, start: Optional[date] = None, end: Optional[date] = None,
+          underlying: Optional[str] = None) -> List[Dict[str, Any]]:
+    start, end = _default_range(start, end)
+    return [
+        {
+            "day": str(r.day),
+            "pnl": round(r.pnl, 2),
+            "positions": r.positions,
+            "wins": r.wins,
+            "losses": r.losses,
+            "cum_pnl": round(r.cum_pnl, 2),
+            "drawdown": round(r.drawdown, 2),
+        }
+        for r in db.execute(_daily_select(start, end, underlying))
+    ]
+
+
+def breakdown(db: Session, by: str, start: Optional[date] = None, end: Optional[date] = None,
+              underlying: Optional[str] = None) -> List[Dict[str, Any]]:
+    """P&L grouped by 'underlying' or 'expiry'."""
+    start, end = _default_range(start, end)
+    col = {"underlying": DailySummary.underlying, "expiry": DailySummary.expiry}[by]
+    rows = db.execute(
+        select(
+            col.label("key"),
+            func.sum(DailySummary.realised).label("pnl"),
+            func.sum(DailySummary.positions).label("positions"),
+            func.sum(DailySummary.wins).label("wins"),
+            func.sum(DailySummary.gross_profit).label("gross_profit"),
+            func.sum(DailySummary.gross_loss).label("gross_loss"),
+            func.count(func.distinct(DailySummary.day)).label("days"),
+        )
+        .where(*_filtered(start, end, underlying))
+        .group_by(col)
+        .order_by(col)
+    ).all()
+    return [
+        {
+            by: str(r.key) if r.key is not None else None,
+            "pnl": round(r.pnl, 2),
+            "positions": r.positions,
+            "win_rate": round(r.wins / r.positions, 4) if r.positions else None,
+            "profit_factor": round(r.gross_profit / -r.gross_loss, 2) if r.gross_loss else None,
+            "days": r.days,
+        }
+        for r in rows
+    ]
+
+
+def summary(db: Session, start: Optional[date] = None, end: Optional[date] = None,
+            underlying: Optional[str] = None) -> Dict[str, Any]:
+    start, end = _default_range(start, end)
+    t = db.execute(
+        select(
+            func.coalesce(func.sum(DailySummary.realised), 0.0).label("pnl"),
+            func.coalesce(func.sum(DailySummary.positions), 0).label("positions"),
+            func.coalesce(func.sum(DailySummary.wins), 0).label("wins"),
+            func.coalesce(func.sum(DailySummary.losses), 0).label("losses"),
+            func.coalesce(func.sum(DailySummary.gross_profit), 0.0).label("gross_profit"),
+            func.coalesce(func.sum(DailySummary.gross_loss), 0.0).label("gross_loss"),
+            func.coalesce(func.sum(DailySummary.premium_sold), 0.0).label("premium_sold"),
+        ).where(*_filtered(start, end, underlying))
+    ).one()
+    d = _daily_select(start, end, underlying).subquery()
+    days = db.execute(
+        select(
+            func.count().label("days"),
+            func.sum(case((d.c.pnl > 0, 1), else_=0)).label("green_days"),
+            func.coalesce(func.min(d.c.drawdown), 0.0).label("max_drawdown"),
+            func.max(d.c.pnl).label("best_day"),
+            func.min(d.c.pnl).label("worst_day"),
+        )
+    ).one()
+    return {
+        "start": str(start),
+        "end": str(end),
+        "underlying": underlying.upper() if underlying else None,
+        "realised": round(t.pnl, 2),
+        "positions": t.positions,
+        "wins": t.wins,
+        "losses": t.losses,
+        "win_rate": round(t.wins / t.positions, 4) if t.positions else None,
+        "profit_factor": round(t.gross_profit / -t.gross_loss, 2) if t.gross_loss else None,
+        "premium_sold": round(t.premium_sold, 2),
+        "days": days.days,
+        "green_days": days.green_days or 0,
+        "max_drawdown": round(days.max_drawdown, 2),
+        "best_day": round(days.best_day, 2) if days.best_day is not None else None,
+        "worst_day": round(days.worst_day, 2) if days.worst_day is not None else None,
+    }
@@ -0,0 +1,116 @@
+# app/archive.py
+"""
+Hot/cold trade storage. Positions closed more than ARCHIVE_AFTER_DAYS ago
+move, with their orders, from `positions`/`orders` into
+`positions_archive`/`orders_archive`, in batches that each commit on their
+own. The hot tables then hold only open and recent positions, however much
+history accumulates. On Postgres the archive tables are partitioned by month
+and each month's partition is created before its first rows arrive.
+
+The hot `positions`/`orders` tables themselves are deliberately not
+partitioned: Postgres requires the partition key in every primary key and
+unique constraint, which would turn `positions.id` into (id, opened_at) and
+break id lookups (db.get, orders.position_id, journal replay) and the unique
+orders.journal_id. Archival bounds them instead, which gives the same effect
+for the hot path: queries only ever touch open and recent rows.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Set
+
+from sqlalchemy import delete, func, insert, literal, select, text
+from sqlalchemy.orm import Session
+
+from app.archive_model import OrderArchive, PositionArchive
+from app.model import Position
+from app.order_model import Order
+
+
+def _months(lo: datetime, hi: datetime) -> Iterable[date]:
+    m = date(lo.year, lo.month, 1)
+    while m <= hi.date():
+        yield m
+        m = date(m.year + m.month // 12, m.month % 12 + 1, 1)
+
+
+def _ensure_partitions(db: Session, table: str, months: Set[date]) -> None:
+    quote = db.get_bind().dialect.identifier_preparer.quote
+    for m in sorted(months):
+        nxt = date(m.year + m.month // 12, m.month % 12 + 1, 1)
+        # DDL takes no bind parameters; identifiers are quoted, bounds are rendered from date objects
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {quote(f'{table}_{m:%Y_%m}')} PARTITION OF {quote(table)} "
+            f"FOR VALUES FROM ('{m.isoformat()}') TO ('{nxt.isoformat()}')"
+        ))
+
+
+def archive_batch(db: Session, cutoff: datetime, limit: int = 1000) -> Dict[str, int]:
+    """Moves up to `limit` positions closed before `cutoff` (naive UTC) and their orders. Caller commits."""
+    rows = db.execute(
+        select(Position.id, Position.closed_at)
+        .where(Position.status == "CLOSED", Position.closed_at < cutoff)
+        .order_by(Position.closed_at)
+        .limit(limit)
+    ).all()
+    if not rows:
+        return {"positions": 0, "orders": 0}
+    ids = [r.id for r in rows]
+    # Orders without a timestamp are filed under their position's close
+    order_ts = func.coalesce(Order.created_at, Position.closed_at)
+
+    if db.get_bind().dialect.name == "postgresql":
+        lo_o, hi_o = db.execute(
+            select(func.min(order_ts), func.max(order_ts))
+            .join(Position, Position.id == Order.position_id)
+            .where(Order.position_id.in_(ids))
+        ).one()
+        _ensure_partitions(db, "positions_archive", set(_months(rows[0].closed_at, rows[-1].closed_at)))
+        if lo_o is not None:
+            _ensure_partitions(db, "orders_archive", set(_months(lo_o, hi_o)))
+
+    now = datetime.utcnow()
+    db.execute(insert(PositionArchive).from_select(
+        ["id", "closed_at", "symbol", "side", "qty", "avg_price", "status", "opened_at", "archived_at"],
+        select(Position.id, Position.closed_at, Position.symbol, Position.side, Position.qty, Position.avg_price,
+               Position.status, Position.opened_at, literal(now))
+        .where(Position.id.in_(ids)),
+    ))
+    moved = db.execute(insert(OrderArchive).from_select(
+        ["id", "created_at", "position_id", "symbol", "side", "qty", "price", "status", "journal_id"],
+        select(Order.id, order_ts, Order.position_id, Order.symbol, Order.side, Order.qty, Order.price,
+               Order.status, Order.journal_id)
+        .join(Position, Position.id == Order.position_id)
+        .where(Order.position_id.in_(ids)),
+    )).rowcount
+    db.execute(delete(Order).where(Order.position_id.in_(ids)))
+    db.execute(delete(Position).where(Position.id.in_(ids)))
+    return {"positions": len(ids), "orders": moved}
+
+
+def archive_closed(session_factory: Callable[[], Session], older_than_days: int,
+                   batch: int = 1000, now: datetime | None = None) -> Dict[str, Any]:
+    """Archives everything closed more than `older_than_days` ago, one committed batch at a time."""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+    total = {"positions": 0, "orders": 0, "batches": 0, "cutoff": cutoff.isoformat()}
+    while True:
+        with session_factory() as db:
+            moved = archive_batch(db, cutoff, batch)
+            db.commit()
+        if not moved["positions"]:
+            return total
+        total["positions"] += moved["positions"]
+        total["orders"] += moved["orders"]
+        total["batches"] += 1
+
+
+def stats(db: Session) -> Dict[str, Any]:
+    return {
+        "hot_positions": db.scalar(select(func.count()).select_from(Position)),
+        "hot_open_positions": db.scalar(select(func.count()).select_from(Position).where(Position.status == "OPEN")),
+        "hot_orders": db.scalar(select(func.count()).select_from(Order)),
+        "archived_positions": db.scalar(select(func.count()).select_from(PositionArchive)),
+        "archived_orders": db.scalar(select(func.count()).select_from(OrderArchive)),
+        "oldest_hot_close": db.scalar(select(func.min(Position.closed_at)).where(Position.status == "CLOSED")),
+        "newest_archived_close": db.scalar(select(func.max(PositionArchive.closed_at))),
+    }
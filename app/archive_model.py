@@ -0,0 +1,48 @@
+# app/archive_model.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
+from app.db import Base
+
+
+class PositionArchive(Base):
+    """
+    Cold storage for closed positions moved out of `positions` by app/archive.py.
+    On Postgres the table is range-partitioned by month of closed_at (partitions
+    are created by the archival job); on SQLite it is one table indexed the same way.
+    """
+    __tablename__ = "positions_archive"
+    __table_args__ = (
+        Index("ix_positions_archive_closed_at", "closed_at"),
+        Index("ix_positions_archive_symbol", "symbol"),
+        {"postgresql_partition_by": "RANGE (closed_at)"},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    closed_at = Column(DateTime, primary_key=True)        # partition key, so part of the primary key
+    symbol = Column(String, nullable=False)
+    side = Column(String, nullable=False)
+    qty = Column(Integer, nullable=False, default=0)
+    avg_price = Column(Float, nullable=False, default=0.0)
+    status = Column(String, nullable=False, default="CLOSED")
+    opened_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+
+class OrderArchive(Base):
+    """Orders of archived positions; partitioned by month of created_at on Postgres."""
+    __tablename__ = "orders_archive"
+    __table_args__ = (
+        Index("ix_orders_archive_position_id", "position_id"),
+        Index("ix_orders_archive_created_at", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    created_at = Column(DateTime, primary_key=True)
+    position_id = Column(Integer, nullable=False)
+    symbol = Column(String, nullable=False)
+    side = Column(String, nullable=False)
+    qty = Column(Integer, nullable=False)
+    price = Column(Float, nullable=False)
+    status = Column(String, default="FILLED")
+    journal_id = Column(String, nullable=True)
@@ -0,0 +1,120 @@
+# app/book.py
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.model import Position
+from app.order_model import Order
+
+
+def reverse_side(side: str) -> str:
+    return "SELL" if side == "BUY" else "BUY"
+
+
+def book_fill(
+    db: Session,
+    symbol: str,
+    side: str,
+    qty: int,
+    price: Optional[float],
+    journal_id: Optional[str] = None,
+) -> Tuple[Position, Order]:
+    """
+    Merges a fill into the open position for `symbol` (or opens one) and records the order.
+    A same-side fill adds to the position; an opposite-side fill nets it off, closing
+    it when fully offset and opening the excess on the fill's side if larger.
+    Returns the position the fill ends up in. Flushes so ids are assigned; caller commits.
+    """
+    pos = (
+        db.query(Position)
+        .filter(Position.symbol == symbol, Position.status == "OPEN")
+        .first()
+    )
+
+    if pos is not None and pos.side != side:
+        if qty <= pos.qty:
+            order = _order(pos, side, qty, price, journal_id)
+            db.add(order)
+            if qty < pos.qty:
+                pos.qty -= qty
+            else:
+                _mark_closed(pos, price or 0.0)
+            db.flush()
+            return pos, order
+        # Flip: close out the open qty, then open the remainder on this side
+        db.add(_order(pos, side, pos.qty, price, journal_id))
+        _mark_closed(pos, price or 0.0)
+        qty -= pos.qty
+        journal_id = f"{journal_id}:flip" if journal_id else None
+        pos = None
+
+    if pos is None:
+        pos = Position(
+            symbol=symbol,
+            side=side,
+            qty=qty,
+            avg_price=price or 0.0,
+            status="OPEN",
+            opened_at=datetime.utcnow(),
+        )
+        db.add(pos)
+    else:
+        total_qty = pos.qty + qty
+        if total_qty > 0:
+            pos.avg_price = ((pos.avg_price * pos.qty) + (price or 0.0) * qty) / total_qty
+        pos.qty = total_qty
+    db.flush()
+
+    order = _order(pos, side, qty, price, journal_id)
+    db.add(order)
+    db.flush()
+    return pos, order
+
+
+def _order(pos: Position, side: str, qty: int, price: Optional[float], journal_id: Optional[str]) -> Order:
+    return Order(
+        position_id=pos.id,
+        symbol=pos.symbol,
+        side=side,
+        qty=qty,
+        price=price or 0.0,
+        status="FILLED",
+        created_at=datetime.utcnow(),
+        journal_id=journal_id,
+    )
+
+
+def _mark_closed(pos: Position, ltp: float) -> None:
+    pos.status = "CLOSED"
+    pos.close_price = ltp
+    pos.closed_at = datetime.utcnow()
+    pos.realised = (ltp - pos.avg_price) * pos.qty if pos.side == "BUY" else (pos.avg_price - ltp) * pos.qty
+
+
+def book_close(db: Session, pos: Position, ltp: float, journal_id: Optional[str] = None) -> Order:
+    """
+    Records the exit order for a position at `ltp` and marks it CLOSED.
+    Caller is responsible for the commit.
+    """
+    exit_order = _order(pos, reverse_side(pos.side), pos.qty, ltp, journal_id)
+    db.add(exit_order)
+    _mark_closed(pos, ltp)
+    return exit_order
+
+
+def apply_journal_entry(db: Session, kind: str, data: Dict[str, Any], journal_id: str) -> None:
+    """
+    Re-applies a journaled fill/exit that never reached the DB.
+    Idempotent: entries whose order row already exists are skipped.
+    """
+    if db.query(Order.id).filter(Order.journal_id == journal_id).first() is not None:
+        return
+    if kind == "order":
+        book_fill(db, data["symbol"], data["side"], int(data["qty"]), data.get("price"), journal_id=journal_id)
+    elif kind == "close":
+        pos = db.get(Position, int(data["position_id"]))
+        if pos is not None and pos.status != "CLOSED":
+            book_close(db, pos, float(data["price"]), journal_id=journal_id)
+    else:
+        raise ValueError(f"unknown journal entry kind: {kind}")
@@ -1,6 +1,7 @@
 # app/brokers/base.py
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, List
 
 class Broker(ABC):
     @abstractmethod
@@ -26,3 +27,44 @@ class Broker(ABC):
     def cancel_order(self, order_id: str) -> Dict[str, Any]:
         """Cancel an existing order."""
         raise NotImplementedError
+
+    # ---------- async variants ----------
+    # Defaults run the sync call on a worker thread; brokers with a native
+    # async client (or no I/O at all) override these.
+    async def altp(self, symbol: str) -> float:
+        return await asyncio.to_thread(self.ltp, symbol)
+
+    async def altp_many(self, symbols: Iterable[str]) -> Dict[str, float]:
+        """LTP for several symbols in one round-trip where the broker supports it."""
+        symbols = list(dict.fromkeys(symbols))
+        prices = await asyncio.gather(*(self.altp(s) for s in symbols))
+        return dict(zip(symbols, prices))
+
+    async def aquote(self, symbols: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Full quotes keyed by symbol; at minimum {"last_price": ...}."""
+        return {s: {"last_price": p} for s, p in (await self.altp_many(symbols)).items()}
+
+    async def aplace_order(
+        self,
+        symbol: str,
+        side: str,
+        qty: int,
+        order_type: str = "MARKET",
+        price: Optional[float] = None,
+        product: str = "MIS",
+        variety: str = "regular",
+    ) -> Dict[str, Any]:
+        return await asyncio.to_thread(
+            self.place_order, symbol=symbol, side=side, qty=qty, order_type=order_type,
+            price=price, product=product, variety=variety,
+        )
+
+    async def acancel_order(self, order_id: str) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.cancel_order, order_id)
+
+    async def ainstruments(self, exchange: Optional[str] = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError(f"{type(self).__name__} has no instrument list")
+
+    async def aclose(self) -> None:
+        """Release pooled connections."""
+        return None
@@ -0,0 +1,104 @@
+# app/brokers/kite_http.py
+from __future__ import annotations
+
+import csv
+import io
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+import aiohttp
+
+from app.config import KITE_ROOT, KITE_HTTP_TIMEOUT, KITE_HTTP_MAX_CONNECTIONS
+
+try:
+    from kiteconnect import exceptions as kite_exceptions
+except Exception:
+    kite_exceptions = None
+
+DEFAULT_ROOT = "https://api.kite.trade"
+
+
+class KiteHTTP:
+    """
+    Minimal async Kite Connect REST client on a pooled aiohttp session.
+    Mirrors the kiteconnect request/response conventions so callers see the
+    same data shapes and exception types as the sync client.
+    """
+
+    def __init__(self, api_key: str, access_token: str, root: Optional[str] = None):
+        self.api_key = api_key
+        self.access_token = access_token
+        self.root = root or KITE_ROOT or DEFAULT_ROOT
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # Created lazily so it binds to the running event loop.
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                base_url=self.root,
+                connector=aiohttp.TCPConnector(limit=KITE_HTTP_MAX_CONNECTIONS, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=KITE_HTTP_TIMEOUT, connect=min(3.0, KITE_HTTP_TIMEOUT)),
+                headers={"X-Kite-Version": "3"},
+            )
+        return self._session
+
+    async def _request(self, method: str, path: str, params=None, data=None) -> Any:
+        headers = {"Authorization": f"token {self.api_key}:{self.access_token}"}
+        async with self.session.request(method, path, params=params, data=data, headers=headers) as r:
+            if "csv" in r.headers.get("content-type", ""):
+                r.raise_for_status()
+                return await r.text()
+            try:
+                body = await r.json(content_type=None)
+            except ValueError:
+                r.raise_for_status()
+                raise RuntimeError(f"Unparsable Kite response ({r.status}): {(await r.text())[:200]}")
+        if body.get("status") == "error" or r.status >= 400:
+            raise _kite_error(body.get("error_type"), body.get("message", str(body)[:200]), r.status)
+        return body["data"]
+
+    async def aclose(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+    # ---------- market data ----------
+    async def ltp(self, symbols: Iterable[str]) -> Dict[str, Any]:
+        return await self._request("GET", "/quote/ltp", params=[("i", s) for s in symbols])
+
+    async def quote(self, symbols: Iterable[str]) -> Dict[str, Any]:
+        return await self._request("GET", "/quote", params=[("i", s) for s in symbols])
+
+    async def instruments(self, exchange: Optional[str] = None) -> List[Dict[str, Any]]:
+        text = await self._request("GET", f"/instruments/{exchange}" if exchange else "/instruments")
+        return _parse_instruments(text)
+
+    # ---------- orders ----------
+    async def place_order(self, variety: str, **params) -> str:
+        data = await self._request("POST", f"/orders/{variety}", data={k: v for k, v in params.items() if v is not None})
+        return data["order_id"]
+
+    async def cancel_order(self, variety: str, order_id: str) -> str:
+        data = await self._request("DELETE", f"/orders/{variety}/{order_id}")
+        return data["order_id"]
+
+
+def _kite_error(error_type: Optional[str], message: str, code: int) -> Exception:
+    if kite_exceptions is None:
+        return RuntimeError(f"{error_type or 'KiteError'}: {message}")
+    exc = getattr(kite_exceptions, error_type or "", None) or kite_exceptions.GeneralException
+    return exc(message, code=code)
+
+
+def _parse_instruments(text: str) -> List[Dict[str, Any]]:
+    """Same field conversions as kiteconnect's instruments()."""
+    rows = list(csv.DictReader(io.StringIO(text)))
+    for row in rows:
+        row["instrument_token"] = int(row["instrument_token"])
+        row["last_price"] = float(row["last_price"])
+        row["strike"] = float(row["strike"])
+        row["tick_size"] = float(row["tick_size"])
+        row["lot_size"] = int(row["lot_size"])
+        if len(row["expiry"]) == 10:
+            row["expiry"] = date.fromisoformat(row["expiry"])
+    return rows
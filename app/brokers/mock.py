@@ -1,6 +1,8 @@
 from datetime import datetime
 
-class MockBroker:
+from .base import Broker
+
+class MockBroker(Broker):
     def __init__(self):
         self.orders = []
         self.positions = []
@@ -43,6 +45,17 @@ class MockBroker:
         self.positions.append(pos)
         return order
 
+    # In-memory only: the async variants run inline instead of on a thread.
+    async def altp(self, symbol: str) -> float:
+        return self.ltp(symbol)
+
+    async def aplace_order(self, symbol: str, side: str, qty: int, order_type: str = "MARKET",
+                           price: float = None, product: str = "MIS", variety: str = "regular"):
+        return self.place_order(symbol, side, qty, order_type, price, product, variety)
+
+    async def acancel_order(self, order_id: int):
+        return self.cancel_order(order_id)
+
     def cancel_order(self, order_id: int):
         for o in self.orders:
             if o["id"] == order_id:
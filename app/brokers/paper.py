@@ -1,6 +1,8 @@
 from datetime import datetime
 
-class PaperBroker:
+from .base import Broker
+
+class PaperBroker(Broker):
     def __init__(self, session_factory, pricer=None):
         self.session_factory = session_factory
         self.pricer = pricer
@@ -12,9 +14,28 @@ class PaperBroker:
             return self.pricer.ltp(symbol)
         return 100.0  # fallback dummy price
 
+    async def altp(self, symbol: str) -> float:
+        if self.pricer:
+            return await self.pricer.altp(symbol)
+        return 100.0
+
+    async def altp_many(self, symbols):
+        if self.pricer:
+            return await self.pricer.altp_many(symbols)
+        return {s: 100.0 for s in symbols}
+
     def place_order(self, symbol: str, side: str, qty: int, order_type: str = "MARKET",
                     price: float = None, product: str = "MIS", variety: str = "regular",
                     position_id: int = None):
+        return self._record(symbol, side, qty, order_type, price, product, variety, position_id, self.ltp(symbol))
+
+    async def aplace_order(self, symbol: str, side: str, qty: int, order_type: str = "MARKET",
+                           price: float = None, product: str = "MIS", variety: str = "regular",
+                           position_id: int = None):
+        ltp = await self.altp(symbol)
+        return self._record(symbol, side, qty, order_type, price, product, variety, position_id, ltp)
+
+    def _record(self, symbol, side, qty, order_type, price, product, variety, position_id, ltp: float):
         order = {
             "id": len(self.orders) + 1,
             "symbol": symbol,
@@ -35,16 +56,19 @@ class PaperBroker:
             "symbol": symbol,
             "side": side,
             "qty": qty,
-            "avg_price": price or self.ltp(symbol),
+            "avg_price": price or ltp,
             "status": "OPEN",
             "opened_at": datetime.utcnow().isoformat(),
             "close_price": None,
-            "ltp": self.ltp(symbol),
+            "ltp": ltp,
             "unrealised": 0.0,
         }
         self.positions.append(pos)
         return order
 
+    async def acancel_order(self, order_id: int):
+        return self.cancel_order(order_id)
+
     def cancel_order(self, order_id: int):
         for o in self.orders:
             if o["id"] == order_id:
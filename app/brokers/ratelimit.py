@@ -0,0 +1,52 @@
+# app/brokers/ratelimit.py
+"""
+Order-rate limiting for the async order paths, so a burst (a square-off,
+several strategies entering at once) stays inside the broker's per-second
+order limit instead of getting orders rejected by it.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """Async token bucket: `rate` acquisitions per second, bursting up to `burst`. 0 disables it."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._acquired = 0
+        self._waited = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        t0 = time.monotonic()
+        # Single event loop: nothing runs between the check and the decrement
+        while True:
+            self._refill()
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                break
+            await asyncio.sleep((1.0 - self._tokens) / self.rate)
+        self._acquired += 1
+        self._waited += time.monotonic() - t0
+
+    def stats(self) -> Dict[str, float]:
+        self._refill()
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self._tokens, 2),
+            "acquired": self._acquired,
+            "waited_s": round(self._waited, 3),
+        }
@@ -1,6 +1,8 @@
 # app/brokers/zerodha.py
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, List
 from .base import Broker
+from .kite_http import KiteHTTP
+from app.config import KITE_ROOT
 
 class ZerodhaBroker(Broker):
     def __init__(self, api_key: str, api_secret: str, access_token: str):
@@ -11,8 +13,9 @@ class ZerodhaBroker(Broker):
                 "kiteconnect not installed. Add 'kiteconnect' to requirements.txt and rebuild."
             ) from e
 
-        self.kite = KiteConnect(api_key=api_key)
+        self.kite = KiteConnect(api_key=api_key, root=KITE_ROOT)
         self.kite.set_access_token(access_token)
+        self.http = KiteHTTP(api_key, access_token, root=KITE_ROOT)
         # NOTE: You need to generate and supply a valid ACCESS_TOKEN separately.
 
     def ltp(self, symbol: str) -> float:
@@ -34,6 +37,12 @@ class ZerodhaBroker(Broker):
         product: str = "MIS",
         variety: str = "regular",
     ) -> Dict[str, Any]:
+        order_args = self._order_args(symbol, side, qty, order_type, price, product, variety)
+        order_id = self.kite.place_order(**order_args)  # kiteconnect returns the order_id string
+        return {"order_id": order_id, "status": "PLACED", **order_args}
+
+    @staticmethod
+    def _order_args(symbol, side, qty, order_type, price, product, variety) -> Dict[str, Any]:
         transaction_type = "BUY" if side.upper() == "BUY" else "SELL"
         exchange, tradingsymbol = symbol.split(":", 1) if ":" in symbol else ("NFO", symbol)
 
@@ -50,10 +59,44 @@ class ZerodhaBroker(Broker):
             if price is None:
                 raise ValueError("LIMIT order requires price")
             order_args["price"] = price
-
-        resp = self.kite.place_order(**order_args)  # returns dict with order_id
-        return {"order_id": resp["order_id"], "status": "PLACED", **order_args}
+        return order_args
 
     def cancel_order(self, order_id: str) -> Dict[str, Any]:
         self.kite.cancel_order(variety="regular", order_id=order_id)
         return {"ok": True, "order_id": order_id, "status": "CANCELED"}
+
+    # ---------- async (pooled aiohttp session, no worker threads) ----------
+    async def altp(self, symbol: str) -> float:
+        data = await self.http.ltp([symbol])
+        return float(data[symbol]["last_price"])
+
+    async def altp_many(self, symbols: Iterable[str]) -> Dict[str, float]:
+        data = await self.http.ltp(list(dict.fromkeys(symbols)))
+        return {s: float(q["last_price"]) for s, q in data.items()}
+
+    async def aquote(self, symbols: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        return await self.http.quote(list(dict.fromkeys(symbols)))
+
+    async def aplace_order(
+        self,
+        symbol: str,
+        side: str,
+        qty: int,
+        order_type: str = "MARKET",
+        price: Optional[float] = None,
+        product: str = "MIS",
+        variety: str = "regular",
+    ) -> Dict[str, Any]:
+        order_args = self._order_args(symbol, side, qty, order_type, price, product, variety)
+        order_id = await self.http.place_order(**order_args)
+        return {"order_id": order_id, "status": "PLACED", **order_args}
+
+    async def acancel_order(self, order_id: str) -> Dict[str, Any]:
+        await self.http.cancel_order("regular", order_id)
+        return {"ok": True, "order_id": order_id, "status": "CANCELED"}
+
+    async def ainstruments(self, exchange: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await self.http.instruments(exchange)
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
@@ -1,15 +1,25 @@
 # app/brokers/zerodha_data.py
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional
 from kiteconnect import KiteConnect
 import requests
 import os
 import io
 import zipfile
 import pandas as pd
+
+from app.config import KITE_ROOT
+from app.brokers.kite_http import KiteHTTP
+
 class ZerodhaData:
     def __init__(self, api_key: str, access_token: str):
-        self.kite = KiteConnect(api_key=api_key)
+        self.kite = KiteConnect(api_key=api_key, root=KITE_ROOT)
+        self.kite.set_access_token(access_token)
+        self.http = KiteHTTP(api_key, access_token, root=KITE_ROOT)
+        self.instrument_list: Optional[List[Dict[str, Any]]] = None
+
+    def set_access_token(self, access_token: str):
         self.kite.set_access_token(access_token)
+        self.http.access_token = access_token
 
     def ltp(self, symbol: str) -> float:
         data = self.kite.ltp(symbol)
@@ -29,3 +39,39 @@ class ZerodhaData:
         df = self.instruments()
         df = df[(df["segment"] == "NFO-OPT") & (df["name"] == underlying)]
         return df.to_dict(orient="records")
+
+    # ---------- async (pooled aiohttp session, no worker threads) ----------
+    async def altp(self, symbol: str) -> float:
+        data = await self.http.ltp([symbol])
+        return data[symbol]["last_price"]
+
+    async def altp_many(self, symbols: Iterable[str]) -> Dict[str, float]:
+        data = await self.http.ltp(list(dict.fromkeys(symbols)))
+        return {s: q["last_price"] for s, q in data.items()}
+
+    async def aquote(self, symbols: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        return await self.http.quote(list(dict.fromkeys(symbols)))
+
+    async def ainstruments(self, exchange: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await self.http.instruments(exchange)
+
+    async def arefresh_instruments(self, exchange: str = "NFO") -> int:
+        """
+        Download the instrument dump once and keep it in memory for
+        get_instruments() / option chains.
+        """
+        self.instrument_list = await self.ainstruments(exchange)
+        return len(self.instrument_list)
+
+    def get_instruments(self) -> List[Dict[str, Any]]:
+        if self.instrument_list is None:
+            raise Exception("Run instrument sync first.")
+        return self.instrument_list
+
+    async def aoption_chain(self, underlying: str = "NIFTY") -> List[Dict[str, Any]]:
+        if self.instrument_list is None:
+            await self.arefresh_instruments()
+        return [i for i in self.instrument_list if i["segment"] == "NFO-OPT" and i["name"] == underlying]
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
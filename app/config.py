@@ -3,7 +3,58 @@ import os
 
 BROKER = os.getenv("BROKER", "mock").lower()  # "mock" or "zerodha"
 
+# Weekday of monthly F&O expiry (0=Mon, 1=Tue); used to date monthly option symbols
+EXPIRY_WEEKDAY = int(os.getenv("EXPIRY_WEEKDAY", "1"))
+
 # Zerodha env
 KITE_API_KEY = os.getenv("KITE_API_KEY", "")
 KITE_API_SECRET = os.getenv("KITE_API_SECRET", "")
 KITE_ACCESS_TOKEN = os.getenv("KITE_ACCESS_TOKEN", "")
+KITE_ROOT = os.getenv("KITE_ROOT", "") or None  # e.g. http://127.0.0.1:8765 for tools/fake_kite.py
+KITE_HTTP_TIMEOUT = float(os.getenv("KITE_HTTP_TIMEOUT", "7"))  # seconds, async client
+KITE_HTTP_MAX_CONNECTIONS = int(os.getenv("KITE_HTTP_MAX_CONNECTIONS", "100"))
+
+# Order journal (write-ahead log for fills/exits)
+JOURNAL_PATH = os.getenv("JOURNAL_PATH", "data/orders.journal")
+JOURNAL_FSYNC_MS = float(os.getenv("JOURNAL_FSYNC_MS", "2"))
+
+# Scheduler (IST, HH:MM)
+EOD_REFRESH_AT = os.getenv("EOD_REFRESH_AT", "15:45")  # daily analytics refresh
+ARCHIVE_AT = os.getenv("ARCHIVE_AT", "16:30")          # daily hot -> cold trade archival
+
+# Trade archival: closed positions older than this move to the archive tables
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_BATCH = int(os.getenv("ARCHIVE_BATCH", "1000"))
+
+# Strategy runner / global risk (0 disables a limit)
+STRATEGY_WORKERS = int(os.getenv("STRATEGY_WORKERS", "0")) or (os.cpu_count() or 1)
+RISK_MAX_OPEN_POSITIONS = int(os.getenv("RISK_MAX_OPEN_POSITIONS", "0"))
+RISK_MAX_QTY_PER_UNDERLYING = int(os.getenv("RISK_MAX_QTY_PER_UNDERLYING", "0"))
+RISK_MAX_DAILY_LOSS = float(os.getenv("RISK_MAX_DAILY_LOSS", "0"))
+RISK_MAX_MARGIN = float(os.getenv("RISK_MAX_MARGIN", "0"))                # funds available for margin
+
+# Broker order rate limit, shared by all order paths (Kite allows 10 orders/s), and square-off fan-out
+BROKER_ORDER_RATE = float(os.getenv("BROKER_ORDER_RATE", "10"))
+BROKER_ORDER_BURST = float(os.getenv("BROKER_ORDER_BURST", "10"))
+SQUAREOFF_CONCURRENCY = int(os.getenv("SQUAREOFF_CONCURRENCY", "10"))
+
+# Read-model cache for positions / orders / P&L / instruments responses
+READCACHE_MAX_MB = float(os.getenv("READCACHE_MAX_MB", "64"))
+READCACHE_GZIP_MIN = int(os.getenv("READCACHE_GZIP_MIN", "1024"))          # bytes; smaller bodies go uncompressed
+READCACHE_PNL_MAX_AGE = float(os.getenv("READCACHE_PNL_MAX_AGE", "1"))     # seconds a P&L response outlives ticks
+
+# Local SPAN-like margin estimate (fractions of spot / absolute vol)
+MARGIN_PRICE_SCAN = float(os.getenv("MARGIN_PRICE_SCAN", "0.06"))
+MARGIN_VOL_SCAN = float(os.getenv("MARGIN_VOL_SCAN", "0.04"))
+MARGIN_EXPOSURE_PCT = float(os.getenv("MARGIN_EXPOSURE_PCT", "0.02"))
+
+# Tick recorder (compressed columnar chunks of every price seen)
+RECORDER_ENABLED = os.getenv("RECORDER_ENABLED", "1") == "1"
+RECORDER_PATH = os.getenv("RECORDER_PATH", "data/ticks")
+RECORDER_CHUNK_ROWS = int(os.getenv("RECORDER_CHUNK_ROWS", "65536"))
+RECORDER_FLUSH_SECONDS = float(os.getenv("RECORDER_FLUSH_SECONDS", "5"))
+
+# Implied-vol surface (SVI per expiry)
+VOLSURF_EXPIRIES = int(os.getenv("VOLSURF_EXPIRIES", "2"))          # nearest expiries fitted, plus the monthly
+VOLSURF_SECONDS = float(os.getenv("VOLSURF_SECONDS", "2"))          # quote poll / refit interval in market hours
+VOLSURF_TOL = float(os.getenv("VOLSURF_TOL", "0.002"))              # refit when a changed quote is off by more (vol)
@@ -1,6 +1,7 @@
 # app/db.py
 import os
 import time
+from pathlib import Path
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
@@ -13,21 +14,24 @@ engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Schema changes ship as migrations under migrations/ (see alembic.ini)
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
 def init_db(retries: int = 20, delay: float = 1.0):
     """
-    Initializes DB schema by creating tables from SQLAlchemy models.
+    Brings the DB schema to the latest migration (alembic upgrade head).
     Retries to handle the case where Postgres isn't ready yet.
     """
-    # Lazy import to avoid circular imports (Base is defined above)
-    try:
-        import app.model  # noqa: F401
-        import app.order_model
-    except Exception as e:
-        print(f"Warning: could not import app.model yet: {e}")
+    from alembic import command
+    from alembic.config import Config
+
+    cfg = Config(str(ALEMBIC_INI))
+    cfg.set_main_option("script_location", str(ALEMBIC_INI.parent / "migrations"))
+    cfg.attributes["embedded"] = True
 
     for i in range(retries):
         try:
-            Base.metadata.create_all(bind=engine)
+            command.upgrade(cfg, "head")
             print("DB initialized")
             return
         except Exception as e:
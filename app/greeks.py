@@ -0,0 +1,117 @@
+# app/greeks.py
+"""
+Vectorized Black-Scholes pricing, delta and implied volatility over whole
+option chains (numpy arrays in, numpy arrays out).
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, time
+
+import numpy as np
+
+from app.pnl import IST
+
+RATE = 0.065          # annual risk-free rate used across the app
+MIN_VOL, MAX_VOL = 0.01, 5.0
+YEAR_SECONDS = 365.0 * 24 * 3600
+MARKET_CLOSE = time(15, 30)
+
+_SQRT2 = np.sqrt(2.0)
+_INV_SQRT2PI = 1.0 / np.sqrt(2.0 * np.pi)
+
+
+def year_fraction(expiry: date, now: datetime, floor_seconds: float = 60.0) -> float:
+    """Years from `now` to the expiry's market close, floored so expiry-day maths stays finite."""
+    close = datetime.combine(expiry, MARKET_CLOSE, IST)
+    return max((close - now).total_seconds(), floor_seconds) / YEAR_SECONDS
+
+
+def _erf(x: np.ndarray) -> np.ndarray:
+    # Abramowitz & Stegun 7.1.26 (|error| < 1.5e-7); numpy has no erf of its own
+    s = np.sign(x)
+    a = np.abs(x)
+    t = 1.0 / (1.0 + 0.3275911 * a)
+    y = 1.0 - (((((1.061405429 * t - 1.453152027) * t) + 1.421413741) * t - 0.284496736) * t + 0.254829592) * t * np.exp(-a * a)
+    return s * y
+
+
+def norm_cdf(x: np.ndarray) -> np.ndarray:
+    return 0.5 * (1.0 + _erf(x / _SQRT2))
+
+
+def norm_pdf(x: np.ndarray) -> np.ndarray:
+    return _INV_SQRT2PI * np.exp(-0.5 * x * x)
+
+
+def _d1(spot, strike, t, vol, r):
+    sq = vol * np.sqrt(t)
+    return (np.log(spot / strike) + (r + 0.5 * vol * vol) * t) / sq, sq
+
+
+def bs_price(spot, strike, t, vol, is_call, r: float = RATE) -> np.ndarray:
+    """Black-Scholes price; every argument broadcasts. t in years."""
+    spot, strike, t, vol, is_call = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (spot, strike, t, vol, is_call)))
+    is_call = is_call.astype(bool)
+    intrinsic = np.where(is_call, np.maximum(spot - strike, 0.0), np.maximum(strike - spot, 0.0))
+    live = (t > 0) & (vol > 0)
+    t_ = np.where(live, t, 1.0)
+    v_ = np.where(live, vol, 1.0)
+    d1, sq = _d1(spot, strike, t_, v_, r)
+    d2 = d1 - sq
+    df = np.exp(-r * t_)
+    call = spot * norm_cdf(d1) - strike * df * norm_cdf(d2)
+    put = call - spot + strike * df          # put-call parity: half the normal CDFs
+    return np.where(live, np.where(is_call, call, put), intrinsic)
+
+
+def bs_delta(spot, strike, t, vol, is_call, r: float = RATE) -> np.ndarray:
+    spot, strike, t, vol, is_call = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (spot, strike, t, vol, is_call)))
+    is_call = is_call.astype(bool)
+    live = (t > 0) & (vol > 0)
+    d1, _ = _d1(spot, strike, np.where(live, t, 1.0), np.where(live, vol, 1.0), r)
+    nd1 = norm_cdf(d1)
+    expired = np.where(is_call, (spot > strike).astype(float), -(spot < strike).astype(float))
+    return np.where(live, np.where(is_call, nd1, nd1 - 1.0), expired)
+
+
+def bs_vega(spot, strike, t, vol, r: float = RATE) -> np.ndarray:
+    d1, _ = _d1(spot, strike, t, vol, r)
+    return spot * norm_pdf(d1) * np.sqrt(t)
+
+
+def implied_vol(price, spot, strike, t, is_call, r: float = RATE, guess=0.2,
+                tol: float = 1e-6, max_iter: int = 20) -> np.ndarray:
+    """
+    Newton iterations on the whole array at once, bracketed so that strikes
+    where vega vanishes fall back to bisection. Prices outside the no-arbitrage
+    bounds give NaN. Converged when the price is within `tol` (relative) or
+    the bracket is narrower than `tol` in vol.
+    """
+    arrays = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (price, spot, strike, t, is_call, guess)))
+    shape = arrays[0].shape
+    price, spot, strike, t, is_call, vol = (a.ravel().copy() for a in arrays)
+    is_call = is_call.astype(bool)
+    df = np.exp(-r * t)
+    lower = np.where(is_call, np.maximum(spot - strike * df, 0.0), np.maximum(strike * df - spot, 0.0))
+    upper = np.where(is_call, spot, strike * df)
+    active = (t > 0) & (price > lower) & (price < upper)
+    vol[~active] = np.nan
+    lo = np.full(price.shape, MIN_VOL)
+    hi = np.full(price.shape, MAX_VOL)
+
+    for _ in range(max_iter):
+        idx = np.nonzero(active)[0]
+        if idx.size == 0:
+            break
+        v, s, k, tt, c, p = vol[idx], spot[idx], strike[idx], t[idx], is_call[idx], price[idx]
+        diff = bs_price(s, k, tt, v, c, r) - p
+        vega = bs_vega(s, k, tt, v, r)
+        lo[idx] = l = np.where(diff < 0, v, lo[idx])
+        hi[idx] = h = np.where(diff > 0, v, hi[idx])
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            nxt = v - diff / vega
+        nxt = np.where(np.isfinite(nxt) & (nxt > l) & (nxt < h), nxt, 0.5 * (l + h))
+        done = (np.abs(diff) < tol * p) | (h - l < tol)
+        vol[idx] = np.where(done, v, nxt)
+        active[idx] = ~done
+    return vol.reshape(shape)
@@ -0,0 +1,276 @@
+# app/journal.py
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+# Record types, in the order a transaction goes through them:
+#   intent    - about to call the broker (outcome unknown if we crash after this)
+#   ack       - broker accepted / nothing to send; everything needed to book it
+#   persisted - position/order rows committed to the DB
+#   failed    - broker rejected; nothing to book
+#   abandoned - intent with no ack found on recovery; needs manual reconciliation
+INTENT, ACK, PERSISTED, FAILED, ABANDONED = "intent", "ack", "persisted", "failed", "abandoned"
+
+
+class OrderJournal:
+    """
+    Append-only write-ahead log for the order path.
+
+    Every fill/exit is appended (and fsynced, group-committed every
+    `fsync_ms`) before it is acknowledged, so a crash between the broker
+    call and the DB commit can be recovered on the next start. Only the ack
+    is waited on: the intent is written without waiting and its fsync runs
+    in the background while the broker call is in flight, so an order costs
+    one fsync wait, not two. A background
+    drainer writes acked-but-unpersisted entries to the DB in batches, which
+    also covers DB outages on the request path.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        session_factory: Callable[[], Session],
+        apply_fn: Callable[[Session, str, Dict[str, Any], str], None],
+        fsync_ms: float = 2.0,
+        drain_interval: float = 1.0,
+        drain_min_age: float = 2.0,
+        batch_size: int = 500,
+        compact_bytes: int = 8 * 1024 * 1024,
+    ):
+        self.path = path
+        self.session_factory = session_factory
+        self.apply_fn = apply_fn
+        self.fsync_interval = fsync_ms / 1000.0
+        self.drain_interval = drain_interval
+        self.drain_min_age = drain_min_age
+        self.batch_size = batch_size
+        self.compact_bytes = compact_bytes
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._fh = open(path, "a", encoding="utf-8")
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._synced = 0
+        self._closed = False
+        # txn id -> {"kind", "state", "data", "ts"} for transactions not yet persisted/failed
+        self._open: Dict[str, Dict[str, Any]] = {}
+        self._stats = {"appends": 0, "fsyncs": 0, "drained": 0, "recovered": 0, "abandoned": 0}
+        self._threads: List[threading.Thread] = []
+
+    # ---------- lifecycle ----------
+    def start(self) -> None:
+        for target, name in ((self._flusher, "journal-fsync"), (self._drainer, "journal-drain")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout=5)
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self._fh.close()
+
+    # ---------- writing ----------
+    def _append(self, rec: Dict[str, Any], durable: bool) -> int:
+        line = json.dumps(rec, separators=(",", ":"), default=str) + "\n"
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("order journal is closed")
+            self._seq += 1
+            seq = self._seq
+            self._fh.write(line)
+            self._stats["appends"] += 1
+            self._cond.notify_all()
+            if durable:
+                while self._synced < seq and not self._closed:
+                    self._cond.wait()
+        return seq
+
+    def _flusher(self) -> None:
+        while True:
+            with self._cond:
+                while self._synced == self._seq and not self._closed:
+                    self._cond.wait()
+                if self._closed and self._synced == self._seq:
+                    return
+            # Let concurrent appends join this fsync.
+            time.sleep(self.fsync_interval)
+            with self._cond:
+                target = self._seq
+                self._fh.flush()
+            os.fsync(self._fh.fileno())
+            with self._cond:
+                self._synced = max(self._synced, target)
+                self._stats["fsyncs"] += 1
+                self._cond.notify_all()
+
+    def begin(self, kind: str, data: Dict[str, Any]) -> str:
+        """
+        Journal an intent before calling the broker. Returns the txn id.
+        Not waited on: the flusher syncs it within `fsync_ms`, normally long
+        before the broker answers, and the ack's fsync covers it in any case.
+        """
+        txn = uuid.uuid4().hex
+        with self._cond:
+            self._open[txn] = {"kind": kind, "state": INTENT, "data": dict(data), "ts": time.time()}
+        self._append({"txn": txn, "type": INTENT, "kind": kind, "ts": time.time(), "data": data}, durable=False)
+        return txn
+
+    def ack(self, txn: str, data: Dict[str, Any]) -> None:
+        """Journal the broker outcome; from here on the entry will reach the DB."""
+        with self._cond:
+            entry = self._open[txn]
+            entry["data"].update(data)
+            entry["state"] = ACK
+            entry["ts"] = time.time()
+            kind = entry["kind"]
+        self._append({"txn": txn, "type": ACK, "kind": kind, "ts": time.time(), "data": data}, durable=True)
+
+    def log(self, kind: str, data: Dict[str, Any]) -> str:
+        """Journal a book-only operation (no broker call) as a single ack."""
+        txn = uuid.uuid4().hex
+        with self._cond:
+            self._open[txn] = {"kind": kind, "state": ACK, "data": dict(data), "ts": time.time()}
+        self._append({"txn": txn, "type": ACK, "kind": kind, "ts": time.time(), "data": data}, durable=True)
+        return txn
+
+    def fail(self, txn: str, error: str) -> None:
+        with self._cond:
+            self._open.pop(txn, None)
+        self._append({"txn": txn, "type": FAILED, "ts": time.time(), "error": error}, durable=False)
+
+    def done(self, txn: str) -> None:
+        """
+        Marks the entry as persisted. Not fsynced: losing this record only
+        means recovery re-checks an entry that apply_fn will skip.
+        """
+        with self._cond:
+            self._open.pop(txn, None)
+        self._append({"txn": txn, "type": PERSISTED, "ts": time.time()}, durable=False)
+
+    # ---------- draining ----------
+    def _drainer(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed, timeout=self.drain_interval)
+                if self._closed:
+                    return
+            try:
+                self.drain()
+            except Exception as e:
+                print(f"Order journal drain failed: {e}")
+
+    def drain(self, min_age: Optional[float] = None) -> int:
+        """Writes acked-but-unpersisted entries to the DB in one batch per `batch_size`."""
+        cutoff = time.time() - (self.drain_min_age if min_age is None else min_age)
+        with self._cond:
+            ready = [
+                (txn, e["kind"], dict(e["data"]))
+                for txn, e in self._open.items()
+                if e["state"] == ACK and e["ts"] <= cutoff
+            ]
+        drained = 0
+        for i in range(0, len(ready), self.batch_size):
+            batch = ready[i:i + self.batch_size]
+            try:
+                self._apply_batch(batch)
+            except Exception:
+                # One bad entry must not hold back the rest; retry individually.
+                for item in batch:
+                    try:
+                        self._apply_batch([item])
+                    except Exception as e:
+                        print(f"Order journal: could not persist {item[0]}: {e}")
+                        continue
+                    drained += 1
+                continue
+            drained += len(batch)
+        self._stats["drained"] += drained
+        self._maybe_compact()
+        return drained
+
+    def _apply_batch(self, batch) -> None:
+        with self.session_factory() as db:
+            for txn, kind, data in batch:
+                self.apply_fn(db, kind, data, txn)
+            db.commit()
+        for txn, _, _ in batch:
+            self.done(txn)
+
+    def _maybe_compact(self) -> None:
+        """Truncates the log once it is large and nothing in it is still open."""
+        with self._cond:
+            if self._open or self._synced != self._seq:
+                return
+            self._fh.flush()
+            if os.path.getsize(self.path) < self.compact_bytes:
+                return
+            self._fh.truncate(0)
+            os.fsync(self._fh.fileno())
+
+    # ---------- recovery ----------
+    def recover(self) -> int:
+        """
+        Replays the log on startup: entries acked but never persisted are
+        applied to the DB; intents without an ack are reported and abandoned.
+        Call before start().
+        """
+        txns: Dict[str, Dict[str, Any]] = {}
+        good = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn tail write
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break
+                good += len(line)
+                entry = txns.setdefault(rec["txn"], {"kind": rec.get("kind"), "state": None, "data": {}})
+                entry["state"] = rec["type"]
+                entry["data"].update(rec.get("data") or {})
+        # Cut the log back to the last complete record, or the next append would
+        # be glued onto the fragment and lost, with everything after it, next time
+        if good < os.path.getsize(self.path):
+            print(f"Order journal: dropping {os.path.getsize(self.path) - good} bytes of torn tail")
+            with self._cond:
+                self._fh.flush()
+                self._fh.truncate(good)
+                os.fsync(self._fh.fileno())
+
+        pending = []
+        for txn, e in txns.items():
+            if e["state"] == ACK:
+                pending.append((txn, e["kind"], e["data"]))
+            elif e["state"] == INTENT:
+                print(f"Order journal: {e['kind']} {txn} reached the broker with unknown outcome, reconcile manually: {e['data']}")
+                self._append({"txn": txn, "type": ABANDONED, "ts": time.time()}, durable=False)
+                self._stats["abandoned"] += 1
+
+        for i in range(0, len(pending), self.batch_size):
+            self._apply_batch(pending[i:i + self.batch_size])
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self._synced = self._seq
+        self._stats["recovered"] += len(pending)
+        if pending:
+            print(f"Order journal: recovered {len(pending)} entries")
+        return len(pending)
+
+    def stats(self) -> dict:
+        with self._cond:
+            out = dict(self._stats)
+            out["open"] = len(self._open)
+            out["batch_avg"] = round(out["appends"] / out["fsyncs"], 2) if out["fsyncs"] else None
+        return out
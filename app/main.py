@@ -1,10 +1,14 @@
 from __future__ import annotations
-from datetime import datetime
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from datetime import date, datetime, time, timedelta
 import os
 from typing import Optional
 
 from fastapi import FastAPI, Depends, HTTPException, Header, Query, Request, Body, Path, APIRouter
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, RedirectResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, RedirectResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -12,11 +16,35 @@ from dotenv import load_dotenv
 from app.db import SessionLocal, init_db
 from app.model import Position
 from app.order_model import Order
-from app.config import BROKER, KITE_API_KEY, KITE_API_SECRET, KITE_ACCESS_TOKEN
+from app.config import BROKER, KITE_API_KEY, KITE_API_SECRET, KITE_ACCESS_TOKEN, JOURNAL_PATH, JOURNAL_FSYNC_MS, KITE_ROOT, EOD_REFRESH_AT
+from app.config import STRATEGY_WORKERS, RISK_MAX_OPEN_POSITIONS, RISK_MAX_QTY_PER_UNDERLYING, RISK_MAX_DAILY_LOSS
+from app.config import RISK_MAX_MARGIN, MARGIN_PRICE_SCAN, MARGIN_VOL_SCAN, MARGIN_EXPOSURE_PCT
+from app.config import RECORDER_ENABLED, RECORDER_PATH, RECORDER_CHUNK_ROWS, RECORDER_FLUSH_SECONDS
+from app.config import VOLSURF_EXPIRIES, VOLSURF_SECONDS, VOLSURF_TOL
+from app.config import ARCHIVE_AT, ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH
+from app.config import BROKER_ORDER_RATE, BROKER_ORDER_BURST, SQUAREOFF_CONCURRENCY
+from app.config import READCACHE_MAX_MB, READCACHE_GZIP_MIN, READCACHE_PNL_MAX_AGE
 from app.brokers.mock import MockBroker
 from app.brokers.paper import PaperBroker
+from app.brokers.ratelimit import TokenBucket
 from app.brokers.zerodha_data import ZerodhaData
-from app.pnl import compute_today_pnl
+from app.pnl import IST, compute_today_pnl, todays_positions
+from app import analytics, archive
+from app.book import book_fill, book_close, reverse_side, apply_journal_entry
+from app.journal import OrderJournal
+from app import recorder
+from app.readcache import ReadCache
+from app.recorder import TickRecorder, LTP, TICK
+from app.risk.guard import RiskGuard, RiskRejected
+from app.risk.margin import MarginEstimator
+from app.risk.squareoff import SquareOff
+from app.risk import trigger_store
+from app.risk.triggers import TriggerEngine, ABOVE, BELOW
+from app.scheduler import Scheduler, Cron, Every
+from app.strategy.runner import ChainSpec, StrategyRunner, chain_from_instruments, expiries_from_instruments
+from app.strategy.runner import synthetic_chain, spot_symbol
+from app.strategy.strangle import StrangleConfig
+from app.volsurface import VolSurfaceService, surface_expiries
 from app import state
 
 try:
@@ -25,8 +53,70 @@ except Exception:
     KiteConnect = None
 
 
+# ---------- Lifespan ----------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    price_source = os.getenv("PRICE_SOURCE", "mock").lower()
+
+    if BROKER == "paper":
+        state.pricer = ZerodhaData(api_key=KITE_API_KEY, access_token=KITE_ACCESS_TOKEN) if price_source == "zerodha" else None
+        state.broker = PaperBroker(SessionLocal, pricer=state.pricer)
+    elif BROKER == "zerodha":
+        from app.brokers.zerodha import ZerodhaBroker
+        state.broker = ZerodhaBroker(api_key=KITE_API_KEY, api_secret=KITE_API_SECRET, access_token=KITE_ACCESS_TOKEN)
+    else:
+        state.broker = MockBroker()
+
+    state.journal = OrderJournal(JOURNAL_PATH, SessionLocal, apply_journal_entry, fsync_ms=JOURNAL_FSYNC_MS)
+    state.journal.recover()
+    state.journal.start()
+    state.order_limiter = TokenBucket(BROKER_ORDER_RATE, BROKER_ORDER_BURST)
+    state.readcache = ReadCache(int(READCACHE_MAX_MB * (1 << 20)), READCACHE_GZIP_MIN)
+    state.readcache.watch(SessionLocal, {Position: ("positions", "pnl"), Order: ("orders", "pnl")})
+    state.triggers = TriggerEngine(on_exit=_trigger_exit, loop=asyncio.get_running_loop())
+    with SessionLocal() as db:
+        restored = trigger_store.restore(db, state.triggers)
+        db.commit()
+    if restored:
+        print(f"Re-armed {restored} triggers of open positions")
+    state.volsurface = VolSurfaceService(tol=VOLSURF_TOL)
+    state.margin = MarginEstimator(SessionLocal, state.volsurface, MARGIN_PRICE_SCAN, MARGIN_VOL_SCAN, MARGIN_EXPOSURE_PCT)
+    state.risk = RiskGuard(SessionLocal, RISK_MAX_OPEN_POSITIONS, RISK_MAX_QTY_PER_UNDERLYING, RISK_MAX_DAILY_LOSS,
+                           state.margin, RISK_MAX_MARGIN)
+    if RECORDER_ENABLED:
+        state.recorder = TickRecorder(RECORDER_PATH, RECORDER_CHUNK_ROWS, RECORDER_FLUSH_SECONDS)
+        state.recorder.start()
+
+    state.scheduler = Scheduler()
+    _register_jobs(state.scheduler)
+    state.scheduler.start()
+
+    print(f"DB initialized, broker={BROKER}, price_source={price_source}")
+
+    yield
+
+    if state.runner:
+        await state.runner.stop()
+    if state.squareoff:
+        await state.squareoff.wait()
+    if state.scheduler:
+        await state.scheduler.stop()
+    if state.triggers:
+        state.triggers.shutdown()
+    if state.recorder:
+        state.recorder.close()
+    if state.journal:
+        state.journal.close()
+    if state.readcache:
+        state.readcache.unwatch()
+    for client in (state.broker, state.pricer):
+        if client is not None and hasattr(client, "aclose"):
+            await client.aclose()
+
+
 # ---------- FastAPI ----------
-app = FastAPI(title="Option Selling Bot API")
+app = FastAPI(title="Option Selling Bot API", lifespan=lifespan)
 
 # ---------- API Key ----------
 API_KEY = "supersecret123"
@@ -43,24 +133,6 @@ def get_db():
     finally:
         db.close()
 
-# ---------- Broker ----------
-@app.on_event("startup")
-async def on_startup():
-    init_db()
-    price_source = os.getenv("PRICE_SOURCE", "mock").lower()
-
-    if BROKER == "paper":
-        state.pricer = ZerodhaData(api_key=KITE_API_KEY, access_token=KITE_ACCESS_TOKEN) if price_source == "zerodha" else None
-        state.broker = PaperBroker(SessionLocal, pricer=state.pricer)
-    elif BROKER == "zerodha":
-        from app.brokers.zerodha import ZerodhaBroker
-        state.broker = ZerodhaBroker(api_key=KITE_API_KEY, api_secret=KITE_API_SECRET, access_token=KITE_ACCESS_TOKEN)
-    else:
-        state.broker = MockBroker()
-
-    print(f"DB initialized, broker={BROKER}, price_source={price_source}")
-
-
 # ---------- Root ----------
 @app.get("/", include_in_schema=False)
 def root():
@@ -74,11 +146,34 @@ def broker_mode(ok: bool = Depends(require_key)):
 
 
 @app.get("/broker/ltp")
-def broker_ltp(symbol: str = Query(...), ok: bool = Depends(require_key)):
+async def broker_ltp(symbol: str = Query(...), ok: bool = Depends(require_key)):
     try:
-        return {"symbol": symbol, "ltp": state.broker.ltp(symbol)}
+        ltp = await state.broker.altp(symbol)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"LTP error: {e}")
+    _on_prices({symbol: ltp})
+    return {"symbol": symbol, "ltp": ltp}
+
+
+def _on_prices(prices: dict[str, float], source: int = LTP, bump_pnl: bool = True) -> int:
+    """
+    Fans fresh prices out to the recorder, trigger engine, vol surface, margin estimator and strategy runner; returns exits fired.
+    `bump_pnl=False` for prices fetched by the P&L build itself, which already reflects them.
+    """
+    if state.recorder:
+        state.recorder.record_many(prices, source)
+    if state.volsurface:
+        state.volsurface.update(prices)
+    if state.margin:
+        state.margin.update(prices)
+    exits = 0
+    for symbol, price in prices.items():
+        exits += state.triggers.on_price(symbol, price)
+    if state.runner:
+        state.runner.update(prices)
+    if bump_pnl and state.readcache and prices:
+        state.readcache.bump("pnl")
+    return exits
 
 
 class OrderIn(BaseModel):
@@ -93,92 +188,138 @@ class OrderIn(BaseModel):
 
 
 @app.post("/broker/order")
-def broker_place_order(payload: OrderIn, ok: bool = Depends(require_key), db: Session = Depends(get_db)):
-    # Place through broker
-    resp = state.broker.place_order(
-        symbol=payload.symbol,
-        side=payload.side,
-        qty=payload.qty,
-        order_type=payload.order_type,
-        price=payload.price,
-        product=payload.product,
-        variety=payload.variety,
-    )
+async def broker_place_order(payload: OrderIn, ok: bool = Depends(require_key)):
+    try:
+        return await _submit_order(payload)
+    except RiskRejected as e:
+        raise HTTPException(status_code=403, detail=f"Rejected by risk guard: {e}")
 
-    # Handle DB position
-    pos = (
-        db.query(Position)
-        .filter(Position.symbol == payload.symbol, Position.status == "OPEN")
-        .first()
-    )
 
-    if pos is None:
-        pos = Position(
-            symbol=payload.symbol,
-            side=payload.side,
-            qty=payload.qty,
-            avg_price=payload.price or 0.0,
-            status="OPEN",
-            opened_at=datetime.utcnow(),
-        )
-        db.add(pos)
-        db.commit()
-        db.refresh(pos)
-    else:
-        total_qty = pos.qty + payload.qty
-        if total_qty > 0:
-            pos.avg_price = ((pos.avg_price * pos.qty) + (payload.price or 0.0) * payload.qty) / total_qty
-        pos.qty = total_qty
-        db.commit()
-        db.refresh(pos)
-
-    # Record order
-    order = Order(
-        position_id=pos.id,
-        symbol=payload.symbol,
-        side=payload.side,
-        qty=payload.qty,
-        price=payload.price or 0.0,
-        status="FILLED",
-        created_at=datetime.utcnow(),
-    )
-    db.add(order)
-    db.commit()
-    db.refresh(order)
+async def _submit_order(payload: OrderIn) -> dict:
+    """The central order path: global risk check, journal the intent, place through broker, journal the outcome."""
+    hold = await run_in_threadpool(state.risk.reserve, payload.symbol, payload.side, payload.qty, payload.price)
+    try:
+        txn = state.journal.begin("order", payload.model_dump())
+        try:
+            await state.order_limiter.acquire()
+            resp = await state.broker.aplace_order(
+                symbol=payload.symbol,
+                side=payload.side,
+                qty=payload.qty,
+                order_type=payload.order_type,
+                price=payload.price,
+                product=payload.product,
+                variety=payload.variety,
+            )
+        except Exception as e:
+            state.journal.fail(txn, str(e))
+            raise
+        await run_in_threadpool(state.journal.ack, txn, {"broker_response": resp})
+        return await run_in_threadpool(_persist_fill, payload, txn, resp)
+    finally:
+        state.risk.release(hold)
+
 
-    return {"broker_response": resp, "position": pos.id, "order": order.id}
+def _persist_fill(payload: OrderIn, txn: str, resp: dict) -> dict:
+    # Handle DB position + order in one commit; the journal drainer retries if this fails
+    with SessionLocal() as db:
+        try:
+            pos, order = book_fill(db, payload.symbol, payload.side, payload.qty, payload.price, journal_id=txn)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Order {txn} journaled, DB write deferred: {e}")
+            return {"broker_response": resp, "position": None, "order": None, "journal_id": txn, "pending": True}
+        state.journal.done(txn)
+
+        return {"broker_response": resp, "position": pos.id, "order": order.id}
+
+
+async def _close_at_broker(position_id: int, price: Optional[float] = None, claimed: bool = False) -> dict:
+    """
+    Squares off a position at the broker and books the close (exit path for strategies
+    and fired triggers). `claimed`: the caller already owns the exit claim.
+    Raises only if nothing reached the broker; the claim is then released.
+    """
+    with SessionLocal() as db:
+        pos = await run_in_threadpool(db.get, Position, position_id)
+        if not pos or pos.status == "CLOSED":
+            return {"ok": False, "closed": True, "error": "position not found or already closed"}
+        if not claimed and not state.triggers.claim(pos.id):
+            return {"ok": False, "in_progress": True, "error": "exit already in progress"}
+        try:
+            if price is None:
+                price = await state.broker.altp(pos.symbol)
+                if state.recorder:
+                    state.recorder.record(pos.symbol, price)
+            txn = state.journal.begin("close", {"position_id": pos.id, "symbol": pos.symbol, "qty": pos.qty})
+            try:
+                await state.order_limiter.acquire()
+                resp = await state.broker.aplace_order(symbol=pos.symbol, side=reverse_side(pos.side), qty=pos.qty)
+            except Exception as e:
+                state.journal.fail(txn, str(e))
+                raise
+        except Exception:
+            # Nothing reached the broker: the position can be exited again
+            state.triggers.release(pos.id)
+            raise
+        # Filled at the broker: from here the claim stays, whatever happens to the booking
+        state.triggers.order_placed(pos.id)
+        try:
+            await run_in_threadpool(state.journal.ack, txn, {"price": price, "broker_response": resp})
+        except Exception as e:
+            print(f"Close {txn} filled but not acked (recovery flags it for reconciliation): {e}")
+
+        def book():
+            try:
+                book_close(db, pos, price, journal_id=txn)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"Close {txn} journaled, DB write deferred: {e}")
+                return False
+            return True
+        if not await run_in_threadpool(book):
+            return {"ok": True, "price": price, "position_id": pos.id, "journal_id": txn, "pending": True}
+        state.journal.done(txn)
+        state.triggers.forget([pos.id])
+        return {"ok": True, "price": price, "position_id": pos.id}
 
 
 @app.post("/broker/positions/{pos_id}/close")
-def close_position(pos_id: int, ok: bool = Depends(require_key), db: Session = Depends(get_db)):
-    pos = db.get(Position, pos_id)
+async def close_position(pos_id: int, ok: bool = Depends(require_key), db: Session = Depends(get_db)):
+    pos = await run_in_threadpool(db.get, Position, pos_id)
     if not pos or pos.status == "CLOSED":
         raise HTTPException(status_code=404, detail="Position not found or already closed")
+    if not state.triggers.claim(pos.id):
+        raise HTTPException(status_code=409, detail="Position exit already in progress")
 
     try:
-        ltp = state.broker.ltp(pos.symbol)
+        ltp = await state.broker.altp(pos.symbol)
+        if state.recorder:
+            state.recorder.record(pos.symbol, ltp)
     except Exception:
         ltp = pos.avg_price  # fallback
 
-    reverse_side = "SELL" if pos.side == "BUY" else "BUY"
+    return await run_in_threadpool(_persist_close, db, pos, ltp)
 
-    exit_order = Order(
-        position_id=pos.id,
-        symbol=pos.symbol,
-        side=reverse_side,
-        qty=pos.qty,
-        price=ltp,
-        status="FILLED",
-        created_at=datetime.utcnow(),
-    )
-    db.add(exit_order)
 
-    pos.status = "CLOSED"
-    pos.close_price = ltp
-    pos.closed_at = datetime.utcnow()
-    pos.realised = (ltp - pos.avg_price) * pos.qty if pos.side == "BUY" else (pos.avg_price - ltp) * pos.qty
-
-    db.commit()
+def _persist_close(db: Session, pos: Position, ltp: float) -> dict:
+    try:
+        txn = state.journal.log("close", {"position_id": pos.id, "price": ltp})
+    except Exception:
+        state.triggers.release(pos.id)
+        raise
+    # Journaled: the drainer books it if this commit fails, so the claim is kept either way
+    try:
+        exit_order = book_close(db, pos, ltp, journal_id=txn)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Close {txn} journaled, DB write deferred: {e}")
+        return {"id": pos.id, "symbol": pos.symbol, "close_price": ltp, "journal_id": txn, "pending": True}
+    state.journal.done(txn)
+    state.triggers.forget([pos.id])
     db.refresh(pos)
 
     return {
@@ -196,23 +337,76 @@ def close_position(pos_id: int, ok: bool = Depends(require_key), db: Session = D
 
 
 @app.get("/broker/positions")
-def broker_positions(ok: bool = Depends(require_key)):
-    with SessionLocal() as db:
-        return [p.__dict__ for p in db.query(Position).all()]
+def broker_positions(request: Request, ok: bool = Depends(require_key)):
+    # Served from the read-model cache; commits touching positions bump its version
+    def build():
+        with SessionLocal() as db:
+            return [p.__dict__ for p in db.query(Position).all()]
+    return state.readcache.respond(request, "positions", build)
 
 
 @app.get("/broker/orders")
-def broker_orders(ok: bool = Depends(require_key)):
-    with SessionLocal() as db:
-        return [o.__dict__ for o in db.query(Order).all()]
+def broker_orders(request: Request, ok: bool = Depends(require_key)):
+    def build():
+        with SessionLocal() as db:
+            return [o.__dict__ for o in db.query(Order).all()]
+    return state.readcache.respond(request, "orders", build)
+
+
+@app.post("/broker/squareoff")
+async def broker_squareoff(underlying: Optional[str] = Query(None), ok: bool = Depends(require_key)):
+    """
+    Kill switch: halts new entries and squares off every open position (or one
+    underlying's), shorts before hedges. Streams per-leg progress as NDJSON;
+    the square-off carries on if the caller disconnects.
+    """
+    if state.squareoff is not None and not state.squareoff.finished:
+        raise HTTPException(status_code=409, detail="Square-off already running")
+    state.risk.halt("square-off" + (f" {underlying.upper()}" if underlying else ""))
+    state.squareoff = SquareOff(SessionLocal, state.broker, state.journal, state.triggers, state.order_limiter,
+                                SQUAREOFF_CONCURRENCY, on_prices=_on_prices, underlying=underlying).start()
+    return StreamingResponse(_ndjson(state.squareoff.follow()), media_type="application/x-ndjson")
+
+
+@app.get("/broker/squareoff")
+def broker_squareoff_status(ok: bool = Depends(require_key)):
+    if state.squareoff is None:
+        raise HTTPException(status_code=404, detail="No square-off has run")
+    return {**state.squareoff.report(), "order_rate": state.order_limiter.stats()}
+
+
+async def _ndjson(events):
+    async for ev in events:
+        yield json.dumps(ev, default=str) + "\n"
 
 
 @app.get("/broker/pnl")
-def broker_pnl(ok: bool = Depends(require_key)):
+async def broker_pnl(request: Request, ok: bool = Depends(require_key)):
+    # Every tick bumps the P&L version, so a cached response is reused for up to READCACHE_PNL_MAX_AGE
+    return await state.readcache.arespond(request, "pnl", _compute_pnl, max_age=READCACHE_PNL_MAX_AGE)
+
+
+async def _compute_pnl() -> dict:
+    # One batched LTP round-trip for every symbol, then compute off the event loop
+    symbols = await run_in_threadpool(_pnl_symbols)
+    prices = await state.broker.altp_many(symbols) if symbols else {}
+    # Not a P&L invalidation: the response being built is priced with these
+    _on_prices(prices, bump_pnl=False)
+
     def ltp_fn(sym: str) -> float:
-        return state.broker.ltp(sym)
+        if sym in prices:
+            return prices[sym]
+        return state.broker.ltp(sym)  # opened since the batch was fetched
+
+    def compute():
+        with SessionLocal() as db:
+            return compute_today_pnl(db, ltp_fn)
+    return await run_in_threadpool(compute)
+
+
+def _pnl_symbols() -> list[str]:
     with SessionLocal() as db:
-        return compute_today_pnl(db, ltp_fn)
+        return sorted({p.symbol for p in todays_positions(db)})
 
 
 @app.post("/broker/pricer")
@@ -226,9 +420,130 @@ def set_pricer(source: str = Body(embed=True), ok: bool = Depends(require_key)):
         state.broker.pricer = state.pricer
     else:
         raise HTTPException(status_code=400, detail="source must be 'zerodha' or 'mock'")
+    state.readcache.bump("instruments", "pnl")
     return {"ok": True, "source": s}
 
 
+# ---------- Triggers ----------
+async def _trigger_exit(position_id: int, trigger, price: float) -> None:
+    """
+    Exit path for fired triggers: the async close path, through the shared order-rate
+    limiter, booked at the trigger price. Runs as a task on the event loop.
+    """
+    res = await _close_at_broker(position_id, price, claimed=True)
+    if not res["ok"]:
+        state.triggers.forget([position_id])    # already closed elsewhere
+        return
+    print(f"Trigger {trigger.kind}#{trigger.id} closed position {position_id} @ {price}")
+
+
+class TriggersIn(BaseModel):
+    sl: Optional[float] = None
+    target: Optional[float] = None
+    trail: Optional[float] = None
+
+
+class ComboTriggerIn(BaseModel):
+    position_ids: list[int]
+    level: float
+    direction: str = ABOVE
+
+
+class TicksIn(BaseModel):
+    prices: dict[str, float]
+
+
+@app.post("/broker/positions/{pos_id}/triggers")
+async def arm_triggers(pos_id: int, payload: TriggersIn, ok: bool = Depends(require_key), db: Session = Depends(get_db)):
+    pos = await run_in_threadpool(db.get, Position, pos_id)
+    if not pos or pos.status == "CLOSED":
+        raise HTTPException(status_code=404, detail="Position not found or already closed")
+
+    # Short legs lose on a rise, long legs on a fall.
+    short = pos.side == "SELL"
+    adverse, favourable = (ABOVE, BELOW) if short else (BELOW, ABOVE)
+    armed = []
+    try:
+        if payload.sl is not None:
+            armed.append(state.triggers.add(pos.id, pos.symbol, "SL", adverse, payload.sl))
+        if payload.target is not None:
+            armed.append(state.triggers.add(pos.id, pos.symbol, "TARGET", favourable, payload.target))
+        if payload.trail is not None:
+            try:
+                anchor = await state.broker.altp(pos.symbol)
+            except Exception:
+                anchor = pos.avg_price
+            armed.append(state.triggers.add_trailing(pos.id, pos.symbol, adverse, payload.trail, anchor))
+    except ValueError as e:
+        for t in armed:
+            state.triggers.remove(t.id)
+        raise HTTPException(status_code=409, detail=str(e))
+    await run_in_threadpool(_save_triggers, armed)
+    return [t.to_dict() for t in armed]
+
+
+def _save_triggers(armed: list) -> None:
+    # Persisted so a restart re-arms them (trigger_store.restore at startup)
+    with SessionLocal() as db:
+        for t in armed:
+            trigger_store.save(db, t)
+        db.commit()
+
+
+@app.post("/broker/triggers/combined")
+def arm_combined_trigger(payload: ComboTriggerIn, ok: bool = Depends(require_key), db: Session = Depends(get_db)):
+    direction = payload.direction.upper()
+    if direction not in (ABOVE, BELOW):
+        raise HTTPException(status_code=400, detail="direction must be 'ABOVE' or 'BELOW'")
+    legs = {}
+    for pid in payload.position_ids:
+        pos = db.get(Position, pid)
+        if not pos or pos.status == "CLOSED":
+            raise HTTPException(status_code=404, detail=f"Position {pid} not found or already closed")
+        legs[pos.id] = pos.symbol
+    try:
+        combo = state.triggers.add_combined(legs, direction, payload.level)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _save_triggers([combo])
+    return combo.to_dict()
+
+
+@app.get("/broker/triggers")
+async def list_triggers(ok: bool = Depends(require_key)):
+    return state.triggers.list()
+
+
+@app.delete("/broker/triggers/{trigger_id}")
+async def delete_trigger(trigger_id: int, ok: bool = Depends(require_key)):
+    if not state.triggers.remove(trigger_id):
+        raise HTTPException(status_code=404, detail="Trigger not found")
+
+    def forget():
+        with SessionLocal() as db:
+            trigger_store.delete(db, [trigger_id])
+            db.commit()
+    await run_in_threadpool(forget)
+    return {"ok": True, "id": trigger_id}
+
+
+@app.get("/broker/journal")
+async def journal_stats(ok: bool = Depends(require_key)):
+    return state.journal.stats()
+
+
+@app.get("/broker/triggers/stats")
+async def trigger_stats(ok: bool = Depends(require_key)):
+    return state.triggers.stats()
+
+
+@app.post("/broker/ticks")
+async def push_ticks(payload: TicksIn, ok: bool = Depends(require_key)):
+    """Feed prices from an external tick source into the trigger engine and strategies."""
+    exits = _on_prices(payload.prices, TICK)
+    return {"ticks": len(payload.prices), "exits": exits}
+
+
 # ---------- Kite Auth ----------
 @app.get("/kite/login", response_class=HTMLResponse)
 def kite_login():
@@ -250,7 +565,7 @@ def kite_callback(request: Request):
     if not (api_key and api_secret and rt):
         return {"error": "Missing params"}
 
-    kite = KiteConnect(api_key=api_key)
+    kite = KiteConnect(api_key=api_key, root=KITE_ROOT)
     try:
         data = kite.generate_session(rt, api_secret=api_secret)
         access_token = data["access_token"]
@@ -270,7 +585,7 @@ def kite_callback(request: Request):
             f.writelines(lines)
 
         if state.pricer and isinstance(state.pricer, ZerodhaData):
-            state.pricer.access_token = access_token
+            state.pricer.set_access_token(access_token)
 
         return {"message": "Access token saved to .env. Restart docker to apply.", "access_token": access_token}
     except Exception as e:
@@ -278,32 +593,417 @@ def kite_callback(request: Request):
 
 
 # ---------- Instruments ----------
+async def _refresh_instruments() -> int:
+    count = await state.pricer.arefresh_instruments()
+    state.readcache.bump("instruments")
+    return count
+
+
 @app.post("/broker/instruments/sync")
-def sync_instruments(ok: bool = Depends(require_key)):
+async def sync_instruments(ok: bool = Depends(require_key)):
     if not isinstance(state.pricer, ZerodhaData):
         raise HTTPException(status_code=400, detail="Zerodha pricer not configured. Switch pricer to 'zerodha' first.")
     try:
-        count = state.pricer.sync_instruments()
+        count = await _refresh_instruments()
         return {"message": f"Synced {count} instruments"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sync failed: {str(e)}")
 
 
 @app.get("/broker/instruments")
-def get_instruments(ok: bool = Depends(require_key)):
+async def get_instruments(request: Request, ok: bool = Depends(require_key)):
+    # Serialized and gzipped once per sync (off the event loop), then served from the read-model cache
     if not state.pricer:
         raise HTTPException(status_code=400, detail="No pricer available")
     try:
-        return state.pricer.get_instruments()
+        if isinstance(state.pricer, ZerodhaData) and state.pricer.instrument_list is None:
+            await _refresh_instruments()
+        return await state.readcache.arespond(request, "instruments", lambda: run_in_threadpool(state.pricer.get_instruments))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching instruments: {e}")
 
 
 @app.get("/broker/options/{underlying}")
-def get_options(underlying: str, ok: bool = Depends(require_key)):
+async def get_options(underlying: str, ok: bool = Depends(require_key)):
     if not isinstance(state.pricer, ZerodhaData):
         raise HTTPException(400, "Pricer is not ZerodhaData")
-    return state.pricer.option_chain(underlying)
+    return await state.pricer.aoption_chain(underlying)
+
+
+# ---------- Analytics ----------
+@app.post("/analytics/refresh")
+def analytics_refresh(start: Optional[date] = None, end: Optional[date] = None, ok: bool = Depends(require_key)):
+    """Rebuilds [start, end] if given, otherwise only the days touched since the last refresh."""
+    with SessionLocal() as db:
+        if start or end:
+            start, end = start or end, end or start
+            if start > end:
+                raise HTTPException(status_code=400, detail="start must be <= end")
+            rows = analytics.refresh_range(db, start, end)
+            db.commit()
+            return {"refreshed": [f"{start}..{end}"], "rows": rows}
+        refreshed = analytics.refresh_incremental(db)
+        db.commit()
+        return {"refreshed": refreshed}
+
+
+@app.get("/analytics/daily")
+def analytics_daily(start: Optional[date] = None, end: Optional[date] = None,
+                    underlying: Optional[str] = None, ok: bool = Depends(require_key)):
+    with SessionLocal() as db:
+        return analytics.daily(db, start, end, underlying)
+
+
+@app.get("/analytics/by-underlying")
+def analytics_by_underlying(start: Optional[date] = None, end: Optional[date] = None, ok: bool = Depends(require_key)):
+    with SessionLocal() as db:
+        return analytics.breakdown(db, "underlying", start, end)
+
+
+@app.get("/analytics/by-expiry")
+def analytics_by_expiry(start: Optional[date] = None, end: Optional[date] = None,
+                        underlying: Optional[str] = None, ok: bool = Depends(require_key)):
+    with SessionLocal() as db:
+        return analytics.breakdown(db, "expiry", start, end, underlying)
+
+
+@app.get("/analytics/summary")
+def analytics_summary(start: Optional[date] = None, end: Optional[date] = None,
+                      underlying: Optional[str] = None, ok: bool = Depends(require_key)):
+    with SessionLocal() as db:
+        return analytics.summary(db, start, end, underlying)
+
+
+# ---------- Strategies ----------
+class StrategyStartIn(BaseModel):
+    underlyings: list[str]
+    workers: Optional[int] = None
+    strikes_each_side: int = 20
+    poll_seconds: float = 1.0      # LTP poll for chain prices while the market is open
+    entry_at: str = "09:20"
+    exit_at: str = "15:15"
+    expiry_exit_at: str = "14:45"
+    delta: float = 0.16
+    lots: int = 1
+    stop_mult: float = 2.0
+
+
+async def _strategy_order(intent: dict) -> dict:
+    """Routes a worker's order intent through the central order path."""
+    if intent["action"] == "exit":
+        res = await _close_at_broker(intent["position_id"], intent["price"])
+        if res.get("in_progress"):
+            res = await _await_exit(intent["position_id"])
+        if res.get("closed"):
+            # Closed by a trigger, square-off or by hand: the leg is flat all the same
+            return {"ok": True, "price": None, "position_id": intent["position_id"]}
+        return res
+    payload = OrderIn(symbol=intent["symbol"], side=intent["side"], qty=intent["qty"],
+                      order_type="LIMIT", price=intent["price"])
+    try:
+        res = await _submit_order(payload)
+    except RiskRejected as e:
+        return {"ok": False, "error": f"risk: {e}"}
+    return {"ok": True, "price": payload.price, "position_id": res["position"]}
+
+
+async def _await_exit(position_id: int, timeout: float = 30.0) -> dict:
+    """Waits for an exit owned by another path (trigger, square-off, manual close) to settle."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while position_id in state.triggers.claimed() and loop.time() < deadline:
+        await asyncio.sleep(0.25)
+    if position_id in state.triggers.claimed():
+        return {"ok": False, "in_progress": True, "error": "exit already in progress"}
+    with SessionLocal() as db:
+        pos = await run_in_threadpool(db.get, Position, position_id)
+        if not pos or pos.status == "CLOSED":
+            return {"ok": False, "closed": True, "error": "position not found or already closed"}
+    return {"ok": False, "error": "exit by another path did not go through"}
+
+
+async def _chain_specs(underlying: str, spot: float, strikes_each_side: int,
+                       expiries: Optional[list[date]] = None) -> list[ChainSpec]:
+    """Chains around `spot` from the instrument dump when pricing from Kite, synthetic ones otherwise."""
+    if isinstance(state.pricer, ZerodhaData):
+        if state.pricer.instrument_list is None:
+            await _refresh_instruments()
+        return [chain_from_instruments(underlying, state.pricer.instrument_list, spot, strikes_each_side, expiry=e)
+                for e in expiries or [None]]
+    return [synthetic_chain(underlying, spot, strikes_each_side, expiry=e) for e in expiries or [None]]
+
+
+async def _poll_strategy_prices() -> None:
+    runner = state.runner
+    if runner is not None:
+        _on_prices(await state.broker.altp_many(runner.symbols))
+
+
+@app.post("/strategy/start")
+async def strategy_start(payload: StrategyStartIn, ok: bool = Depends(require_key)):
+    if state.runner is not None:
+        raise HTTPException(status_code=409, detail="Strategies already running")
+    names = [u.strip().upper() for u in payload.underlyings if u.strip()]
+    spots = await state.broker.altp_many([spot_symbol(u) for u in names])
+    specs = []
+    for u in names:
+        spot = spots.get(spot_symbol(u))
+        if not spot:
+            raise HTTPException(status_code=400, detail=f"No spot price for {u}")
+        specs += await _chain_specs(u, spot, payload.strikes_each_side)
+
+    config = StrangleConfig(
+        entry_at=time.fromisoformat(payload.entry_at),
+        exit_at=time.fromisoformat(payload.exit_at),
+        expiry_exit_at=time.fromisoformat(payload.expiry_exit_at),
+        delta=payload.delta,
+        lots=payload.lots,
+        stop_mult=payload.stop_mult,
+    )
+    state.runner = StrategyRunner(specs, _strategy_order, workers=payload.workers or STRATEGY_WORKERS, config=config)
+    state.runner.start()
+    state.runner.update(spots)
+    state.scheduler.add("strategy-prices", _poll_strategy_prices,
+                        Every(payload.poll_seconds, "09:15", "15:30", days="mon-fri"))
+    return state.runner.status()
+
+
+@app.post("/strategy/stop")
+async def strategy_stop(ok: bool = Depends(require_key)):
+    if state.runner is None:
+        raise HTTPException(status_code=404, detail="No strategies running")
+    state.scheduler.remove("strategy-prices")
+    runner, state.runner = state.runner, None
+    await runner.stop()
+    return runner.status()
+
+
+@app.get("/strategy/status")
+def strategy_status(ok: bool = Depends(require_key)):
+    if state.runner is None:
+        return {"running": False}
+    return {"running": True, **state.runner.status()}
+
+
+@app.get("/risk")
+def risk_status(ok: bool = Depends(require_key)):
+    return state.risk.stats()
+
+
+@app.post("/risk/halt")
+def risk_halt(reason: str = Body("manual halt", embed=True), ok: bool = Depends(require_key)):
+    state.risk.halt(reason)
+    return state.risk.stats()
+
+
+@app.post("/risk/resume")
+def risk_resume(ok: bool = Depends(require_key)):
+    state.risk.resume()
+    return state.risk.stats()
+
+
+class MarginWhatIfIn(BaseModel):
+    symbols: list[str]                     # candidates, each checked on its own against the open book
+    side: str = "SELL"
+    qty: int
+    prices: Optional[list[float]] = None   # last seen prices if omitted
+
+
+@app.get("/risk/margin")
+def risk_margin(ok: bool = Depends(require_key)):
+    """Estimated SPAN + exposure margin of the open book, and usage against RISK_MAX_MARGIN if set."""
+    out = state.margin.portfolio()
+    if RISK_MAX_MARGIN:
+        out["available"] = RISK_MAX_MARGIN
+        out["utilisation"] = round(out["total"] / RISK_MAX_MARGIN, 4)
+    return out
+
+
+@app.post("/risk/margin/what-if")
+def risk_margin_what_if(payload: MarginWhatIfIn, ok: bool = Depends(require_key)):
+    if payload.prices is not None and len(payload.prices) != len(payload.symbols):
+        raise HTTPException(status_code=400, detail="prices must match symbols")
+    results = state.margin.what_if_many(payload.symbols, payload.side, payload.qty, payload.prices)
+    return dict(zip(payload.symbols, results))
+
+
+# ---------- Vol surface ----------
+class VolSurfaceTrackIn(BaseModel):
+    underlyings: list[str]
+    expiries: int = VOLSURF_EXPIRIES     # nearest expiries, plus the monthly
+    strikes_each_side: int = 30
+
+
+def _upcoming_expiries(underlying: str) -> list[date]:
+    today = datetime.now(IST).date()
+    if isinstance(state.pricer, ZerodhaData):
+        return expiries_from_instruments(underlying, state.pricer.instrument_list, today)
+    first = synthetic_chain(underlying, 1.0, 0, today=today).expiry
+    return [first + timedelta(days=7 * i) for i in range(6)]
+
+
+async def _refresh_vol_surface() -> None:
+    symbols = state.volsurface.symbols
+    if symbols:
+        _on_prices(await state.broker.altp_many(symbols))
+        await asyncio.to_thread(state.volsurface.refit)
+
+
+@app.post("/volsurface/track")
+async def volsurface_track(payload: VolSurfaceTrackIn, ok: bool = Depends(require_key)):
+    names = [u.strip().upper() for u in payload.underlyings if u.strip()]
+    spots = await state.broker.altp_many([spot_symbol(u) for u in names])
+    if isinstance(state.pricer, ZerodhaData) and state.pricer.instrument_list is None:
+        await _refresh_instruments()
+    for u in names:
+        spot = spots.get(spot_symbol(u))
+        if not spot:
+            raise HTTPException(status_code=400, detail=f"No spot price for {u}")
+        expiries = surface_expiries(_upcoming_expiries(u), payload.expiries)
+        try:
+            state.volsurface.track(u, await _chain_specs(u, spot, payload.strikes_each_side, expiries))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if state.scheduler.get("vol-surface") is None:
+        state.scheduler.add("vol-surface", _refresh_vol_surface, Every(VOLSURF_SECONDS, "09:15", "15:30", days="mon-fri"))
+    await _refresh_vol_surface()
+    return state.volsurface.stats()
+
+
+@app.delete("/volsurface/{underlying}")
+def volsurface_untrack(underlying: str, ok: bool = Depends(require_key)):
+    if not state.volsurface.untrack(underlying.upper()):
+        raise HTTPException(status_code=404, detail="Underlying not tracked")
+    if not state.volsurface.symbols:
+        state.scheduler.remove("vol-surface")
+    return state.volsurface.stats()
+
+
+@app.get("/volsurface")
+def volsurface_stats(ok: bool = Depends(require_key)):
+    return state.volsurface.stats()
+
+
+@app.get("/volsurface/{underlying}")
+def volsurface_get(underlying: str, ok: bool = Depends(require_key)):
+    try:
+        return state.volsurface.snapshot(underlying.upper())
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Underlying not tracked")
+
+
+@app.get("/volsurface/{underlying}/iv")
+def volsurface_iv(underlying: str, expiry: date, strike: list[float] = Query(...), ok: bool = Depends(require_key)):
+    """Interpolated IVs for one or more strikes (?strike=24000&strike=24500) at any expiry."""
+    try:
+        ivs = state.volsurface.iv(underlying.upper(), strike, expiry)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="No fitted surface for this underlying")
+    return {"underlying": underlying.upper(), "expiry": expiry, "iv": dict(zip(map(str, strike), ivs.tolist()))}
+
+
+# ---------- Tick recorder ----------
+@app.get("/recorder")
+def recorder_stats(ok: bool = Depends(require_key)):
+    if state.recorder is None:
+        return {"enabled": False}
+    return {"enabled": True, **state.recorder.stats()}
+
+
+@app.post("/recorder/flush")
+def recorder_flush(ok: bool = Depends(require_key)):
+    if state.recorder is None:
+        raise HTTPException(status_code=400, detail="Recorder disabled")
+    state.recorder.flush()
+    return {"ok": True}
+
+
+@app.get("/recorder/ticks")
+def recorder_ticks(day: date, underlying: Optional[str] = None, symbol: Optional[str] = None,
+                   limit: int = Query(1000, le=100000), ok: bool = Depends(require_key)):
+    """Flushed rows for one IST day, newest last (capped at `limit`)."""
+    cols = recorder.load(RECORDER_PATH, day, day, underlying, [symbol] if symbol else None)
+    n = len(cols["ts"])
+    sl = slice(max(0, n - limit), n)
+    return {
+        "rows": n,
+        "ts": cols["ts"][sl].tolist(),
+        "symbol": cols["symbol"][sl].tolist(),
+        "price": cols["price"][sl].tolist(),
+        "source": [recorder.SOURCES[s] for s in cols["source"][sl]],
+    }
+
+
+# ---------- Read-model cache ----------
+@app.get("/cache")
+def readcache_stats(ok: bool = Depends(require_key)):
+    return state.readcache.stats()
+
+
+# ---------- Trade storage ----------
+@app.get("/archive")
+def archive_stats(ok: bool = Depends(require_key)):
+    """Hot vs archived row counts; the archive-trades job does the moving."""
+    with SessionLocal() as db:
+        return {"archive_after_days": ARCHIVE_AFTER_DAYS, **archive.stats(db)}
+
+
+# ---------- Scheduler ----------
+def _eod_refresh() -> None:
+    with SessionLocal() as db:
+        refreshed = analytics.refresh_incremental(db)
+        db.commit()
+    print(f"[eod] analytics refreshed: {refreshed}")
+
+
+def _archive_trades() -> None:
+    res = archive.archive_closed(SessionLocal, ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH)
+    if res["positions"]:
+        state.readcache.bump("positions", "orders", "pnl")   # bulk moves bypass the ORM hooks
+    print(f"[archive] moved {res['positions']} positions / {res['orders']} orders closed before {res['cutoff']}")
+
+
+def _prune_triggers() -> None:
+    # Exit claims and saved triggers of positions closed by paths that do not forget them (journal drain)
+    with SessionLocal() as db:
+        trigger_store.prune(db, state.triggers)
+        db.commit()
+
+
+def _save_trail_anchors() -> None:
+    # Ratcheted trailing stops, so a restart re-arms them where they had moved to
+    with SessionLocal() as db:
+        trigger_store.save_anchors(db, state.triggers)
+        db.commit()
+
+
+def _register_jobs(s: Scheduler) -> None:
+    s.add("eod-analytics", _eod_refresh, Cron(EOD_REFRESH_AT, days="mon-fri"), misfire="run", grace=3600)
+    s.add("archive-trades", _archive_trades, Cron(ARCHIVE_AT, days="mon-fri"), misfire="run", grace=3600)
+    s.add("prune-triggers", _prune_triggers, Every(60))
+    s.add("save-trail-anchors", _save_trail_anchors, Every(5))
+
+
+@app.get("/scheduler/jobs")
+def scheduler_jobs(ok: bool = Depends(require_key)):
+    return state.scheduler.jobs()
+
+
+@app.post("/scheduler/jobs/{name}/run")
+async def scheduler_run(name: str, ok: bool = Depends(require_key)):
+    if state.scheduler.get(name) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not state.scheduler.run_now(name):
+        raise HTTPException(status_code=409, detail="Job is already running")
+    return {"ok": True, "name": name}
+
+
+@app.post("/scheduler/jobs/{name}/pause")
+def scheduler_pause(name: str, paused: bool = Body(True, embed=True), ok: bool = Depends(require_key)):
+    if state.scheduler.get(name) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    state.scheduler.pause(name, paused)
+    return {"ok": True, "name": name, "paused": paused}
 
 
 # ---------- UI ----------
@@ -1,14 +1,19 @@
 # app/model.py
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
 from app.db import Base
 
 
 class Position(Base):
     __tablename__ = "positions"
+    __table_args__ = (
+        Index("ix_positions_status_symbol", "status", "symbol"),       # open position for a symbol
+        Index("ix_positions_status_closed_at", "status", "closed_at"),  # closed by date (analytics, archival)
+        Index("ix_positions_opened_at", "opened_at"),                   # today's P&L
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    symbol = Column(String, index=True, nullable=False)
+    symbol = Column(String, nullable=False)
     side = Column(String, nullable=False)                 # "BUY" / "SELL"
     qty = Column(Integer, nullable=False, default=0)
     avg_price = Column(Float, nullable=False, default=0.0)
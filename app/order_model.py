@@ -1,11 +1,12 @@
 # app/order_model.py
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db import Base
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (Index("ix_orders_created_at", "created_at"),)
 
     id = Column(Integer, primary_key=True, index=True)
     position_id = Column(Integer, ForeignKey("positions.id"), nullable=False, index=True)
@@ -15,3 +16,4 @@ class Order(Base):
     price = Column(Float, nullable=False)
     status = Column(String, default="FILLED")     # FILLED / CANCELED / REJECTED / PENDING
     created_at = Column(DateTime, default=datetime.utcnow)
+    journal_id = Column(String, unique=True, index=True, nullable=True)  # order journal txn id (crash recovery)
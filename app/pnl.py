@@ -2,7 +2,7 @@ from __future__ import annotations
 
 # app/pnl.py
 from zoneinfo import ZoneInfo
-from datetime import datetime, date
+from datetime import datetime, date, time, timedelta
 from typing import Callable, Dict, Any, List
 
 from sqlalchemy.orm import Session
@@ -12,6 +12,7 @@ from app.order_model import Order
 
 
 IST = ZoneInfo("Asia/Kolkata")
+UTC = ZoneInfo("UTC")
 
 
 # ---------- helpers ----------
@@ -112,6 +113,19 @@ def compute_position_pnl(
     }
 
 
+def todays_positions(db: Session, today: date | None = None) -> List[Position]:
+    """
+    Positions included in today's P&L.
+    You can change the inclusion rule if you want:
+    currently: positions with opened_at on today's IST date.
+    """
+    today = today or datetime.now(IST).date()
+    # Range on the indexed opened_at column (stored as naive UTC) instead of scanning every position
+    lo = datetime.combine(today, time.min, IST).astimezone(UTC).replace(tzinfo=None)
+    hi = lo + timedelta(days=1)
+    return db.query(Position).filter(Position.opened_at >= lo, Position.opened_at < hi).all()
+
+
 def compute_today_pnl(
     db: Session,
     ltp_fn: Callable[[str], float],
@@ -120,13 +134,7 @@ def compute_today_pnl(
     Aggregates P&L for positions opened 'today' by IST calendar day.
     """
     today = datetime.now(IST).date()
-
-    # You can change the inclusion rule if you want:
-    # currently: positions with opened_at on today's IST date.
-    all_positions: List[Position] = db.query(Position).all()
-    todays_positions = [p for p in all_positions if _is_same_day_ist(p.opened_at, today)]
-
-    per_position = [compute_position_pnl(db, p, ltp_fn) for p in todays_positions]
+    per_position = [compute_position_pnl(db, p, ltp_fn) for p in todays_positions(db, today)]
 
     realized_sum = round(sum(p["realized"] for p in per_position), 2)
     mtm_sum = round(sum(p["mtm"] for p in per_position), 2)
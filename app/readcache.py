@@ -0,0 +1,204 @@
+# app/readcache.py
+"""
+Read-model cache for the hot GET endpoints (positions, orders, P&L,
+instruments). Each read model has a version number that the write paths
+bump; a cached response is the serialized JSON (and its gzip, precompressed
+once) for the version it was built at, so a read of unchanged data is a
+version compare and a memory copy, and a client holding the ETag gets a 304.
+
+Positions/orders versions are bumped from SQLAlchemy commit hooks (see
+`ReadCache.watch`), so every ORM write path (orders, closes, triggers,
+square-off, journal drain) invalidates without having to remember to. Bulk
+statements that bypass the ORM (archival) and instrument syncs bump
+explicitly.
+
+Models that change with every tick (P&L) take a `max_age`: within it the
+cached response is served even if the version has moved on.
+
+Entries live in one LRU bounded by total bytes.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import chain
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+
+
+@dataclass
+class Entry:
+    name: str
+    version: int
+    etag: str
+    body: bytes
+    gz: Optional[bytes]
+    built_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + (len(self.gz) if self.gz else 0)
+
+
+class ReadCache:
+    def __init__(self, max_bytes: int = 64 << 20, gzip_min: int = 1024, gzip_level: int = 6):
+        self.max_bytes = max_bytes
+        self.gzip_min = gzip_min
+        self.gzip_level = gzip_level
+        self._versions: Dict[str, int] = {}
+        self._entries: "OrderedDict[str, Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._evictions = 0
+        self._listeners: list = []
+
+    # ---------- versions ----------
+    def version(self, name: str) -> int:
+        return self._versions.get(name, 0)
+
+    def bump(self, *names: str) -> None:
+        with self._lock:
+            for name in names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    # ---------- entries ----------
+    def lookup(self, name: str, version: int, max_age: Optional[float] = None) -> Optional[Entry]:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or (entry.version != version
+                                 and (max_age is None or time.monotonic() - entry.built_at >= max_age)):
+                self._count(name, "misses")
+                return None
+            self._entries.move_to_end(name)
+            self._count(name, "hits")
+            return entry
+
+    def put(self, name: str, version: int, payload: Any) -> Entry:
+        """Serializes (and precompresses) a payload built at `version`; CPU-bound, keep it off the event loop."""
+        body = json.dumps(jsonable_encoder(payload), separators=(",", ":"), ensure_ascii=False, allow_nan=False).encode()
+        gz = gzip.compress(body, self.gzip_level) if len(body) >= self.gzip_min else None
+        etag = '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+        entry = Entry(name, version, etag, body, gz, time.monotonic())
+        if entry.size > self.max_bytes:
+            return entry                      # served, never cached
+        with self._lock:
+            old = self._entries.pop(name, None)
+            if old is not None:
+                self._bytes -= old.size
+            # A slow build must not overwrite a newer one that finished first
+            if old is not None and old.version > version:
+                entry, old = old, None
+            self._entries[name] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, lru = self._entries.popitem(last=False)
+                self._bytes -= lru.size
+                self._evictions += 1
+        return entry
+
+    def _count(self, name: str, key: str) -> None:
+        s = self._stats.get(name)
+        if s is None:
+            s = self._stats[name] = {"hits": 0, "misses": 0, "not_modified": 0}
+        s[key] += 1
+
+    # ---------- HTTP ----------
+    def respond(self, request: Request, name: str, build: Callable[[], Any], max_age: Optional[float] = None) -> Response:
+        version = self.version(name)
+        entry = self.lookup(name, version, max_age)
+        if entry is None:
+            entry = self.put(name, version, build())
+        return self._response(request, entry, max_age)
+
+    async def arespond(self, request: Request, name: str, build: Callable[[], Awaitable[Any]],
+                       max_age: Optional[float] = None) -> Response:
+        version = self.version(name)
+        entry = self.lookup(name, version, max_age)
+        if entry is None:
+            entry = await run_in_threadpool(self.put, name, version, await build())
+        return self._response(request, entry, max_age)
+
+    def _response(self, request: Request, entry: Entry, max_age: Optional[float]) -> Response:
+        headers = {
+            "ETag": entry.etag,
+            "Cache-Control": f"private, max-age={max_age:g}" if max_age else "private, no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if _etag_match(request.headers.get("if-none-match"), entry.etag):
+            with self._lock:
+                self._count(entry.name, "not_modified")
+            return Response(status_code=304, headers=headers)
+        if entry.gz is not None and "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            return Response(entry.gz, media_type="application/json", headers=headers)
+        return Response(entry.body, media_type="application/json", headers=headers)
+
+    # ---------- invalidation ----------
+    def watch(self, session_factory, models: Dict[type, Iterable[str]]) -> None:
+        """Bumps the read models mapped to an ORM class whenever a session commits changes to it."""
+        models = {cls: tuple(names) for cls, names in models.items()}
+
+        def after_flush(session, flush_context):
+            touched = session.info.setdefault("readcache", set())
+            for obj in chain(session.new, session.dirty, session.deleted):
+                touched.update(models.get(type(obj), ()))
+
+        def after_commit(session):
+            touched = session.info.pop("readcache", None)
+            if touched:
+                self.bump(*touched)
+
+        def after_rollback(session):
+            session.info.pop("readcache", None)
+
+        for name, fn in (("after_flush", after_flush), ("after_commit", after_commit), ("after_rollback", after_rollback)):
+            event.listen(session_factory, name, fn)
+            self._listeners.append((session_factory, name, fn))
+
+    def unwatch(self) -> None:
+        for target, name, fn in self._listeners:
+            event.remove(target, name, fn)
+        self._listeners.clear()
+
+    # ---------- reporting ----------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = {}
+            for name in sorted(set(self._stats) | set(self._versions) | set(self._entries)):
+                s = dict(self._stats.get(name, {"hits": 0, "misses": 0, "not_modified": 0}))
+                served = s["hits"] + s["misses"]
+                entry = self._entries.get(name)
+                models[name] = {
+                    **s,
+                    "hit_rate": round(s["hits"] / served, 4) if served else None,
+                    "version": self._versions.get(name, 0),
+                    "cached_version": entry.version if entry else None,
+                    "bytes": entry.size if entry else 0,
+                    "body_bytes": len(entry.body) if entry else 0,
+                    "gzip_bytes": len(entry.gz) if entry and entry.gz else None,
+                    "age_s": round(time.monotonic() - entry.built_at, 3) if entry else None,
+                }
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+                "models": models,
+            }
+
+
+def _etag_match(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or any((t[2:] if t.startswith("W/") else t) == etag for t in tags)
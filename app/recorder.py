@@ -0,0 +1,241 @@
+# app/recorder.py
+"""
+Records every price the app sees into preallocated numpy column buffers (one
+per underlying) and flushes full or stale buffers off-thread as compressed
+columnar chunks:
+
+    <root>/date=2025-08-14/underlying=NIFTY/part-<first ts ns>-<seq>.npz
+
+Each chunk holds the columns ts (int64 ns, UTC epoch), price (float64),
+symbol (int32 code into the chunk's `symbols` table) and source (uint8 into
+SOURCES). The hot path is a dict lookup and four array stores under a lock;
+compression and file I/O happen on the flush thread.
+"""
+from __future__ import annotations
+
+import glob
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from app.pnl import IST
+from app.symbols import underlying_of
+
+SOURCES = ("ltp", "tick", "quote")
+LTP, TICK, QUOTE = range(3)
+
+
+class _Buffer:
+    __slots__ = ("underlying", "day", "n", "ts", "price", "code", "source", "symbols", "codes")
+
+    def __init__(self, capacity: int):
+        self.ts = np.empty(capacity, np.int64)
+        self.price = np.empty(capacity, np.float64)
+        self.code = np.empty(capacity, np.int32)
+        self.source = np.empty(capacity, np.uint8)
+        self.reset("", None)
+
+    def reset(self, underlying: str, day: Optional[date]) -> None:
+        self.underlying, self.day, self.n = underlying, day, 0
+        self.symbols: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+
+class TickRecorder:
+    def __init__(self, root: str, chunk_rows: int = 65536, flush_seconds: float = 5.0):
+        self.root = root
+        self.chunk_rows = chunk_rows
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._buffers: Dict[str, _Buffer] = {}
+        self._pool: List[_Buffer] = []
+        self._underlying: Dict[str, str] = {}
+        self._queue: "queue.Queue[Optional[_Buffer]]" = queue.Queue()
+        self._day: Optional[date] = None
+        self._day_end_ns = 0
+        self._seq = 0
+        self._thread: Optional[threading.Thread] = None
+        self.recorded = 0
+        self.flushed = 0
+        self.chunks = 0
+        self.bytes_written = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    # ---------- hot path ----------
+    def record(self, symbol: str, price: float, source: int = LTP, ts: Optional[int] = None) -> None:
+        ts = ts or time.time_ns()
+        with self._lock:
+            self._append(symbol, price, source, ts)
+
+    def record_many(self, prices: Dict[str, float], source: int = LTP, ts: Optional[int] = None) -> None:
+        ts = ts or time.time_ns()
+        with self._lock:
+            for symbol, price in prices.items():
+                self._append(symbol, price, source, ts)
+
+    def _append(self, symbol: str, price: float, source: int, ts: int) -> None:
+        if ts >= self._day_end_ns:
+            self._roll_day(ts)
+        und = self._underlying.get(symbol)
+        if und is None:
+            und = self._underlying[symbol] = underlying_of(symbol)
+        buf = self._buffers.get(und)
+        if buf is None:
+            buf = self._buffers[und] = self._take(und)
+        code = buf.codes.get(symbol)
+        if code is None:
+            code = buf.codes[symbol] = len(buf.symbols)
+            buf.symbols.append(symbol)
+        i = buf.n
+        buf.ts[i] = ts
+        buf.price[i] = price
+        buf.code[i] = code
+        buf.source[i] = source
+        buf.n = i + 1
+        self.recorded += 1
+        if buf.n == self.chunk_rows:
+            self._queue.put(self._buffers.pop(und))
+
+    def _take(self, underlying: str) -> _Buffer:
+        buf = self._pool.pop() if self._pool else _Buffer(self.chunk_rows)
+        buf.reset(underlying, self._day)
+        return buf
+
+    def _roll_day(self, ts: int) -> None:
+        # Partitions follow the IST trading day; hand over everything from the previous day
+        self._swap_all()
+        now = datetime.fromtimestamp(ts / 1e9, IST)
+        self._day = now.date()
+        end = datetime.combine(self._day + timedelta(days=1), dtime.min, IST)
+        self._day_end_ns = int(end.timestamp()) * 1_000_000_000
+
+    def _swap_all(self) -> None:
+        for buf in self._buffers.values():
+            if buf.n:
+                self._queue.put(buf)
+            else:
+                self._pool.append(buf)
+        self._buffers = {}
+
+    # ---------- flushing (background thread) ----------
+    def start(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        self._thread = threading.Thread(target=self._flush_loop, name="tick-recorder", daemon=True)
+        self._thread.start()
+
+    def flush(self) -> None:
+        """Hands every partially filled buffer to the flush thread."""
+        with self._lock:
+            self._swap_all()
+
+    def close(self) -> None:
+        self.flush()
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join()
+
+    def _flush_loop(self) -> None:
+        next_flush = time.monotonic() + self.flush_seconds
+        while True:
+            try:
+                buf = self._queue.get(timeout=max(0.0, next_flush - time.monotonic()))
+            except queue.Empty:
+                buf = False
+            if buf is None:
+                return
+            if buf:
+                self._write(buf)
+                with self._lock:
+                    self._pool.append(buf)
+            if time.monotonic() >= next_flush:
+                self.flush()
+                next_flush = time.monotonic() + self.flush_seconds
+
+    def _write(self, buf: _Buffer) -> None:
+        n = buf.n
+        folder = os.path.join(self.root, f"date={buf.day.isoformat()}", f"underlying={quote(buf.underlying, safe='')}")
+        self._seq += 1
+        path = os.path.join(folder, f"part-{int(buf.ts[0]):019d}-{self._seq:06d}.npz")
+        try:
+            os.makedirs(folder, exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                np.savez_compressed(
+                    f,
+                    ts=buf.ts[:n],
+                    price=buf.price[:n],
+                    symbol=buf.code[:n],
+                    source=buf.source[:n],
+                    symbols=np.array(buf.symbols),
+                )
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"[recorder] failed to write {path}: {self.last_error}")
+            return
+        self.flushed += n
+        self.chunks += 1
+        self.bytes_written += os.path.getsize(path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            buffered = sum(b.n for b in self._buffers.values())
+        return {
+            "root": self.root,
+            "recorded": self.recorded,
+            "buffered": buffered,
+            "pending_chunks": self._queue.qsize(),
+            "flushed": self.flushed,
+            "chunks": self.chunks,
+            "bytes_written": self.bytes_written,
+            "bytes_per_row": round(self.bytes_written / self.flushed, 2) if self.flushed else None,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+
+# ---------- reading ----------
+def iter_chunks(root: str, start: Optional[date] = None, end: Optional[date] = None,
+                underlying: Optional[str] = None, symbols: Optional[Sequence[str]] = None) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Streams recorded chunks as dicts of numpy columns (ts, price, symbol, source),
+    ordered by day, then underlying, then time. `symbol` is decoded to strings.
+    """
+    for day_dir in sorted(glob.glob(os.path.join(root, "date=*"))):
+        day = date.fromisoformat(os.path.basename(day_dir)[5:])
+        if (start and day < start) or (end and day > end):
+            continue
+        for und_dir in sorted(glob.glob(os.path.join(day_dir, "underlying=*"))):
+            if underlying and unquote(os.path.basename(und_dir)[11:]) != underlying.upper():
+                continue
+            for path in sorted(glob.glob(os.path.join(und_dir, "part-*.npz"))):
+                with np.load(path) as z:
+                    table, codes = z["symbols"], z["symbol"]
+                    chunk = {"ts": z["ts"], "price": z["price"], "source": z["source"]}
+                if symbols is not None:
+                    mask = np.isin(codes, np.nonzero(np.isin(table, list(symbols)))[0])
+                    if not mask.any():
+                        continue
+                    chunk = {k: v[mask] for k, v in chunk.items()}
+                    codes = codes[mask]
+                chunk["symbol"] = table[codes]
+                yield chunk
+
+
+def load(root: str, start: Optional[date] = None, end: Optional[date] = None,
+         underlying: Optional[str] = None, symbols: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+    """All matching rows as one set of columns, sorted by time."""
+    chunks = list(iter_chunks(root, start, end, underlying, symbols))
+    if not chunks:
+        return {"ts": np.empty(0, np.int64), "price": np.empty(0), "source": np.empty(0, np.uint8),
+                "symbol": np.empty(0, dtype=str)}
+    out = {k: np.concatenate([c[k] for c in chunks]) for k in chunks[0]}
+    order = np.argsort(out["ts"], kind="stable")
+    return {k: v[order] for k, v in out.items()}
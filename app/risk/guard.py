@@ -1 +1,124 @@
-# Risk management module placeholder
+# app/risk/guard.py
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.analytics import realised_on
+from app.model import Position
+from app.pnl import IST
+from app.risk.margin import MarginEstimator
+from app.symbols import underlying_of
+
+
+class RiskRejected(Exception):
+    """An order that would open or add exposure was refused by the global risk guard."""
+
+
+@dataclass
+class Hold:
+    """Exposure reserved for an order between the risk check and its booking."""
+    underlying: str
+    qty: int
+    margin: float = 0.0
+
+
+class RiskGuard:
+    """
+    Global pre-trade checks on the central order path. Orders that only reduce
+    an open position always pass. Orders that add exposure (including an
+    opposite-side order larger than the open qty, whose excess flips the
+    position) are checked against open-position and per-underlying quantity
+    limits (counting in-flight orders), the day's realised loss and, with a
+    margin estimator, the estimated margin after the order. Breaching the loss
+    limit halts new entries until resume(). A limit of 0 disables that check.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], max_open_positions: int = 0,
+                 max_qty_per_underlying: int = 0, max_daily_loss: float = 0.0,
+                 margin: Optional[MarginEstimator] = None, max_margin: float = 0.0):
+        self.session_factory = session_factory
+        self.max_open_positions = max_open_positions
+        self.max_qty_per_underlying = max_qty_per_underlying
+        self.max_daily_loss = max_daily_loss
+        self.margin = margin
+        self.max_margin = max_margin
+        self.halted: Optional[str] = None
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, int] = {}      # underlying -> reserved qty
+        self._inflight_orders = 0
+        self._inflight_margin = 0.0
+        self._accepted = 0
+        self._rejected = 0
+
+    def reserve(self, symbol: str, side: str, qty: int, price: Optional[float] = None) -> Hold:
+        """Checks the order and reserves its exposure; raises RiskRejected. Release the hold once booked or failed."""
+        with self.session_factory() as db, self._lock:
+            open_positions = db.query(Position).filter(Position.status == "OPEN").all()
+            # Opposite side of an open position: only the qty beyond it adds exposure
+            offset = sum(p.qty for p in open_positions if p.symbol == symbol and p.side != side.upper())
+            if qty <= offset:
+                self._accepted += 1
+                return Hold(underlying_of(symbol), 0)  # reduces exposure
+            adds = qty - offset
+
+            und = underlying_of(symbol)
+            reason = self.halted
+            if reason is None and self.max_daily_loss:
+                realised = realised_on(db, datetime.now(IST).date())
+                if realised <= -self.max_daily_loss:
+                    reason = self.halted = f"daily loss limit hit ({realised:.2f})"
+            if reason is None and self.max_open_positions and not any(p.symbol == symbol for p in open_positions):
+                if len(open_positions) + self._inflight_orders + 1 > self.max_open_positions:
+                    reason = f"max open positions ({self.max_open_positions}) reached"
+            if reason is None and self.max_qty_per_underlying:
+                held = sum(p.qty for p in open_positions if underlying_of(p.symbol) == und) - offset
+                if held + self._inflight.get(und, 0) + adds > self.max_qty_per_underlying:
+                    reason = f"{und} quantity limit ({self.max_qty_per_underlying}) reached"
+            margin = 0.0
+            if reason is None and self.max_margin and self.margin is not None:
+                est = self.margin.what_if(symbol, side, qty, price, open_positions)
+                margin = max(est["increment"], 0.0)
+                needed = est["after"] + self._inflight_margin
+                if needed > self.max_margin:
+                    reason = f"margin limit ({self.max_margin:.0f}) exceeded: {needed:.0f} needed"
+            if reason is not None:
+                self._rejected += 1
+                raise RiskRejected(reason)
+
+            self._inflight[und] = self._inflight.get(und, 0) + adds
+            self._inflight_orders += 1
+            self._inflight_margin += margin
+            self._accepted += 1
+            return Hold(und, adds, margin)
+
+    def release(self, hold: Hold) -> None:
+        if not hold.qty:
+            return
+        with self._lock:
+            self._inflight[hold.underlying] -= hold.qty
+            self._inflight_orders -= 1
+            self._inflight_margin -= hold.margin
+
+    def halt(self, reason: str = "manual halt") -> None:
+        self.halted = reason
+
+    def resume(self) -> None:
+        self.halted = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "halted": self.halted,
+            "max_open_positions": self.max_open_positions,
+            "max_qty_per_underlying": self.max_qty_per_underlying,
+            "max_daily_loss": self.max_daily_loss,
+            "max_margin": self.max_margin,
+            "inflight_margin": round(self._inflight_margin, 2),
+            "inflight": {u: q for u, q in self._inflight.items() if q},
+            "accepted": self._accepted,
+            "rejected": self._rejected,
+        }
@@ -0,0 +1,245 @@
+# app/risk/margin.py
+"""
+Local approximation of exchange SPAN + exposure margin, so margin usage and
+pre-trade what-ifs do not need a broker margin call per candidate.
+
+SPAN part: every leg is revalued under a 16-scenario array (price moves of
+0, +-1/3, +-2/3, +-1 price-scan range, each with vol up and down by the vol
+scan range, plus two extreme moves of EXTREME_MULT x the range, with only
+EXTREME_COVER of that loss counted). Losses are summed per underlying before
+taking the worst scenario, so strangles, spreads and hedges get their offset
+benefit; there is no credit across underlyings.
+
+Exposure part: `exposure_pct` of notional (spot x qty) on short options and
+on futures either side. Premium paid for long options is reported separately.
+
+The open book's scenario matrix is cached, so a what-if for a candidate order
+only revalues the candidate (16 prices) and one underlying's column.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.greeks import MIN_VOL, RATE, bs_price, implied_vol, year_fraction
+from app.pnl import IST
+from app.symbols import parse_option, spot_symbol, underlying_of
+
+EXTREME_MULT = 2.0
+EXTREME_COVER = 0.35
+_MOVES = np.array([0, 0, 1, 1, -1, -1, 2, 2, -2, -2, 3, 3, -3, -3, 0, 0], dtype=float) / 3.0
+_VOLS = np.array([1, -1] * 7 + [0, 0], dtype=float)
+_MOVES[14:] = [EXTREME_MULT, -EXTREME_MULT]
+_WEIGHTS = np.array([1.0] * 14 + [EXTREME_COVER] * 2)
+N_SCENARIOS = len(_MOVES)
+_GRID_MOVES = np.concatenate(([0.0], _MOVES))     # row 0 values the leg as it stands
+_GRID_VOLS = np.concatenate(([0.0], _VOLS))
+
+LINEAR, CALL, PUT = 0, 1, 2
+
+
+@dataclass
+class Legs:
+    """Instruments as parallel arrays; qty is signed (short < 0)."""
+    underlying: List[str]
+    kind: np.ndarray
+    spot: np.ndarray
+    strike: np.ndarray
+    t: np.ndarray
+    vol: np.ndarray
+    value: np.ndarray
+    qty: np.ndarray
+    grid: np.ndarray = None   # (N_SCENARIOS, legs) revalued unit prices
+
+
+@dataclass
+class _Book:
+    signature: Tuple
+    built_at: float
+    underlyings: Dict[str, int]
+    pnl: np.ndarray           # (N_SCENARIOS, underlyings) scenario P&L of the open book
+    exposure: np.ndarray      # per underlying
+    premium: np.ndarray       # per underlying, long option premium at current value
+
+
+class MarginEstimator:
+    def __init__(self, session_factory=None, volsurface=None, price_scan: float = 0.06, vol_scan: float = 0.04,
+                 exposure_pct: float = 0.02, default_vol: float = 0.15, max_age: float = 1.0, r: float = RATE):
+        self.session_factory = session_factory
+        self.volsurface = volsurface
+        self.price_scan = price_scan
+        self.vol_scan = vol_scan
+        self.exposure_pct = exposure_pct
+        self.default_vol = default_vol
+        self.max_age = max_age
+        self.r = r
+        self._prices: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._book: Optional[_Book] = None
+
+    def update(self, prices: Dict[str, float]) -> None:
+        self._prices.update(prices)
+
+    # ---------- legs ----------
+    def legs(self, items: Iterable[Tuple[str, int, Optional[float]]], now: Optional[datetime] = None) -> Legs:
+        """(symbol, signed qty, price or None for the last seen) -> Legs, valued at current spot and vol."""
+        now = now or datetime.now(IST)
+        items = list(items)
+        prices = self._prices
+        unds, kind, spot, strike, t, qty, price, opt_idx = [], [], [], [], [], [], [], []
+        for i, (symbol, q, px) in enumerate(items):
+            px = prices.get(symbol) if px is None else px
+            opt = parse_option(symbol)
+            if opt is None:
+                und = underlying_of(symbol)
+                px = prices.get(spot_symbol(und)) if px is None else px   # futures with no quote: at spot
+                unds.append(und)
+                kind.append(LINEAR)
+                spot.append(px if px is not None else np.nan)
+                strike.append(0.0)
+                t.append(0.0)
+            else:
+                s = prices.get(spot_symbol(opt.name))
+                unds.append(opt.name)
+                kind.append(CALL if opt.is_call else PUT)
+                spot.append(s if s is not None else opt.strike)   # no spot seen yet: value as at-the-money
+                strike.append(opt.strike)
+                t.append(year_fraction(opt.expiry, now))
+                opt_idx.append(i)
+            qty.append(q)
+            price.append(px if px is not None else np.nan)
+
+        kind = np.array(kind, dtype=np.int8)
+        legs = Legs(unds, kind, np.array(spot, float), np.array(strike, float), np.array(t, float),
+                    np.zeros(len(kind)), np.array(price, float), np.array(qty, float))
+        # Nothing seen for a future or for an option's spot: it cannot be valued, so it contributes nothing
+        dead = ~np.isfinite(legs.spot)
+        if dead.any():
+            legs.qty[dead], legs.spot[dead], legs.value[dead] = 0.0, 1.0, 0.0
+        if opt_idx:
+            self._vols(legs, np.array(opt_idx), items)
+
+        # One pricing pass for the current value (row 0) and every scenario
+        s = legs.spot * (1.0 + self.price_scan * _GRID_MOVES[:, None])
+        v = np.maximum(legs.vol + self.vol_scan * _GRID_VOLS[:, None], MIN_VOL)
+        lin = kind == LINEAR
+        grid = s if lin.all() else np.where(lin, s, bs_price(s, legs.strike, legs.t, v, kind == CALL, self.r))
+        # Options with no quote are valued off the vol we settled on
+        legs.value = np.where(np.isfinite(legs.value), legs.value, grid[0])
+        legs.value[lin] = legs.spot[lin]
+        legs.grid = grid[1:]
+        return legs
+
+    def _vols(self, legs: Legs, idx: np.ndarray, items: list) -> None:
+        # Surface vol where one is fitted, else implied from the quote, else the default
+        vol = np.full(idx.size, np.nan)
+        surface = self.volsurface
+        if surface is not None:
+            for j, i in enumerate(idx):
+                opt = parse_option(items[i][0])
+                try:
+                    vol[j] = surface.iv(opt.name, opt.strike, opt.expiry)
+                except KeyError:
+                    pass
+        need = ~np.isfinite(vol) & np.isfinite(legs.value[idx])
+        if need.any():
+            k = idx[need]
+            vol[need] = implied_vol(legs.value[k], legs.spot[k], legs.strike[k], legs.t[k], legs.kind[k] == CALL, self.r)
+        vol[~np.isfinite(vol)] = self.default_vol
+        legs.vol[idx] = vol
+
+    # ---------- scenarios ----------
+    def scenario_pnl(self, legs: Legs) -> np.ndarray:
+        """(N_SCENARIOS, legs) weighted P&L of each leg, qty included."""
+        return (legs.grid - legs.value) * legs.qty * _WEIGHTS[:, None]
+
+    def _exposure(self, legs: Legs) -> np.ndarray:
+        short_opt = (legs.kind != LINEAR) & (legs.qty < 0)
+        charged = short_opt | ((legs.kind == LINEAR) & (legs.qty != 0))
+        return np.where(charged, self.exposure_pct * legs.spot * np.abs(legs.qty), 0.0)
+
+    @staticmethod
+    def _premium(legs: Legs) -> np.ndarray:
+        return np.where((legs.kind != LINEAR) & (legs.qty > 0), legs.value * legs.qty, 0.0)
+
+    # ---------- open book ----------
+    def _positions(self, positions: Optional[Sequence[Any]]) -> Sequence[Any]:
+        if positions is not None:
+            return positions
+        from app.model import Position
+        with self.session_factory() as db:
+            return db.query(Position).filter(Position.status == "OPEN").all()
+
+    def book(self, positions: Optional[Sequence[Any]] = None) -> _Book:
+        """The cached open-book scenario matrix; rebuilt when positions change or it is older than max_age."""
+        items = [(p.symbol, -p.qty if p.side == "SELL" else p.qty, None) for p in self._positions(positions)]
+        sig = tuple(sorted((s, q) for s, q, _ in items))
+        book = self._book
+        if book is not None and book.signature == sig and time.monotonic() - book.built_at < self.max_age:
+            return book
+        with self._lock:
+            legs = self.legs(items)
+            names = sorted(set(legs.underlying))
+            index = {u: i for i, u in enumerate(names)}
+            col = np.array([index[u] for u in legs.underlying], dtype=np.intp)
+            pnl = np.zeros((N_SCENARIOS, len(names)))
+            exposure = np.zeros(len(names))
+            premium = np.zeros(len(names))
+            if items:
+                np.add.at(pnl.T, col, self.scenario_pnl(legs).T)
+                np.add.at(exposure, col, self._exposure(legs))
+                np.add.at(premium, col, self._premium(legs))
+            self._book = book = _Book(sig, time.monotonic(), index, pnl, exposure, premium)
+        return book
+
+    def portfolio(self, positions: Optional[Sequence[Any]] = None) -> Dict[str, Any]:
+        book = self.book(positions)
+        span = _span(book.pnl)
+        per = {
+            u: {"span": _r(span[i]), "exposure": _r(book.exposure[i]), "premium": _r(book.premium[i]),
+                "total": _r(span[i] + book.exposure[i]),
+                "worst_scenario": int(np.argmin(book.pnl[:, i]))}
+            for u, i in book.underlyings.items()
+        }
+        return {
+            "span": _r(span.sum()),
+            "exposure": _r(book.exposure.sum()),
+            "premium": _r(book.premium.sum()),
+            "total": _r(span.sum() + book.exposure.sum()),
+            "underlyings": per,
+        }
+
+    # ---------- what-if ----------
+    def what_if(self, symbol: str, side: str, qty: int, price: Optional[float] = None,
+                positions: Optional[Sequence[Any]] = None) -> Dict[str, float]:
+        """Margin before and after adding one order to the open book."""
+        return self.what_if_many([symbol], side, qty, None if price is None else [price], positions)[0]
+
+    def what_if_many(self, symbols: Sequence[str], side: str, qty: int, prices: Optional[Sequence[float]] = None,
+                     positions: Optional[Sequence[Any]] = None) -> List[Dict[str, float]]:
+        """Independent what-ifs for several candidates (e.g. every strike of a chain) in one vectorized pass."""
+        book = self.book(positions)
+        signed = -qty if side.upper() == "SELL" else qty
+        legs = self.legs([(s, signed, None if prices is None else prices[i]) for i, s in enumerate(symbols)])
+        cand = self.scenario_pnl(legs)                                   # (N_SCENARIOS, candidates)
+        col = np.array([book.underlyings.get(u, -1) for u in legs.underlying])
+        base = np.where(col >= 0, book.pnl[:, np.maximum(col, 0)], 0.0) if book.underlyings else np.zeros_like(cand)
+        before = _span(book.pnl).sum() + book.exposure.sum()
+        after = before - _span(base) + _span(base + cand) + self._exposure(legs)
+        premium = self._premium(legs)
+        return [{"before": _r(before), "after": _r(a), "increment": _r(a - before), "premium": _r(p)}
+                for a, p in zip(after, premium)]
+
+
+def _span(pnl: np.ndarray) -> np.ndarray:
+    # Worst scenario loss per column; a book that gains in every scenario needs none
+    return -pnl.min(axis=0, initial=0.0)
+
+
+def _r(x: float) -> float:
+    return round(float(x), 2)
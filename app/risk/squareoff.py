@@ -0,0 +1,291 @@
+# app/risk/squareoff.py
+"""
+Emergency square-off of the open book (the kill switch).
+
+One run snapshots every open position (optionally one underlying), claims
+each against the trigger engine so no SL/target fires on it meanwhile, and
+prices them all with a single batched LTP call. Exits then go out in two
+waves: short legs first, biggest premium at risk first, then the long hedges
+of each underlying whose shorts are all gone (a hedge is never sold while the
+short it covers is still open). Within a wave orders are placed concurrently,
+at most `concurrency` in flight and no faster than the shared order-rate
+bucket allows. Every exit is journaled (intent, then broker ack) like a
+single close. Fills are booked in one DB transaction per BOOK_INTERVAL
+(one in all for a book that fits in the rate-limit burst), well inside the
+journal's drain age, so the drainer only steps in if a commit fails.
+
+Progress is kept as a list of events that any number of clients can follow
+while the run continues independently of them.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from app.book import book_close, reverse_side
+from app.model import Position
+from app.symbols import underlying_of
+
+PENDING, SUBMITTED, FILLED, FAILED, SKIPPED = "pending", "submitted", "filled", "failed", "skipped"
+BOOK_INTERVAL = 0.5   # seconds between booking transactions while exits are still going out
+
+
+@dataclass
+class Leg:
+    position_id: int
+    symbol: str
+    side: str
+    qty: int
+    avg_price: float
+    underlying: str
+    price: Optional[float] = None
+    txn: Optional[str] = None
+    status: str = PENDING
+    error: Optional[str] = None
+    order: Any = None
+
+    @property
+    def short(self) -> bool:
+        return self.side == "SELL"
+
+    @property
+    def at_risk(self) -> float:
+        return (self.price if self.price is not None else self.avg_price) * self.qty
+
+
+class SquareOff:
+    def __init__(self, session_factory, broker, journal, triggers, limiter, concurrency: int = 10,
+                 on_prices: Optional[Callable[[Dict[str, float]], Any]] = None, underlying: Optional[str] = None):
+        self.session_factory = session_factory
+        self.broker = broker
+        self.journal = journal
+        self.triggers = triggers
+        self.limiter = limiter
+        self.on_prices = on_prices
+        self.underlying = underlying.upper() if underlying else None
+        self._sem = asyncio.Semaphore(max(1, concurrency))
+        self.legs: List[Leg] = []
+        self.events: List[Dict[str, Any]] = []
+        self.started_at = time.time()
+        self.finished = False
+        self._t0 = time.perf_counter()
+        self._cond = asyncio.Condition()
+        self._fills: List[Leg] = []
+        self._exits_done = asyncio.Event()
+        self.transactions = 0
+        self._task: Optional[asyncio.Task] = None
+
+    # ---------- lifecycle ----------
+    def start(self) -> "SquareOff":
+        """Runs in its own task, so a caller that disconnects does not stop the square-off."""
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def wait(self) -> None:
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def follow(self) -> AsyncIterator[Dict[str, Any]]:
+        """Every event from the start of the run, then new ones as they happen, until it finishes."""
+        i = 0
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: i < len(self.events) or self.finished)
+                batch = self.events[i:]
+            for ev in batch:
+                yield ev
+            i += len(batch)
+            if self.finished and i >= len(self.events):
+                return
+
+    async def _emit(self, event: str, leg: Optional[Leg] = None, **data) -> None:
+        ev = {"event": event, "ms": round((time.perf_counter() - self._t0) * 1000, 1)}
+        if leg is not None:
+            ev.update(position_id=leg.position_id, symbol=leg.symbol, side=leg.side, qty=leg.qty, price=leg.price)
+        ev.update(data)
+        async with self._cond:
+            self.events.append(ev)
+            self._cond.notify_all()
+
+    async def _run(self) -> None:
+        try:
+            await self._square_off()
+        except Exception as e:
+            print(f"Square-off error: {e}")
+            await self._emit("error", error=str(e))
+        finally:
+            await self._emit("done", **{**self.summary(), "running": False})
+            async with self._cond:
+                self.finished = True
+                self._cond.notify_all()
+
+    # ---------- phases ----------
+    async def _square_off(self) -> None:
+        legs = await asyncio.to_thread(self._snapshot)
+        claimed = []
+        for leg in legs:
+            if self.triggers.claim(leg.position_id):
+                claimed.append(leg)
+            else:
+                leg.status, leg.error = SKIPPED, "exit already in progress"
+        self.legs = legs
+        await self._emit("snapshot", legs=len(legs), shorts=sum(l.short for l in claimed),
+                         hedges=sum(not l.short for l in claimed), skipped=len(legs) - len(claimed))
+        for leg in legs:
+            if leg.status == SKIPPED:
+                await self._emit(SKIPPED, leg, reason=leg.error)
+        if not claimed:
+            return
+
+        await self._price(claimed)
+        booker = asyncio.create_task(self._booker())
+        try:
+            await self._exits(claimed)
+        finally:
+            self._exits_done.set()
+            await booker
+
+    async def _exits(self, claimed: List[Leg]) -> None:
+        shorts = sorted((l for l in claimed if l.short), key=lambda l: -l.at_risk)
+        hedges = sorted((l for l in claimed if not l.short), key=lambda l: -l.at_risk)
+
+        await asyncio.gather(*(self._exit(l) for l in shorts), return_exceptions=True)
+        # Shorts skipped because another exit owns them may still be open too
+        exposed = {l.underlying for l in self.legs if l.short and l.status != FILLED}
+        for leg in hedges:
+            if leg.underlying in exposed:
+                leg.status, leg.error = SKIPPED, f"short legs on {leg.underlying} still open"
+                self.triggers.release(leg.position_id)
+                await self._emit(SKIPPED, leg, reason=leg.error)
+        await asyncio.gather(*(self._exit(l) for l in hedges if l.status == PENDING), return_exceptions=True)
+
+    def _snapshot(self) -> List[Leg]:
+        with self.session_factory() as db:
+            rows = db.query(Position).filter(Position.status == "OPEN").order_by(Position.id).all()
+            legs = [Leg(p.id, p.symbol, p.side, p.qty, p.avg_price, underlying_of(p.symbol)) for p in rows]
+        if self.underlying:
+            legs = [l for l in legs if l.underlying == self.underlying]
+        return legs
+
+    async def _price(self, legs: List[Leg]) -> None:
+        # One batched quote for the whole book; a leg with no quote is booked at its average price
+        try:
+            prices = await self.broker.altp_many([l.symbol for l in legs])
+        except Exception as e:
+            print(f"Square-off LTP error: {e}")
+            prices = {}
+        if prices and self.on_prices:
+            self.on_prices(prices)
+        for leg in legs:
+            leg.price = prices.get(leg.symbol, leg.avg_price)
+        await self._emit("priced", quoted=sum(l.symbol in prices for l in legs), legs=len(legs))
+
+    async def _exit(self, leg: Leg) -> None:
+        """One leg's exit; an error fails that leg (releasing its claim) without stopping the wave."""
+        try:
+            await self._place(leg)
+        except Exception as e:
+            print(f"Square-off exit error on {leg.symbol}: {e}")
+            if leg.order is not None:
+                return                        # reached the broker: booked with the fills, the claim stays
+            if leg.txn is not None:
+                try:
+                    self.journal.fail(leg.txn, str(e))
+                except Exception:
+                    pass
+            self.triggers.release(leg.position_id)
+            leg.status, leg.error = FAILED, str(e)
+            try:
+                await self._emit(FAILED, leg, error=leg.error)
+            except Exception:
+                pass
+
+    async def _place(self, leg: Leg) -> None:
+        async with self._sem:
+            leg.txn = self.journal.begin("close", {"position_id": leg.position_id, "symbol": leg.symbol, "qty": leg.qty})
+            await self.limiter.acquire()
+            leg.status = SUBMITTED
+            await self._emit(SUBMITTED, leg)
+            try:
+                leg.order = await self.broker.aplace_order(symbol=leg.symbol, side=reverse_side(leg.side), qty=leg.qty)
+            except Exception as e:
+                self.journal.fail(leg.txn, str(e))
+                self.triggers.release(leg.position_id)
+                leg.status, leg.error = FAILED, str(e)
+                await self._emit(FAILED, leg, error=leg.error)
+                return
+            try:
+                await asyncio.to_thread(self.journal.ack, leg.txn, {"price": leg.price, "broker_response": leg.order})
+            except Exception as e:
+                print(f"Square-off close {leg.txn} filled but not acked (recovery flags it for reconciliation): {e}")
+            leg.status = FILLED
+            self._fills.append(leg)
+            await self._emit(FILLED, leg, broker_response=leg.order)
+
+    async def _booker(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._exits_done.wait(), BOOK_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            batch, self._fills = self._fills, []
+            if batch:
+                await self._book(batch)
+            if self._exits_done.is_set() and not self._fills:
+                return
+
+    async def _book(self, legs: List[Leg]) -> None:
+        def book() -> int:
+            with self.session_factory() as db:
+                try:
+                    positions = {p.id: p for p in db.query(Position).filter(Position.id.in_([l.position_id for l in legs]))}
+                    n = 0
+                    for leg in legs:
+                        pos = positions.get(leg.position_id)
+                        if pos is not None and pos.status != "CLOSED":
+                            book_close(db, pos, leg.price, journal_id=leg.txn)
+                            n += 1
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+            for leg in legs:
+                self.journal.done(leg.txn)
+            self.triggers.forget([l.position_id for l in legs])
+            return n
+
+        self.transactions += 1
+        try:
+            n = await asyncio.to_thread(book)
+        except Exception as e:
+            print(f"Square-off booked in journal, DB write deferred: {e}")
+            await self._emit("booked", positions=0, pending=len(legs), error=str(e))
+            return
+        await self._emit("booked", positions=n, pending=0)
+
+    # ---------- reporting ----------
+    def summary(self) -> Dict[str, Any]:
+        counts = {s: 0 for s in (PENDING, SUBMITTED, FILLED, FAILED, SKIPPED)}
+        for leg in self.legs:
+            counts[leg.status] += 1
+        return {
+            "underlying": self.underlying,
+            "started_at": self.started_at,
+            "elapsed_ms": round((time.perf_counter() - self._t0) * 1000, 1),
+            "running": not self.finished,
+            "legs": len(self.legs),
+            **counts,
+            "transactions": self.transactions,
+        }
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            **self.summary(),
+            "positions": [
+                {"position_id": l.position_id, "symbol": l.symbol, "side": l.side, "qty": l.qty,
+                 "price": l.price, "status": l.status, "error": l.error, "journal_id": l.txn}
+                for l in self.legs
+            ],
+        }
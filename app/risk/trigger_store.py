@@ -0,0 +1,98 @@
+# app/risk/trigger_store.py
+"""
+Persistence for the in-memory trigger engine. Arming endpoints save each
+trigger; at startup restore() re-arms every trigger whose positions are all
+still open (under its original id) and deletes the rest. prune() is the
+periodic cleanup: claims and rows of positions that have since closed.
+
+Trailing stops are re-armed from their saved anchor. save_anchors() runs
+every few seconds and writes the anchors that ratcheted since its last run,
+so after a restart a trailing stop is at most that interval looser than it
+was, never tighter.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Set, Union
+
+from sqlalchemy import bindparam
+from sqlalchemy.orm import Session
+
+from app.model import Position
+from app.risk.triggers import ComboTrigger, Trigger, TriggerEngine
+from app.trigger_model import TriggerRow
+
+
+def save(db: Session, trig: Union[Trigger, ComboTrigger]) -> None:
+    """Caller commits."""
+    if isinstance(trig, ComboTrigger):
+        db.add(TriggerRow(id=trig.id, kind=trig.kind, direction=trig.direction, level=trig.level,
+                          position_ids=",".join(map(str, trig.position_ids)), symbols=",".join(trig.symbols)))
+    else:
+        db.add(TriggerRow(id=trig.id, kind=trig.kind, direction=trig.direction, level=trig.level,
+                          trail=trig.trail, anchor=trig.anchor,
+                          position_ids=str(trig.position_id), symbols=trig.symbol))
+
+
+def save_anchors(db: Session, engine: TriggerEngine) -> int:
+    """Writes the anchors of trailing stops that ratcheted since the last call. Caller commits."""
+    moved = engine.ratcheted()
+    if moved:
+        # Core executemany: a trigger whose row is not written yet (or already deleted) is a no-op
+        table = TriggerRow.__table__
+        db.execute(table.update().where(table.c.id == bindparam("tid"))
+                   .values(anchor=bindparam("anchor"), level=bindparam("level")),
+                   [{"tid": tid, "anchor": anchor, "level": level} for tid, (anchor, level) in moved.items()])
+    return len(moved)
+
+
+def delete(db: Session, trigger_ids: Iterable[int]) -> None:
+    """Caller commits."""
+    ids = list(trigger_ids)
+    if ids:
+        db.query(TriggerRow).filter(TriggerRow.id.in_(ids)).delete(synchronize_session=False)
+
+
+def _open_ids(db: Session, position_ids: Set[int]) -> Set[int]:
+    if not position_ids:
+        return set()
+    rows = db.query(Position.id).filter(Position.id.in_(position_ids), Position.status == "OPEN").all()
+    return {r.id for r in rows}
+
+
+def restore(db: Session, engine: TriggerEngine) -> int:
+    """Re-arms saved triggers of open positions; drops the others. Returns the number re-armed. Caller commits."""
+    rows = db.query(TriggerRow).order_by(TriggerRow.id).all()
+    legs = {r.id: [int(p) for p in r.position_ids.split(",")] for r in rows}
+    open_ids = _open_ids(db, {p for pids in legs.values() for p in pids})
+    armed, stale = 0, []
+    for r in rows:
+        pids = legs[r.id]
+        if not all(p in open_ids for p in pids):
+            stale.append(r.id)
+            continue
+        try:
+            if r.kind == "COMBINED":
+                engine.add_combined(dict(zip(pids, r.symbols.split(","))), r.direction, r.level, restore_id=r.id)
+            elif r.kind == "TRAIL":
+                engine.add_trailing(pids[0], r.symbols, r.direction, r.trail, r.anchor, restore_id=r.id)
+            else:
+                engine.add(pids[0], r.symbols, r.kind, r.direction, r.level, restore_id=r.id)
+        except ValueError as e:
+            print(f"Trigger {r.id} not restored: {e}")
+            stale.append(r.id)
+            continue
+        armed += 1
+    delete(db, stale)
+    return armed
+
+
+def prune(db: Session, engine: TriggerEngine) -> int:
+    """Forgets claims on, and deletes saved triggers of, positions that are no longer open. Caller commits."""
+    claimed = engine.claimed()
+    closed = claimed - _open_ids(db, claimed)
+    engine.forget(closed)
+    rows = db.query(TriggerRow.id, TriggerRow.position_ids).all()
+    legs = {r.id: {int(p) for p in r.position_ids.split(",")} for r in rows}
+    open_ids = _open_ids(db, set().union(*legs.values()) if legs else set())
+    delete(db, [tid for tid, pids in legs.items() if not pids <= open_ids])
+    return len(closed)
@@ -0,0 +1,433 @@
+# app/risk/triggers.py
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+ABOVE = "ABOVE"  # fires when price >= level
+BELOW = "BELOW"  # fires when price <= level
+
+
+@dataclass
+class Trigger:
+    id: int
+    position_id: int
+    symbol: str
+    kind: str                       # "SL" / "TARGET" / "TRAIL"
+    direction: str                  # ABOVE / BELOW
+    level: float
+    trail: Optional[float] = None   # TRAIL only: distance from the best price seen
+    anchor: Optional[float] = None  # TRAIL only: best price seen since armed
+    created_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "position_id": self.position_id,
+            "symbol": self.symbol,
+            "kind": self.kind,
+            "direction": self.direction,
+            "level": round(self.level, 4),
+            "trail": self.trail,
+            "anchor": self.anchor,
+        }
+
+
+@dataclass
+class ComboTrigger:
+    """
+    Fires when the summed price of several legs crosses `level`,
+    e.g. combined premium stop-loss on a short strangle.
+    """
+    id: int
+    position_ids: Tuple[int, ...]
+    symbols: Tuple[str, ...]
+    direction: str
+    level: float
+    last: Dict[str, float] = field(default_factory=dict)
+    kind: str = "COMBINED"
+
+    def to_dict(self) -> dict:
+        total = sum(self.last.values()) if len(self.last) == len(self.symbols) else None
+        return {
+            "id": self.id,
+            "position_ids": list(self.position_ids),
+            "symbols": list(self.symbols),
+            "kind": self.kind,
+            "direction": self.direction,
+            "level": round(self.level, 4),
+            "combined": total,
+        }
+
+
+class _SymbolIndex:
+    """
+    Sorted price-level indexes for one symbol. Entries are (level, trigger_id)
+    so a price update is a bisect plus a slice of the crossed entries.
+      - above:      fire prefix with level <= price
+      - below:      fire suffix with level >= price
+      - trail_up:   (anchor, id) for trailing stops that fire on a rise (short legs)
+      - trail_down: (anchor, id) for trailing stops that fire on a fall (long legs)
+    """
+    __slots__ = ("above", "below", "trail_up", "trail_down", "last")
+
+    def __init__(self):
+        self.above: List[Tuple[float, int]] = []
+        self.below: List[Tuple[float, int]] = []
+        self.trail_up: List[Tuple[float, int]] = []
+        self.trail_down: List[Tuple[float, int]] = []
+        self.last: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.above) + len(self.below)
+
+
+def _remove(entries: List[Tuple[float, int]], key: Tuple[float, int]) -> None:
+    i = bisect_left(entries, key)
+    if i < len(entries) and entries[i] == key:
+        del entries[i]
+
+
+class TriggerEngine:
+    """
+    Holds SL / target / trailing / combined-premium triggers and evaluates
+    incoming prices against them in O(log n + k), k = triggers crossed.
+
+    Fired triggers claim their position (a position is exited at most once),
+    drop every other trigger on it and hand off to `on_exit(position_id, trigger, price)`
+    so the tick path never waits on the broker or DB: a coroutine `on_exit` runs
+    as a task on `loop`, a plain function on a small worker pool. `on_exit`
+    raises only when the exit never reached the broker; the claim is then
+    released so the position can be exited again. Failures after the broker
+    fill must be handled (journaled) by `on_exit` itself, which reports the
+    placement through order_placed(). Claims of closed positions are dropped
+    with forget().
+    """
+
+    def __init__(
+        self,
+        on_exit: Callable[[int, object, float], object],
+        workers: int = 4,
+        latency_samples: int = 4096,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ):
+        self.on_exit = on_exit
+        self.loop = loop if asyncio.iscoroutinefunction(on_exit) else None
+        self._lock = threading.Lock()
+        self._ids = 0
+        self._index: Dict[str, _SymbolIndex] = {}
+        self._triggers: Dict[int, Trigger] = {}
+        self._by_position: Dict[int, Set[int]] = {}
+        self._combos: Dict[int, ComboTrigger] = {}
+        self._combos_by_symbol: Dict[str, Set[int]] = {}
+        self._claimed: Set[int] = set()
+        self._fired_at: Dict[int, float] = {}     # position id -> tick time, until its order is placed
+        self._ratcheted: Set[int] = set()         # trailing stops moved since the last ratcheted() call
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="trigger-exit")
+        self._latency: Deque[float] = deque(maxlen=latency_samples)
+        self._ticks = 0
+        self._fired = 0
+        self._failed = 0
+        self._last_error: Optional[str] = None
+
+    # ---------- arming ----------
+    def _next_id(self, restore_id: Optional[int] = None) -> int:
+        if restore_id is not None:
+            if restore_id in self._triggers or restore_id in self._combos:
+                raise ValueError(f"trigger {restore_id} already exists")
+            self._ids = max(self._ids, restore_id)
+            return restore_id
+        self._ids += 1
+        return self._ids
+
+    def add(self, position_id: int, symbol: str, kind: str, direction: str, level: float,
+            restore_id: Optional[int] = None) -> Trigger:
+        """`restore_id` re-arms a persisted trigger under its original id."""
+        with self._lock:
+            if position_id in self._claimed:
+                raise ValueError(f"position {position_id} is already being exited")
+            trig = Trigger(self._next_id(restore_id), position_id, symbol, kind, direction, float(level))
+            self._insert(trig)
+            return trig
+
+    def add_trailing(self, position_id: int, symbol: str, direction: str, trail: float, anchor: float,
+                     restore_id: Optional[int] = None) -> Trigger:
+        """
+        direction=ABOVE: short leg, stop follows the lowest price seen at `trail` above it.
+        direction=BELOW: long leg, stop follows the highest price seen at `trail` below it.
+        """
+        if trail <= 0:
+            raise ValueError("trail must be positive")
+        with self._lock:
+            if position_id in self._claimed:
+                raise ValueError(f"position {position_id} is already being exited")
+            idx = self._index.get(symbol)
+            if idx is not None and idx.last is not None:
+                anchor = min(anchor, idx.last) if direction == ABOVE else max(anchor, idx.last)
+            level = anchor + trail if direction == ABOVE else anchor - trail
+            trig = Trigger(self._next_id(restore_id), position_id, symbol, "TRAIL", direction, level,
+                           trail=float(trail), anchor=float(anchor))
+            self._insert(trig)
+            return trig
+
+    def add_combined(self, legs: Dict[int, str], direction: str, level: float,
+                     restore_id: Optional[int] = None) -> ComboTrigger:
+        """legs: position_id -> symbol."""
+        if len(legs) < 2:
+            raise ValueError("combined trigger needs at least two legs")
+        with self._lock:
+            claimed = [pid for pid in legs if pid in self._claimed]
+            if claimed:
+                raise ValueError(f"positions {claimed} are already being exited")
+            combo = ComboTrigger(self._next_id(restore_id), tuple(legs), tuple(legs.values()), direction, float(level))
+            for sym in combo.symbols:
+                idx = self._index.get(sym)
+                if idx is not None and idx.last is not None:
+                    combo.last[sym] = idx.last
+                self._combos_by_symbol.setdefault(sym, set()).add(combo.id)
+            for pid in combo.position_ids:
+                self._by_position.setdefault(pid, set()).add(combo.id)
+            self._combos[combo.id] = combo
+            return combo
+
+    def _insert(self, trig: Trigger) -> None:
+        idx = self._index.get(trig.symbol)
+        if idx is None:
+            idx = self._index[trig.symbol] = _SymbolIndex()
+        key = (trig.level, trig.id)
+        insort(idx.above if trig.direction == ABOVE else idx.below, key)
+        if trig.kind == "TRAIL":
+            insort(idx.trail_up if trig.direction == ABOVE else idx.trail_down, (trig.anchor, trig.id))
+        self._triggers[trig.id] = trig
+        self._by_position.setdefault(trig.position_id, set()).add(trig.id)
+
+    # ---------- removal ----------
+    def _unlink(self, tid: int) -> None:
+        """Remove a trigger from every index. Safe to call for already-unindexed entries."""
+        trig = self._triggers.pop(tid, None)
+        if trig is not None:
+            idx = self._index.get(trig.symbol)
+            if idx is not None:
+                _remove(idx.above if trig.direction == ABOVE else idx.below, (trig.level, trig.id))
+                if trig.kind == "TRAIL":
+                    _remove(idx.trail_up if trig.direction == ABOVE else idx.trail_down, (trig.anchor, trig.id))
+                if not len(idx) and not self._combos_by_symbol.get(trig.symbol):
+                    del self._index[trig.symbol]
+            ids = self._by_position.get(trig.position_id)
+            if ids is not None:
+                ids.discard(tid)
+            return
+        combo = self._combos.pop(tid, None)
+        if combo is not None:
+            for sym in combo.symbols:
+                ids = self._combos_by_symbol.get(sym)
+                if ids is not None:
+                    ids.discard(tid)
+                    if not ids:
+                        del self._combos_by_symbol[sym]
+            for pid in combo.position_ids:
+                ids = self._by_position.get(pid)
+                if ids is not None:
+                    ids.discard(tid)
+
+    def remove(self, trigger_id: int) -> bool:
+        with self._lock:
+            found = trigger_id in self._triggers or trigger_id in self._combos
+            self._unlink(trigger_id)
+            return found
+
+    def clear_position(self, position_id: int) -> None:
+        with self._lock:
+            for tid in list(self._by_position.pop(position_id, ())):
+                self._unlink(tid)
+
+    # ---------- de-duplication ----------
+    def claim(self, position_id: int) -> bool:
+        """
+        Marks a position as being exited. Returns False if someone
+        (a trigger or a manual close) already owns the exit.
+        """
+        with self._lock:
+            return self._claim(position_id)
+
+    def _claim(self, position_id: int) -> bool:
+        if position_id in self._claimed:
+            return False
+        self._claimed.add(position_id)
+        for tid in list(self._by_position.pop(position_id, ())):
+            self._unlink(tid)
+        return True
+
+    def release(self, position_id: int) -> None:
+        """Undo a claim when the exit did not go through."""
+        with self._lock:
+            self._claimed.discard(position_id)
+            self._fired_at.pop(position_id, None)
+
+    def forget(self, position_ids: Iterable[int]) -> None:
+        """Drops the claims of positions that are now closed (they cannot be exited again anyway)."""
+        with self._lock:
+            for pid in position_ids:
+                self._claimed.discard(pid)
+                self._fired_at.pop(pid, None)
+
+    def claimed(self) -> Set[int]:
+        with self._lock:
+            return set(self._claimed)
+
+    def order_placed(self, position_id: int) -> None:
+        """Called by the exit path once the broker accepted the exit order; records trigger-to-order latency."""
+        with self._lock:
+            t0 = self._fired_at.pop(position_id, None)
+        if t0 is not None:
+            self._latency.append(time.perf_counter() - t0)
+
+    def ratcheted(self) -> Dict[int, Tuple[float, float]]:
+        """(anchor, level) of the trailing stops that moved since the last call, for persisting them."""
+        with self._lock:
+            out = {tid: (self._triggers[tid].anchor, self._triggers[tid].level)
+                   for tid in self._ratcheted if tid in self._triggers}
+            self._ratcheted.clear()
+            return out
+
+    # ---------- evaluation ----------
+    def on_price(self, symbol: str, price: float) -> int:
+        """Feed one price. Returns the number of position exits dispatched."""
+        t0 = time.perf_counter()
+        price = float(price)
+        exits: List[Tuple[int, object]] = []
+        with self._lock:
+            self._ticks += 1
+            fired: List[object] = []
+            idx = self._index.get(symbol)
+            if idx is not None:
+                idx.last = price
+                n = bisect_right(idx.above, (price, math.inf))
+                if n:
+                    fired.extend(self._triggers[tid] for _, tid in idx.above[:n])
+                    del idx.above[:n]
+                n = bisect_left(idx.below, (price,))
+                if n < len(idx.below):
+                    fired.extend(self._triggers[tid] for _, tid in idx.below[n:])
+                    del idx.below[n:]
+
+            for cid in list(self._combos_by_symbol.get(symbol, ())):
+                combo = self._combos[cid]
+                combo.last[symbol] = price
+                if len(combo.last) < len(combo.symbols):
+                    continue
+                total = sum(combo.last.values())
+                if (combo.direction == ABOVE and total >= combo.level) or (
+                    combo.direction == BELOW and total <= combo.level
+                ):
+                    fired.append(combo)
+
+            for trig in fired:
+                pids = trig.position_ids if isinstance(trig, ComboTrigger) else (trig.position_id,)
+                self._unlink(trig.id)
+                for pid in pids:
+                    if self._claim(pid):
+                        self._fired_at[pid] = t0
+                        exits.append((pid, trig))
+
+            # Ratchet after fired triggers are unlinked so they are not re-indexed.
+            if idx is not None:
+                self._ratchet(idx, price)
+
+        for pid, trig in exits:
+            if self.loop is not None:
+                asyncio.run_coroutine_threadsafe(self._arun_exit(pid, trig, price), self.loop)
+            else:
+                self._pool.submit(self._run_exit, pid, trig, price)
+        return len(exits)
+
+    def _ratchet(self, idx: _SymbolIndex, price: float) -> None:
+        # Short-side trailing stops: anchors above the new low move down to it.
+        n = bisect_right(idx.trail_up, (price, math.inf))
+        if n < len(idx.trail_up):
+            moved = idx.trail_up[n:]
+            del idx.trail_up[n:]
+            for _, tid in moved:
+                trig = self._triggers[tid]
+                _remove(idx.above, (trig.level, tid))
+                trig.anchor = price
+                trig.level = price + trig.trail
+                insort(idx.above, (trig.level, tid))
+                self._ratcheted.add(tid)
+                insort(idx.trail_up, (price, tid))
+        # Long-side trailing stops: anchors below the new high move up to it.
+        n = bisect_left(idx.trail_down, (price,))
+        if n:
+            moved = idx.trail_down[:n]
+            del idx.trail_down[:n]
+            for _, tid in moved:
+                trig = self._triggers[tid]
+                _remove(idx.below, (trig.level, tid))
+                trig.anchor = price
+                trig.level = price - trig.trail
+                insort(idx.below, (trig.level, tid))
+                self._ratcheted.add(tid)
+                insort(idx.trail_down, (price, tid))
+
+    def _run_exit(self, position_id: int, trig: object, price: float) -> None:
+        try:
+            self.on_exit(position_id, trig, price)
+        except Exception as e:
+            self._exit_failed(position_id, e)
+            return
+        self._fired += 1
+
+    async def _arun_exit(self, position_id: int, trig: object, price: float) -> None:
+        try:
+            await self.on_exit(position_id, trig, price)
+        except Exception as e:
+            self._exit_failed(position_id, e)
+            return
+        self._fired += 1
+
+    def _exit_failed(self, position_id: int, e: Exception) -> None:
+        self._failed += 1
+        self._last_error = f"position {position_id}: {e}"
+        print(f"Trigger exit failed for position {position_id}: {e}")
+        self.release(position_id)
+
+    # ---------- introspection ----------
+    def list(self) -> List[dict]:
+        with self._lock:
+            out = [t.to_dict() for t in self._triggers.values()]
+            out.extend(c.to_dict() for c in self._combos.values())
+            return out
+
+    def stats(self) -> dict:
+        samples = sorted(self._latency)
+
+        def pct(p: float) -> Optional[float]:
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 3)
+
+        return {
+            "armed": len(self._triggers) + len(self._combos),
+            "claimed": len(self._claimed),
+            "symbols": len(self._index),
+            "ticks": self._ticks,
+            "fired": self._fired,
+            "failed": self._failed,
+            "last_error": self._last_error,
+            "trigger_to_order_ms": {
+                "samples": len(samples),
+                "p50": pct(0.50),
+                "p99": pct(0.99),
+                "max": round(samples[-1] * 1000, 3) if samples else None,
+            },
+        }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
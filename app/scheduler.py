@@ -0,0 +1,372 @@
+# app/scheduler.py
+from __future__ import annotations
+
+import asyncio
+import heapq
+import inspect
+import itertools
+import threading
+import time as _time
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set, Union
+
+from app.pnl import IST
+
+DAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+SKIP = "skip"   # a run that starts later than `grace` is dropped
+RUN = "run"     # a late run still happens, once (missed runs are coalesced)
+
+
+# ---------- schedule specs ----------
+def _parse_days(days: Union[None, str, Iterable[int]]) -> frozenset:
+    """None -> every day; "mon-fri" / "mon,wed,fri" / [0, 2, 4]."""
+    if days is None:
+        return frozenset(range(7))
+    if not isinstance(days, str):
+        return frozenset(int(d) for d in days)
+    out = set()
+    for part in days.lower().split(","):
+        lo, _, hi = part.strip().partition("-")
+        a = DAY_NAMES.index(lo)
+        b = DAY_NAMES.index(hi) if hi else a
+        out.update(range(a, b + 1))
+    return frozenset(out)
+
+
+def _parse_time(t: Union[str, time]) -> time:
+    return t if isinstance(t, time) else time.fromisoformat(t)
+
+
+class Cron:
+    """Fixed IST times of day, on matching weekdays where `when(day)` holds (e.g. expiry days)."""
+
+    def __init__(self, at: Union[str, Iterable[str]], days="mon-fri", when: Optional[Callable[[date], bool]] = None):
+        self.times = sorted(_parse_time(t) for t in ([at] if isinstance(at, (str, time)) else at))
+        self.days = _parse_days(days)
+        self.when = when
+
+    def next_after(self, now: datetime) -> Optional[datetime]:
+        for k in range(400):
+            d = now.date() + timedelta(days=k)
+            if d.weekday() not in self.days or (self.when is not None and not self.when(d)):
+                continue
+            for t in self.times:
+                dt = datetime.combine(d, t, IST)
+                if dt > now:
+                    return dt
+        return None
+
+    def describe(self) -> str:
+        return f"cron {','.join(t.isoformat('minutes') for t in self.times)}"
+
+
+class Every:
+    """
+    Every `seconds` within an IST window [start, end] (whole day by default),
+    aligned to the window start so runs land on round times (09:20:00, 09:21:00, ...).
+    """
+
+    def __init__(self, seconds: float, start: Optional[str] = None, end: Optional[str] = None,
+                 days=None, when: Optional[Callable[[date], bool]] = None):
+        if seconds <= 0:
+            raise ValueError("interval must be positive")
+        self.step = timedelta(seconds=seconds)
+        self.start = _parse_time(start) if start else time.min
+        self.end = _parse_time(end) if end else None
+        self.days = _parse_days(days)
+        self.when = when
+
+    def next_after(self, now: datetime) -> Optional[datetime]:
+        for k in range(400):
+            d = now.date() + timedelta(days=k)
+            if d.weekday() not in self.days or (self.when is not None and not self.when(d)):
+                continue
+            lo = datetime.combine(d, self.start, IST)
+            hi = datetime.combine(d, self.end, IST) if self.end else datetime.combine(d + timedelta(days=1), time.min, IST)
+            cand = lo if now < lo else lo + ((now - lo) // self.step + 1) * self.step
+            if cand <= hi and not (self.end is None and cand == hi):
+                return cand
+        return None
+
+    def describe(self) -> str:
+        window = f" {self.start.isoformat('minutes')}-{self.end.isoformat('minutes')}" if self.end else ""
+        return f"every {self.step.total_seconds():g}s{window}"
+
+
+# ---------- jobs ----------
+@dataclass
+class Job:
+    name: str
+    fn: Callable[[], Any]          # async def, or a sync callable (run in a worker thread)
+    spec: Any                      # Cron / Every
+    max_instances: int = 1
+    misfire: str = SKIP
+    grace: float = 1.0             # seconds
+    paused: bool = False
+
+    next_run: Optional[datetime] = None
+    deadline: Optional[float] = None   # time.monotonic() of next_run
+    running: int = 0
+    runs: int = 0
+    errors: int = 0
+    missed: int = 0                # late beyond grace with misfire=skip
+    busy: int = 0                  # skipped because max_instances were running
+    last_run: Optional[datetime] = None
+    last_error: Optional[str] = None
+    jitter: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+    duration: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+
+
+def _summary(samples: Iterable[float]) -> Dict[str, Optional[float]]:
+    s = sorted(samples)
+
+    def pct(p: float) -> Optional[float]:
+        if not s:
+            return None
+        return round(s[min(len(s) - 1, int(p * len(s)))] * 1000, 3)
+
+    return {"samples": len(s), "p50": pct(0.50), "p99": pct(0.99), "max": round(s[-1] * 1000, 3) if s else None}
+
+
+class Scheduler:
+    """
+    In-process scheduler run from the FastAPI lifespan. IST wall-clock run times
+    are converted to deadlines on the monotonic clock and kept in a heap, which a
+    dedicated timer thread sleeps on precisely. Firing therefore never waits on
+    the event loop's millisecond-rounded timeouts or on a busy loop iteration:
+    sync jobs go straight from the timer thread to a small worker pool, and
+    async jobs are handed to the loop with call_soon_threadsafe. Deadlines are
+    re-derived from the wall clock at least every `max_sleep` seconds, so clock
+    adjustments never shift a run by more than that drift. At start-up, a
+    misfire="run" job whose run time passed less than `grace` ago (the process
+    was down) fires straight away.
+    """
+
+    def __init__(self, max_sleep: float = 30.0, workers: int = 4):
+        self.max_sleep = max_sleep
+        self._jobs: Dict[str, Job] = {}
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._pending: Set[Union[asyncio.Task, Future]] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = True
+
+    # ---------- registration ----------
+    def add(self, name: str, fn: Callable[[], Any], spec, *, max_instances: int = 1,
+            misfire: str = SKIP, grace: float = 1.0) -> Job:
+        if misfire not in (SKIP, RUN):
+            raise ValueError("misfire must be 'skip' or 'run'")
+        with self._cond:
+            if name in self._jobs:
+                raise ValueError(f"job '{name}' already exists")
+            job = Job(name, fn, spec, max_instances=max_instances, misfire=misfire, grace=grace)
+            self._jobs[name] = job
+            if not self._stopped:
+                self._plan(job, datetime.now(IST))
+                self._cond.notify()
+        return job
+
+    def remove(self, name: str) -> bool:
+        with self._cond:
+            job = self._jobs.pop(name, None)
+            if job is None:
+                return False
+            job.deadline = None  # stale heap entries are skipped
+            return True
+
+    def get(self, name: str) -> Optional[Job]:
+        return self._jobs.get(name)
+
+    # ---------- lifecycle ----------
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._timer, name="scheduler", daemon=True)
+        self._thread.start()
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+        with self._cond:
+            pending = list(self._pending)
+        pending = [p if isinstance(p, asyncio.Task) else asyncio.wrap_future(p) for p in pending]
+        if pending:
+            _, late = await asyncio.wait(pending, timeout=timeout)
+            for t in late:
+                t.cancel()  # sync jobs keep running in their thread; they are just no longer awaited
+            await asyncio.gather(*late, return_exceptions=True)
+        self._pool.shutdown(wait=False)
+
+    # ---------- timing (timer thread, under self._cond) ----------
+    def _plan(self, job: Job, now: datetime) -> None:
+        job.next_run = job.spec.next_after(now)
+        self._push(job)
+
+    def _push(self, job: Job) -> None:
+        if job.next_run is None:
+            job.deadline = None
+            return
+        job.deadline = _time.monotonic() + (job.next_run - datetime.now(IST)).total_seconds()
+        heapq.heappush(self._heap, (job.deadline, next(self._seq), job))
+
+    def _replan(self) -> None:
+        """Re-derives every deadline from the wall clock (start-up and periodic resync)."""
+        self._heap.clear()
+        for job in self._jobs.values():
+            if job.next_run is None:
+                self._plan_first(job, datetime.now(IST))
+            else:
+                self._push(job)
+
+    def _plan_first(self, job: Job, now: datetime) -> None:
+        # A misfire=run job whose last run time fell while the process was down is still
+        # owed that run if it is within grace: plan it from then, so it fires straight away
+        # (at most once; a later time inside the window is the one planned). Such jobs must
+        # be safe to repeat, since a run completed just before a restart looks the same.
+        if job.misfire == RUN and job.grace > 0:
+            missed = None
+            t = job.spec.next_after(now - timedelta(seconds=job.grace))
+            while t is not None and t <= now:
+                missed, t = t, job.spec.next_after(t)
+            if missed is not None:
+                job.next_run = missed
+                self._push(job)
+                return
+        self._plan(job, now)
+
+    def _timer(self) -> None:
+        with self._cond:
+            self._replan()
+            while not self._stopped:
+                now = _time.monotonic()
+                if self._heap and self._heap[0][0] <= now:
+                    deadline, _, job = heapq.heappop(self._heap)
+                    if job.deadline != deadline or self._jobs.get(job.name) is not job:
+                        continue  # replanned or removed
+                    self._dispatch(job, deadline, now)
+                    self._plan(job, max(datetime.now(IST), job.next_run))
+                    continue
+                wait = min(self._heap[0][0] - now, self.max_sleep) if self._heap else self.max_sleep
+                if not self._cond.wait(wait) and wait >= self.max_sleep:
+                    self._replan()
+
+    def _dispatch(self, job: Job, deadline: float, now: float) -> None:
+        if job.paused:
+            return
+        if now - deadline > job.grace and job.misfire == SKIP:
+            job.missed += 1
+            print(f"[scheduler] {job.name} missed by {now - deadline:.3f}s, skipped")
+            return
+        if job.running >= job.max_instances:
+            job.busy += 1
+            print(f"[scheduler] {job.name} still running ({job.running}), run skipped")
+            return
+        self._spawn(job, deadline)
+
+    def _spawn(self, job: Job, deadline: Optional[float]) -> None:
+        job.running += 1
+        if inspect.iscoroutinefunction(job.fn):
+            self._loop.call_soon_threadsafe(self._create_task, job, deadline)
+        else:
+            self._track(self._pool.submit(self._run_sync, job, deadline))
+
+    # _pending is touched from the timer thread, the loop and worker threads: always under self._cond
+    def _track(self, p: Union[asyncio.Task, Future]) -> None:
+        with self._cond:
+            self._pending.add(p)
+        p.add_done_callback(self._untrack)
+
+    def _untrack(self, p: Union[asyncio.Task, Future]) -> None:
+        with self._cond:
+            self._pending.discard(p)
+
+    # ---------- running ----------
+    def _create_task(self, job: Job, deadline: Optional[float]) -> None:
+        self._track(self._loop.create_task(self._run_async(job, deadline), name=f"job:{job.name}"))
+
+    async def _run_async(self, job: Job, deadline: Optional[float]) -> None:
+        started = self._started(job, deadline)
+        error = None
+        try:
+            await job.fn()
+        except asyncio.CancelledError:
+            error = "cancelled"
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            self._finished(job, started, error)
+
+    def _run_sync(self, job: Job, deadline: Optional[float]) -> None:
+        started = self._started(job, deadline)
+        error = None
+        try:
+            job.fn()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            self._finished(job, started, error)
+
+    def _started(self, job: Job, deadline: Optional[float]) -> float:
+        started = _time.monotonic()
+        if deadline is not None:
+            job.jitter.append(started - deadline)
+        return started
+
+    def _finished(self, job: Job, started: float, error: Optional[str]) -> None:
+        with self._cond:
+            job.running -= 1
+            job.duration.append(_time.monotonic() - started)
+            job.last_run = datetime.now(IST)
+            if error is None:
+                job.runs += 1
+            else:
+                job.errors += 1
+                job.last_error = error
+        if error is not None:
+            print(f"[scheduler] {job.name} failed: {error}")
+
+    # ---------- control ----------
+    def run_now(self, name: str) -> bool:
+        """Starts the job immediately, outside its schedule; False if at max_instances."""
+        with self._cond:
+            job = self._jobs[name]
+            if job.running >= job.max_instances:
+                return False
+            self._spawn(job, None)
+            return True
+
+    def pause(self, name: str, paused: bool = True) -> None:
+        self._jobs[name].paused = paused
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            return [
+                {
+                    "name": j.name,
+                    "schedule": j.spec.describe(),
+                    "next_run": j.next_run.isoformat() if j.next_run else None,
+                    "paused": j.paused,
+                    "running": j.running,
+                    "max_instances": j.max_instances,
+                    "misfire": j.misfire,
+                    "runs": j.runs,
+                    "errors": j.errors,
+                    "missed": j.missed,
+                    "busy": j.busy,
+                    "last_run": j.last_run.isoformat() if j.last_run else None,
+                    "last_error": j.last_error,
+                    "jitter_ms": _summary(j.jitter),
+                    "duration_ms": _summary(j.duration),
+                }
+                for j in self._jobs.values()
+            ]
@@ -1,3 +1,14 @@
 # app/state.py
 pricer = None
 broker = None
+triggers = None
+journal = None
+scheduler = None
+risk = None
+runner = None
+recorder = None
+volsurface = None
+margin = None
+order_limiter = None
+squareoff = None
+readcache = None
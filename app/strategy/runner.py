@@ -0,0 +1,362 @@
+# app/strategy/runner.py
+"""
+Runs one strategy instance per underlying, sharded across worker processes so
+chain analytics for several underlyings do not serialize on one GIL.
+
+- Prices: the parent writes every chain's latest prices into a PriceBoard
+  (one shared float64 array with a seqlock counter per chain). Workers map the
+  same memory and copy out only their own chain slice when its counter moves;
+  chains are never pickled per update.
+- Orders: workers send intents back on a queue. The parent places them
+  through the app's central order path (`submit`), where global risk is
+  applied, and returns the fill to the owning worker.
+"""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from multiprocessing.sharedctypes import RawArray
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import EXPIRY_WEEKDAY
+from app.pnl import IST
+from app.strategy.strangle import Strangle, StrangleConfig
+from app.symbols import format_option, spot_symbol
+
+STRIKE_STEPS = {"NIFTY": 50, "BANKNIFTY": 100, "FINNIFTY": 50, "MIDCPNIFTY": 25}
+LOT_SIZES = {"NIFTY": 75, "BANKNIFTY": 35, "FINNIFTY": 65, "MIDCPNIFTY": 140}
+
+
+# ---------- chains ----------
+@dataclass
+class ChainSpec:
+    """Static shape of one underlying's chain; sent to its worker once at start."""
+    underlying: str
+    expiry: date
+    lot_size: int
+    spot_symbol: str
+    strikes: np.ndarray
+    ce_symbols: List[str]
+    pe_symbols: List[str]
+    group: int = 0       # seqlock counter index in the PriceBoard
+    offset: int = 0      # first slot: spot, then CE prices, then PE prices
+
+    @property
+    def n_slots(self) -> int:
+        return 1 + 2 * len(self.strikes)
+
+    @property
+    def symbols(self) -> List[str]:
+        return [self.spot_symbol, *self.ce_symbols, *self.pe_symbols]
+
+
+def _live_options(underlying: str, instruments: Iterable[Dict[str, Any]], today: date) -> List[Dict[str, Any]]:
+    return [i for i in instruments
+            if i["segment"] == "NFO-OPT" and i["name"] == underlying and i["expiry"] and i["expiry"] >= today]
+
+
+def expiries_from_instruments(underlying: str, instruments: Iterable[Dict[str, Any]],
+                              today: Optional[date] = None) -> List[date]:
+    """Live option expiries for `underlying`, nearest first."""
+    today = today or datetime.now(IST).date()
+    return sorted({i["expiry"] for i in _live_options(underlying, instruments, today)})
+
+
+def chain_from_instruments(underlying: str, instruments: Iterable[Dict[str, Any]], spot: float,
+                           strikes_each_side: int = 20, today: Optional[date] = None,
+                           expiry: Optional[date] = None) -> ChainSpec:
+    """Chain around `spot` from a Kite instrument dump; nearest expiry unless one is given."""
+    today = today or datetime.now(IST).date()
+    opts = _live_options(underlying, instruments, today)
+    if expiry is not None:
+        opts = [i for i in opts if i["expiry"] == expiry]
+    if not opts:
+        raise ValueError(f"no live options for {underlying}" + (f" expiring {expiry}" if expiry else ""))
+    expiry = min(i["expiry"] for i in opts)
+    legs: Dict[float, Dict[str, str]] = {}
+    for i in opts:
+        if i["expiry"] == expiry:
+            legs.setdefault(i["strike"], {})[i["instrument_type"]] = f"NFO:{i['tradingsymbol']}"
+    strikes = np.array(sorted(k for k, v in legs.items() if "CE" in v and "PE" in v))
+    atm = int(np.argmin(np.abs(strikes - spot)))
+    strikes = strikes[max(0, atm - strikes_each_side): atm + strikes_each_side + 1]
+    return ChainSpec(
+        underlying, expiry, int(opts[0]["lot_size"]), spot_symbol(underlying), strikes,
+        [legs[k]["CE"] for k in strikes], [legs[k]["PE"] for k in strikes],
+    )
+
+
+def synthetic_chain(underlying: str, spot: float, strikes_each_side: int = 20,
+                    today: Optional[date] = None, expiry: Optional[date] = None) -> ChainSpec:
+    """Chain with standard strike steps (next weekly expiry by default), for mock/paper pricing."""
+    today = today or datetime.now(IST).date()
+    expiry = expiry or today + timedelta(days=(EXPIRY_WEEKDAY - today.weekday()) % 7)
+    step = STRIKE_STEPS.get(underlying) or max(1, round(spot * 0.01 / 5) * 5)
+    atm = round(spot / step) * step
+    strikes = atm + step * np.arange(-strikes_each_side, strikes_each_side + 1, dtype=float)
+    strikes = strikes[strikes > 0]
+    return ChainSpec(
+        underlying, expiry, LOT_SIZES.get(underlying, 1), spot_symbol(underlying), strikes,
+        [format_option(underlying, expiry, k, "CE") for k in strikes],
+        [format_option(underlying, expiry, k, "PE") for k in strikes],
+    )
+
+
+# ---------- shared prices ----------
+class PriceBoard:
+    """
+    Latest prices for every chain symbol in one shared-memory float64 array.
+    Writers bump a chain's counter to odd, write, then bump it to even;
+    readers retry if the counter was odd or moved while they copied.
+    """
+
+    def __init__(self, specs: List[ChainSpec]):
+        offset = 0
+        self.slots: Dict[str, List[Tuple[int, int]]] = {}
+        for g, spec in enumerate(specs):
+            spec.group, spec.offset = g, offset
+            for i, sym in enumerate(spec.symbols):
+                self.slots.setdefault(sym, []).append((g, offset + i))
+            offset += spec.n_slots
+        self._prices = RawArray("d", max(offset, 1))
+        self._seq = RawArray("q", max(len(specs), 1))
+        self._lock = threading.Lock()
+        self._map()
+        self.prices[:] = np.nan
+
+    def _map(self) -> None:
+        self.prices = np.frombuffer(self._prices, dtype=np.float64)
+        self.seq = np.frombuffer(self._seq, dtype=np.int64)
+
+    def __getstate__(self):
+        # Only the shared buffers travel to workers (at spawn time); the symbol map stays here
+        return {"_prices": self._prices, "_seq": self._seq}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.slots = {}
+        self._lock = threading.Lock()
+        self._map()
+
+    def write(self, prices: Dict[str, float]) -> int:
+        groups, idx, vals = [], [], []
+        for sym, px in prices.items():
+            for g, i in self.slots.get(sym, ()):
+                groups.append(g)
+                idx.append(i)
+                vals.append(px)
+        if not idx:
+            return 0
+        touched = np.unique(groups)
+        with self._lock:
+            self.seq[touched] += 1
+            self.prices[idx] = vals
+            self.seq[touched] += 1
+        return len(idx)
+
+    def read(self, spec: ChainSpec) -> Tuple[int, np.ndarray]:
+        while True:
+            s1 = int(self.seq[spec.group])
+            if s1 & 1:
+                time.sleep(0)
+                continue
+            snap = self.prices[spec.offset: spec.offset + spec.n_slots].copy()
+            if int(self.seq[spec.group]) == s1:
+                return s1, snap
+
+
+# ---------- worker process ----------
+def _worker(wid: int, board: PriceBoard, specs: List[ChainSpec], config: StrangleConfig,
+            inbox, outbox, poll: float, report_every: float = 1.0) -> None:
+    strategies = {s.underlying: Strangle(s, config) for s in specs}
+    seen = {s.underlying: 0 for s in specs}
+    evals, busy, last_report = 0, 0.0, time.monotonic()
+
+    def handle(msg) -> bool:
+        if msg is None:
+            return False
+        strategies[msg["underlying"]].on_fill(msg)
+        return True
+
+    while True:
+        try:
+            while True:
+                if not handle(inbox.get_nowait()):
+                    return
+        except queue.Empty:
+            pass
+
+        worked = False
+        for spec in specs:
+            seq = int(board.seq[spec.group])
+            if seq == seen[spec.underlying] or seq & 1:
+                continue
+            seq, snap = board.read(spec)
+            seen[spec.underlying] = seq
+            n = len(spec.strikes)
+            spot = snap[0]
+            if not np.isfinite(spot):
+                continue
+            t0 = time.perf_counter()
+            intents = strategies[spec.underlying].on_prices(datetime.now(IST), float(spot), snap[1:1 + n], snap[1 + n:])
+            busy += time.perf_counter() - t0
+            evals += 1
+            worked = True
+            for intent in intents:
+                outbox.put(("order", wid, intent))
+
+        now = time.monotonic()
+        if now - last_report >= report_every:
+            last_report = now
+            outbox.put(("stats", wid, {
+                "evals": evals,
+                "busy_s": round(busy, 3),
+                "strategies": {u: s.snapshot() for u, s in strategies.items()},
+            }))
+        if not worked:
+            try:
+                if not handle(inbox.get(timeout=poll)):
+                    return
+            except queue.Empty:
+                pass
+
+
+def _shard(specs: List[ChainSpec], workers: int) -> List[List[ChainSpec]]:
+    """Greedy balance by chain size: biggest chains first onto the least-loaded worker."""
+    shards: List[List[ChainSpec]] = [[] for _ in range(max(1, min(workers, len(specs))))]
+    load = [0] * len(shards)
+    for spec in sorted(specs, key=lambda s: -s.n_slots):
+        i = load.index(min(load))
+        shards[i].append(spec)
+        load[i] += spec.n_slots
+    return shards
+
+
+# ---------- parent side ----------
+@dataclass
+class RunnerStats:
+    intents: int = 0
+    filled: int = 0
+    rejected: int = 0
+    last_error: Optional[str] = None
+    workers: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+
+
+class StrategyRunner:
+    def __init__(self, specs: List[ChainSpec], submit: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 workers: Optional[int] = None, config: Optional[StrangleConfig] = None, poll: float = 0.02):
+        self.specs = specs
+        self.submit = submit
+        self.config = config or StrangleConfig()
+        self.poll = poll
+        self.board = PriceBoard(specs)
+        self.shards = _shard(specs, workers or os.cpu_count() or 1)
+        self.stats = RunnerStats()
+        self._ctx = mp.get_context("spawn")  # fork is unsafe with the app's threads
+        self._procs: List[mp.Process] = []
+        self._inboxes: List[Any] = []
+        self._outbox = None
+        self._reader: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped = threading.Event()
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self.board.slots)
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._outbox = self._ctx.Queue()
+        for wid, shard in enumerate(self.shards):
+            inbox = self._ctx.Queue()
+            proc = self._ctx.Process(
+                target=_worker, args=(wid, self.board, shard, self.config, inbox, self._outbox, self.poll),
+                name=f"strategy-{wid}", daemon=True,
+            )
+            proc.start()
+            self._inboxes.append(inbox)
+            self._procs.append(proc)
+        self._reader = threading.Thread(target=self._read_outbox, name="strategy-outbox", daemon=True)
+        self._reader.start()
+
+    def update(self, prices: Dict[str, float]) -> int:
+        return self.board.write(prices)
+
+    def _read_outbox(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                kind, wid, body = self._outbox.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            if kind == "order":
+                self.stats.intents += 1
+                asyncio.run_coroutine_threadsafe(self._order(wid, body), self._loop)
+            elif kind == "stats":
+                self.stats.workers[wid] = body
+
+    async def _order(self, wid: int, intent: Dict[str, Any]) -> None:
+        try:
+            res = await self.submit(intent)
+        except Exception as e:
+            res = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        if res.get("ok"):
+            self.stats.filled += 1
+        else:
+            self.stats.rejected += 1
+            self.stats.last_error = res.get("error")
+            print(f"[strategy] {intent['id']} {intent['action']} {intent['symbol']} not filled: {res.get('error')}")
+        self._inboxes[wid].put({
+            "underlying": intent["underlying"],
+            "leg": intent["leg"],
+            "action": intent["action"],
+            "ok": bool(res.get("ok")),
+            "in_progress": bool(res.get("in_progress")),
+            "price": res.get("price"),
+            "position_id": res.get("position_id"),
+        })
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        for inbox in self._inboxes:
+            inbox.put(None)
+
+        def join():
+            deadline = time.monotonic() + timeout
+            for p in self._procs:
+                p.join(max(0.0, deadline - time.monotonic()))
+                if p.is_alive():
+                    p.terminate()
+                    p.join()
+
+        await asyncio.to_thread(join)
+        self._stopped.set()
+        if self._reader is not None:
+            await asyncio.to_thread(self._reader.join)
+
+    def status(self) -> Dict[str, Any]:
+        strategies: Dict[str, Any] = {}
+        evals = 0
+        for w in self.stats.workers.values():
+            strategies.update(w["strategies"])
+            evals += w["evals"]
+        return {
+            "workers": [
+                {"pid": p.pid, "alive": p.is_alive(), "underlyings": [s.underlying for s in shard]}
+                for p, shard in zip(self._procs, self.shards)
+            ],
+            "evals": evals,
+            "intents": self.stats.intents,
+            "filled": self.stats.filled,
+            "rejected": self.stats.rejected,
+            "last_error": self.stats.last_error,
+            "strategies": strategies,
+        }
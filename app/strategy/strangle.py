@@ -1 +1,158 @@
-# Basic strangle strategy placeholder
+# app/strategy/strangle.py
+"""
+Short strangle: at the entry time, sell the call and put nearest a target
+delta; exit a leg when its premium reaches `stop_mult` x the entry premium,
+and square off everything at the exit time (earlier on expiry day).
+Pure decision logic: prices in, order intents out. Orders are placed by the
+central order path, which reports fills back through on_fill().
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.greeks import bs_delta, implied_vol, year_fraction
+
+FLAT, ENTERING, OPEN, DONE = "FLAT", "ENTERING", "OPEN", "DONE"
+
+
+@dataclass
+class StrangleConfig:
+    entry_at: time = time(9, 20)
+    exit_at: time = time(15, 15)
+    expiry_exit_at: time = time(14, 45)
+    delta: float = 0.16
+    lots: int = 1
+    stop_mult: float = 2.0
+
+
+@dataclass
+class Leg:
+    kind: str                      # "CE" / "PE"
+    symbol: str
+    index: int                     # position in the chain's strike arrays
+    qty: int
+    state: str = "PENDING"         # PENDING -> OPEN -> EXITING -> CLOSED
+    entry: Optional[float] = None
+    position_id: Optional[int] = None
+
+
+@dataclass
+class Strangle:
+    spec: Any                      # app.strategy.runner.ChainSpec
+    config: StrangleConfig = field(default_factory=StrangleConfig)
+    state: str = FLAT
+    day: Optional[date] = None
+    legs: Dict[str, Leg] = field(default_factory=dict)
+    analytics: Dict[str, Any] = field(default_factory=dict)
+    _seq: int = 0
+
+    def on_prices(self, now: datetime, spot: float, ce: np.ndarray, pe: np.ndarray) -> List[Dict[str, Any]]:
+        """Runs the chain analytics and returns any order intents for this snapshot."""
+        if self.day != now.date():
+            self.day = now.date()
+            if self.state == DONE:
+                self.state, self.legs = FLAT, {}
+
+        strikes = self.spec.strikes
+        t = year_fraction(self.spec.expiry, now)
+        iv_ce = implied_vol(ce, spot, strikes, t, True)
+        iv_pe = implied_vol(pe, spot, strikes, t, False)
+        d_ce = bs_delta(spot, strikes, t, iv_ce, True)
+        d_pe = bs_delta(spot, strikes, t, iv_pe, False)
+        atm = int(np.argmin(np.abs(strikes - spot)))
+        self.analytics = {
+            "spot": spot,
+            "atm_strike": float(strikes[atm]),
+            "atm_iv": _round(np.mean([v for v in (iv_ce[atm], iv_pe[atm]) if np.isfinite(v)] or [np.nan])),
+        }
+
+        clock = now.time()
+        exit_at = self.config.expiry_exit_at if now.date() == self.spec.expiry else self.config.exit_at
+        if self.state == FLAT and self.config.entry_at <= clock < exit_at:
+            with np.errstate(invalid="ignore"):
+                ci = _nearest(d_ce, self.config.delta)
+                pi = _nearest(d_pe, -self.config.delta)
+            if ci is None or pi is None:
+                return []
+            qty = self.config.lots * self.spec.lot_size
+            self.legs = {
+                "CE": Leg("CE", self.spec.ce_symbols[ci], ci, qty),
+                "PE": Leg("PE", self.spec.pe_symbols[pi], pi, qty),
+            }
+            self.state = ENTERING
+            return [
+                self._intent("entry", self.legs["CE"], "SELL", float(ce[ci])),
+                self._intent("entry", self.legs["PE"], "SELL", float(pe[pi])),
+            ]
+
+        if self.state == OPEN:
+            prices = {"CE": ce, "PE": pe}
+            out = []
+            for leg in self.legs.values():
+                if leg.state != "OPEN":
+                    continue
+                ltp = float(prices[leg.kind][leg.index])
+                if clock >= exit_at or (leg.entry and np.isfinite(ltp) and ltp >= leg.entry * self.config.stop_mult):
+                    leg.state = "EXITING"
+                    out.append(self._intent("exit", leg, "BUY", ltp if np.isfinite(ltp) else None))
+            return out
+        return []
+
+    def on_fill(self, msg: Dict[str, Any]) -> None:
+        """Result of an intent from the central order path: {leg, action, ok, in_progress, price, position_id}."""
+        leg = self.legs.get(msg["leg"])
+        if leg is None:
+            return
+        if msg["action"] == "entry":
+            if msg["ok"]:
+                leg.state, leg.entry, leg.position_id = "OPEN", msg.get("price"), msg.get("position_id")
+            else:
+                leg.state = "CLOSED"
+        elif msg["action"] == "exit":
+            if msg["ok"]:
+                leg.state = "CLOSED"
+            elif not msg.get("in_progress"):
+                leg.state = "OPEN"         # rejected: retried on the next snapshot
+            # in progress elsewhere: stays EXITING, no second exit is sent
+
+        states = {l.state for l in self.legs.values()}
+        if "OPEN" in states or "EXITING" in states:
+            self.state = OPEN
+        elif "PENDING" not in states:
+            self.state = DONE
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            **self.analytics,
+            "legs": {k: {"symbol": l.symbol, "state": l.state, "entry": l.entry} for k, l in self.legs.items()},
+        }
+
+    def _intent(self, action: str, leg: Leg, side: str, price: Optional[float]) -> Dict[str, Any]:
+        self._seq += 1
+        return {
+            "id": f"{self.spec.underlying}-{self._seq}",
+            "underlying": self.spec.underlying,
+            "action": action,
+            "leg": leg.kind,
+            "symbol": leg.symbol,
+            "side": side,
+            "qty": leg.qty,
+            "price": price,
+            "position_id": leg.position_id,
+        }
+
+
+def _nearest(deltas: np.ndarray, target: float) -> Optional[int]:
+    dist = np.abs(deltas - target)
+    if np.isnan(dist).all():
+        return None
+    return int(np.nanargmin(dist))
+
+
+def _round(x: float) -> Optional[float]:
+    return round(float(x), 4) if np.isfinite(x) else None
@@ -0,0 +1,26 @@
+# app/summary_model.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, UniqueConstraint
+from app.db import Base
+
+
+class DailySummary(Base):
+    """
+    Materialized end-of-day performance, one row per (IST day, underlying, expiry)
+    of closed positions. Maintained by app/analytics.py; never written by hand.
+    """
+    __tablename__ = "daily_summary"
+    __table_args__ = (UniqueConstraint("day", "underlying", "expiry", name="uq_daily_summary_key"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)        # IST day the positions closed
+    underlying = Column(String, nullable=False)
+    expiry = Column(Date, nullable=True)                  # None for non-option symbols
+    positions = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0)
+    losses = Column(Integer, nullable=False, default=0)
+    realised = Column(Float, nullable=False, default=0.0)
+    gross_profit = Column(Float, nullable=False, default=0.0)
+    gross_loss = Column(Float, nullable=False, default=0.0)
+    premium_sold = Column(Float, nullable=False, default=0.0)   # sum of SELL qty * price
+    refreshed_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,106 @@
+# app/symbols.py
+from __future__ import annotations
+
+import calendar
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Optional
+
+from app.config import EXPIRY_WEEKDAY
+
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+WEEKLY_MONTH = {c: i + 1 for i, c in enumerate("123456789OND")}
+
+# NFO option tradingsymbols:
+#   monthly: NIFTY24AUG25000CE     -> name, YY, MON, strike, CE/PE
+#   weekly:  NIFTY2481525000CE     -> name, YY, M (1-9/O/N/D), DD, strike, CE/PE
+_OPTION_RE = re.compile(
+    r"^(?P<name>[A-Z0-9&-]+?)(?P<yy>\d{2})"
+    r"(?:(?P<mon>" + "|".join(MONTHS) + r")|(?P<m>[1-9OND])(?P<dd>\d{2}))"
+    r"(?P<strike>\d+(?:\.\d+)?)(?P<kind>CE|PE)$"
+)
+# Index spot symbols and the F&O underlying name they belong to
+SPOT_SYMBOLS = {
+    "NIFTY": "NSE:NIFTY 50",
+    "BANKNIFTY": "NSE:NIFTY BANK",
+    "FINNIFTY": "NSE:NIFTY FIN SERVICE",
+    "MIDCPNIFTY": "NSE:NIFTY MID SELECT",
+}
+_INDEX_NAMES = {v.split(":", 1)[1]: k for k, v in SPOT_SYMBOLS.items()}
+_FUT_RE = re.compile(r"^(?P<name>[A-Z0-9&-]+?)(?P<yy>\d{2})(?P<mon>" + "|".join(MONTHS) + r")FUT$")
+
+
+@dataclass(frozen=True)
+class OptionSymbol:
+    name: str        # underlying, e.g. "NIFTY"
+    expiry: date
+    strike: float
+    kind: str        # "CE" / "PE"
+    monthly: bool
+
+    @property
+    def is_call(self) -> bool:
+        return self.kind == "CE"
+
+
+def monthly_expiry(year: int, month: int, weekday: int = EXPIRY_WEEKDAY) -> date:
+    """Last `weekday` of the month (exchange holidays are not accounted for)."""
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+@lru_cache(maxsize=65536)
+def parse_option(symbol: str) -> Optional[OptionSymbol]:
+    """Parses 'NFO:NIFTY24AUG25000CE' / 'NIFTY2481525000CE'; None if not an option symbol."""
+    ts = symbol.split(":", 1)[-1].upper()
+    m = _OPTION_RE.match(ts)
+    if m is None:
+        return None
+    year = 2000 + int(m["yy"])
+    try:
+        if m["mon"]:
+            expiry = monthly_expiry(year, MONTHS.index(m["mon"]) + 1)
+        else:
+            expiry = date(year, WEEKLY_MONTH[m["m"]], int(m["dd"]))
+    except ValueError:
+        return None
+    return OptionSymbol(m["name"], expiry, float(m["strike"]), m["kind"], bool(m["mon"]))
+
+
+def underlying_of(symbol: str) -> str:
+    """Underlying name for options, futures and index spots; the bare tradingsymbol otherwise."""
+    opt = parse_option(symbol)
+    if opt is not None:
+        return opt.name
+    ts = symbol.split(":", 1)[-1].upper()
+    if ts in _INDEX_NAMES:
+        return _INDEX_NAMES[ts]
+    m = _FUT_RE.match(ts)
+    return m["name"] if m else ts
+
+
+def spot_symbol(underlying: str) -> str:
+    """Quote symbol of an underlying's spot: the index for index names, the NSE equity otherwise."""
+    return SPOT_SYMBOLS.get(underlying, f"NSE:{underlying}")
+
+
+def is_expiry_day(d: date, weekday: int = EXPIRY_WEEKDAY) -> bool:
+    """Weekly expiry day (exchange holidays that move expiry are not accounted for)."""
+    return d.weekday() == weekday
+
+
+def is_monthly_expiry_day(d: date, weekday: int = EXPIRY_WEEKDAY) -> bool:
+    return d == monthly_expiry(d.year, d.month, weekday)
+
+
+def format_option(name: str, expiry: date, strike: float, kind: str, exchange: str = "NFO") -> str:
+    """Inverse of parse_option; the monthly form is used when `expiry` is the monthly expiry."""
+    k = int(strike) if float(strike).is_integer() else strike
+    yy = expiry.year % 100
+    if expiry == monthly_expiry(expiry.year, expiry.month):
+        ts = f"{name}{yy:02d}{MONTHS[expiry.month - 1]}{k}{kind}"
+    else:
+        ts = f"{name}{yy:02d}{'123456789OND'[expiry.month - 1]}{expiry.day:02d}{k}{kind}"
+    return f"{exchange}:{ts}" if exchange else ts
@@ -0,0 +1,23 @@
+# app/trigger_model.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, DateTime
+from app.db import Base
+
+
+class TriggerRow(Base):
+    """
+    Armed exit triggers, so they survive a restart (app/risk/trigger_store.py).
+    `id` is the trigger engine's id. Combined triggers list their legs in
+    position_ids / symbols (comma separated, same order).
+    """
+    __tablename__ = "triggers"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    kind = Column(String, nullable=False)                 # SL / TARGET / TRAIL / COMBINED
+    direction = Column(String, nullable=False)            # ABOVE / BELOW
+    level = Column(Float, nullable=False)
+    trail = Column(Float, nullable=True)                  # TRAIL only
+    anchor = Column(Float, nullable=True)                 # TRAIL only: anchor as of the last save
+    position_ids = Column(String, nullable=False)
+    symbols = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
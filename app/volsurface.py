@@ -0,0 +1,376 @@
+# app/volsurface.py
+"""
+Implied-volatility surface per underlying: one SVI smile per tracked expiry,
+fitted to out-of-the-money chain quotes and cached.
+
+- update(prices) only stores quotes (a dict lookup per symbol) and marks the
+  expiry dirty; it is safe to call on every price batch.
+- refit() recomputes IVs for the quotes that changed and checks them against
+  the cached smile. Only when one of them is off by more than `tol` (in vol)
+  is the smile refitted, warm-started from the previous parameters.
+- iv(underlying, strike, expiry) evaluates the cached closed-form smile; an
+  expiry between two fitted ones is interpolated linearly in total variance.
+
+Raw SVI total variance at log-moneyness k = ln(K/F):
+    w(k) = a + b * (rho * (k - m) + sqrt((k - m)^2 + sigma^2)),  iv = sqrt(w / t)
+"""
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.greeks import RATE, implied_vol, year_fraction
+from app.pnl import IST
+
+MIN_PRICE = 0.5          # quotes below this carry too little vol information to fit
+PARITY_STRIKES = 3       # strikes nearest the money used for the put-call-parity forward
+
+
+# ---------- SVI ----------
+def svi_w(k, p):
+    a, b, rho, m, s = p
+    d = k - m
+    return a + b * (rho * d + np.sqrt(d * d + s * s))
+
+
+def _svi_w_scalar(k: float, p: Tuple[float, ...]) -> float:
+    a, b, rho, m, s = p
+    d = k - m
+    return a + b * (rho * d + math.sqrt(d * d + s * s))
+
+
+def _svi_jac(k: np.ndarray, p: np.ndarray) -> np.ndarray:
+    _, b, rho, m, s = p
+    d = k - m
+    r = np.sqrt(d * d + s * s)
+    return np.column_stack((np.ones_like(k), rho * d + r, b * d, -b * (rho + d / r), b * s / r))
+
+
+def _project(p: np.ndarray) -> np.ndarray:
+    # Keep the smile well-defined: b >= 0, |rho| < 1, sigma > 0 and w >= 0 at its minimum
+    a, b, rho, m, s = p
+    b = max(b, 0.0)
+    rho = min(max(rho, -0.999), 0.999)
+    s = max(s, 1e-4)
+    a = max(a, -b * s * np.sqrt(1.0 - rho * rho))
+    return np.array((a, b, rho, m, s))
+
+
+def _initial_guess(k: np.ndarray, w: np.ndarray) -> np.ndarray:
+    i = int(np.argmin(w))
+    span = max(float(np.ptp(k)), 1e-3)
+    b = max(2.0 * float(np.ptp(w)) / span, 1e-4)
+    return _project(np.array((float(w[i]) - 0.1 * b, b, -0.3, float(k[i]), 0.1)))
+
+
+def fit_svi(k: np.ndarray, w: np.ndarray, p0: Optional[np.ndarray] = None,
+            max_iter: int = 100, rtol: float = 1e-10) -> Tuple[np.ndarray, int]:
+    """
+    Levenberg-Marquardt least squares of SVI total variance against `w`,
+    projected onto the valid parameter set after every step. Returns the
+    parameters and the iterations used.
+    """
+    p = _initial_guess(k, w) if p0 is None else _project(np.asarray(p0, dtype=float))
+    res = svi_w(k, p) - w
+    cost = float(res @ res)
+    lam = 1e-3
+    it = 0
+    for it in range(1, max_iter + 1):
+        J = _svi_jac(k, p)
+        A = J.T @ J
+        g = J.T @ res
+        diag = np.diag(A).copy() + 1e-12
+        while True:
+            try:
+                step = np.linalg.solve(A + lam * np.diag(diag), -g)
+            except np.linalg.LinAlgError:
+                step = None
+            if step is not None:
+                q = _project(p + step)
+                rq = svi_w(k, q) - w
+                cq = float(rq @ rq)
+                if cq < cost:
+                    break
+            lam *= 10.0
+            if lam > 1e8:
+                return p, it
+        gain = cost - cq
+        p, res, cost = q, rq, cq
+        lam = max(lam * 0.3, 1e-9)
+        if gain <= rtol * max(cost, 1e-16) or cost < 1e-18:
+            break
+    return p, it
+
+
+# ---------- per-expiry state ----------
+@dataclass(frozen=True)
+class Smile:
+    """A fitted smile; replaced whole on refit so readers never see a partial update."""
+    expiry: date
+    t: float
+    forward: float
+    params: Tuple[float, ...]
+    rmse: float              # in vol
+    points: int
+    iterations: int
+    fitted_at: datetime
+
+    def iv(self, strike):
+        if np.ndim(strike) == 0:
+            return math.sqrt(max(_svi_w_scalar(math.log(strike / self.forward), self.params), 0.0) / self.t)
+        w = svi_w(np.log(np.asarray(strike, dtype=float) / self.forward), self.params)
+        return np.sqrt(np.maximum(w, 0.0) / self.t)
+
+
+@dataclass
+class _Expiry:
+    expiry: date
+    strikes: np.ndarray
+    ce_symbols: List[str]
+    pe_symbols: List[str]
+    prices: np.ndarray = None          # CE quotes then PE quotes
+    used: np.ndarray = None            # quotes the cached IVs were computed from
+    ivs: np.ndarray = None             # OTM IV per strike (NaN where unusable)
+    dirty: bool = False
+    smile: Optional[Smile] = None
+    fits: int = 0
+    skips: int = 0
+    fit_ms: float = 0.0
+
+    def __post_init__(self):
+        n = len(self.strikes)
+        self.prices = np.full(2 * n, np.nan)
+        self.used = np.full(2 * n, np.nan)
+        self.ivs = np.full(n, np.nan)
+
+
+@dataclass
+class _Underlying:
+    name: str
+    spot_symbol: str
+    spot: float = float("nan")
+    expiries: Dict[date, _Expiry] = field(default_factory=dict)
+    # (sorted fitted expiries, their smiles); replaced in one assignment so a
+    # reader during a refit never pairs new smiles with the old expiry order
+    surface: Tuple[Tuple[date, ...], Tuple[Smile, ...]] = ((), ())
+
+
+# ---------- service ----------
+class VolSurfaceService:
+    def __init__(self, tol: float = 0.002, r: float = RATE):
+        self.tol = tol
+        self.r = r
+        self._lock = threading.Lock()         # quotes and tracking
+        self._fit_lock = threading.Lock()     # one refit at a time
+        self._underlyings: Dict[str, _Underlying] = {}
+        self._slots: Dict[str, List[Tuple[Any, int]]] = {}   # symbol -> [(_Expiry or _Underlying, slot)]
+        self.refits = 0
+        self.skips = 0
+        self.last_refit_ms = 0.0
+
+    # ---------- tracking ----------
+    def track(self, underlying: str, specs: Iterable[Any]) -> None:
+        """(Re)tracks an underlying from chain specs (app.strategy.runner.ChainSpec), one per expiry."""
+        specs = list(specs)
+        if not specs:
+            raise ValueError(f"no chains for {underlying}")
+        und = _Underlying(underlying, specs[0].spot_symbol)
+        for spec in specs:
+            und.expiries[spec.expiry] = _Expiry(spec.expiry, np.asarray(spec.strikes, dtype=float),
+                                                list(spec.ce_symbols), list(spec.pe_symbols))
+        with self._lock:
+            self._underlyings[underlying] = und
+            self._reindex()
+
+    def untrack(self, underlying: str) -> bool:
+        with self._lock:
+            found = self._underlyings.pop(underlying, None) is not None
+            self._reindex()
+        return found
+
+    def _reindex(self) -> None:
+        slots: Dict[str, List[Tuple[Any, int]]] = {}
+        for und in self._underlyings.values():
+            slots.setdefault(und.spot_symbol, []).append((und, -1))
+            for e in und.expiries.values():
+                for i, sym in enumerate(e.ce_symbols + e.pe_symbols):
+                    slots.setdefault(sym, []).append((e, i))
+        self._slots = slots
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._slots)
+
+    # ---------- quotes ----------
+    def update(self, prices: Dict[str, float]) -> None:
+        slots = self._slots
+        if not slots:
+            return
+        with self._lock:
+            for symbol, price in prices.items():
+                for target, i in slots.get(symbol, ()):
+                    if i < 0:
+                        target.spot = price
+                    elif target.prices[i] != price:
+                        target.prices[i] = price
+                        target.dirty = True
+
+    # ---------- fitting ----------
+    def refit(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Refits the dirty expiries whose changed quotes moved beyond `tol`; returns counts."""
+        now = now or datetime.now(IST)
+        t0 = time.perf_counter()
+        fitted = skipped = 0
+        with self._fit_lock:
+            # Quotes are copied under the short lock; IVs and fits run without blocking update()
+            with self._lock:
+                work = []
+                for und in self._underlyings.values():
+                    for e in und.expiries.values():
+                        if e.dirty:
+                            e.dirty = False
+                            work.append((und, e, e.prices.copy(), und.spot))
+            touched = {}
+            for und, e, prices, spot in work:
+                if self._refit_expiry(e, prices, spot, now):
+                    fitted += 1
+                else:
+                    skipped += 1
+                touched[und.name] = und
+            for und in touched.values():
+                smiles = sorted((e.smile for e in und.expiries.values() if e.smile), key=lambda s: s.expiry)
+                und.surface = (tuple(s.expiry for s in smiles), tuple(smiles))
+        self.refits += fitted
+        self.skips += skipped
+        self.last_refit_ms = (time.perf_counter() - t0) * 1000
+        return {"fitted": fitted, "skipped": skipped}
+
+    def _refit_expiry(self, e: _Expiry, prices: np.ndarray, spot: float, now: datetime) -> bool:
+        t0 = time.perf_counter()
+        n = len(e.strikes)
+        t = year_fraction(e.expiry, now)
+        ce, pe = prices[:n], prices[n:]
+        forward = self._forward(e.strikes, ce, pe, spot, t)
+        if not np.isfinite(forward):
+            return False
+
+        # OTM side per strike; only quotes that changed (or flipped side with the forward) get a new IV
+        is_call = e.strikes >= forward
+        otm = np.where(is_call, ce, pe)
+        prev = np.where(is_call, e.used[:n], e.used[n:])
+        smile = e.smile
+        moved = smile is None or abs(forward / smile.forward - 1.0) > 1e-4
+        changed = np.ones(n, bool) if moved else ~(otm == prev)
+        usable = np.isfinite(otm) & (otm >= MIN_PRICE)
+        idx = np.nonzero(changed & usable)[0]
+        e.ivs[changed & ~usable] = np.nan
+        if idx.size:
+            disc = np.exp(-self.r * t)
+            e.ivs[idx] = implied_vol(otm[idx], forward * disc, e.strikes[idx], t, is_call[idx], self.r,
+                                     guess=np.where(np.isfinite(e.ivs[idx]), e.ivs[idx], 0.2))
+        e.used[:] = prices
+
+        ok = np.isfinite(e.ivs)
+        if ok.sum() < 5:
+            return False
+        if smile is not None:
+            # Keep the cached smile (in moneyness, re-anchored on the new forward) if it still prices the changed quotes
+            check = changed & ok
+            model = np.sqrt(np.maximum(svi_w(np.log(e.strikes[check] / forward), smile.params), 0.0) / t)
+            if not check.any() or np.max(np.abs(model - e.ivs[check])) <= self.tol:
+                if moved:
+                    e.smile = replace(smile, t=t, forward=forward)
+                e.skips += 1
+                return False
+
+        k = np.log(e.strikes[ok] / forward)
+        w = e.ivs[ok] ** 2 * t
+        params, iters = fit_svi(k, w, None if smile is None else smile.params, max_iter=100 if smile is None else 20)
+        fit_iv = np.sqrt(np.maximum(svi_w(k, params), 0.0) / t)
+        e.smile = Smile(e.expiry, t, forward, tuple(params.tolist()), float(np.sqrt(np.mean((fit_iv - e.ivs[ok]) ** 2))),
+                        int(ok.sum()), iters, now)
+        e.fits += 1
+        e.fit_ms = (time.perf_counter() - t0) * 1000
+        return True
+
+    def _forward(self, strikes: np.ndarray, ce: np.ndarray, pe: np.ndarray, spot: float, t: float) -> float:
+        # Put-call parity on the strikes nearest the money: F = K + e^{rt} (C - P)
+        both = np.nonzero(np.isfinite(ce) & np.isfinite(pe))[0]
+        if both.size:
+            near = both[np.argsort(np.abs(ce[both] - pe[both]))[:PARITY_STRIKES]]
+            return float(np.median(strikes[near] + np.exp(self.r * t) * (ce[near] - pe[near])))
+        return spot * np.exp(self.r * t)
+
+    # ---------- reads ----------
+    def iv(self, underlying: str, strike, expiry: date):
+        """Interpolated IV for a strike (or array of strikes) at any expiry between the first and last fit."""
+        und = self._underlyings.get(underlying)
+        order, smiles = und.surface if und is not None else ((), ())
+        if not smiles:
+            raise KeyError(f"no fitted surface for {underlying}")
+        i = bisect.bisect_left(order, expiry)
+        if i < len(order) and order[i] == expiry:
+            return smiles[i].iv(strike)
+        if i == 0 or i == len(order):
+            # Outside the fitted range: hold the nearest smile's vol at the same moneyness
+            return smiles[min(i, len(order) - 1)].iv(strike)
+        lo, hi = smiles[i - 1], smiles[i]
+        x = (expiry - lo.expiry).days / max((hi.expiry - lo.expiry).days, 1)
+        t = lo.t + x * (hi.t - lo.t)
+        fwd = lo.forward * (hi.forward / lo.forward) ** x
+        if np.ndim(strike) == 0:
+            k = math.log(strike / fwd)
+            w = (1 - x) * _svi_w_scalar(k, lo.params) + x * _svi_w_scalar(k, hi.params)
+            return math.sqrt(max(w, 0.0) / t)
+        k = np.log(np.asarray(strike, dtype=float) / fwd)
+        w = (1 - x) * svi_w(k, lo.params) + x * svi_w(k, hi.params)
+        return np.sqrt(np.maximum(w, 0.0) / t)
+
+    def snapshot(self, underlying: str) -> Dict[str, Any]:
+        und = self._underlyings.get(underlying)
+        if und is None:
+            raise KeyError(underlying)
+        out = {}
+        for exp, e in sorted(und.expiries.items()):
+            s = e.smile
+            out[exp.isoformat()] = {
+                "strikes": len(e.strikes),
+                "fits": e.fits,
+                "skips": e.skips,
+                "fit_ms": round(e.fit_ms, 3),
+                "smile": None if s is None else {
+                    **dict(zip(("a", "b", "rho", "m", "sigma"), s.params)),
+                    "forward": round(s.forward, 2),
+                    "t": s.t,
+                    "atm_iv": round(float(s.iv(s.forward)), 4),
+                    "rmse": round(s.rmse, 5),
+                    "points": s.points,
+                    "iterations": s.iterations,
+                    "fitted_at": s.fitted_at.isoformat(),
+                },
+            }
+        return {"underlying": underlying, "spot": None if not np.isfinite(und.spot) else und.spot, "expiries": out}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "underlyings": sorted(self._underlyings),
+            "symbols": len(self._slots),
+            "tol": self.tol,
+            "refits": self.refits,
+            "skips": self.skips,
+            "last_refit_ms": round(self.last_refit_ms, 3),
+        }
+
+
+def surface_expiries(expiries: Iterable[date], count: int = 2) -> List[date]:
+    """The nearest `count` expiries plus the nearest monthly (the last listed expiry of its month)."""
+    exps = sorted(set(expiries))
+    monthly = next((e for e, nxt in zip(exps, exps[1:]) if (nxt.year, nxt.month) != (e.year, e.month)), None)
+    return sorted(set(exps[:count]) | ({monthly} if monthly else set()))
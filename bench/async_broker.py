@@ -0,0 +1,93 @@
+# bench/async_broker.py
+"""
+Sync (kiteconnect on a 40-thread pool, i.e. Starlette's default) vs async
+(pooled aiohttp) LTP calls under simulated broker latency, against the local
+fake Kite server.
+
+    python -m bench.async_broker --requests 400 --latency fixed:50
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _pct(samples, p):
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(p * len(s)))] * 1000
+
+
+def _report(name, wall, samples):
+    print(f"{name:<28} {len(samples) / wall:8.0f} req/s   p50 {_pct(samples, 0.5):7.1f} ms   "
+          f"p99 {_pct(samples, 0.99):7.1f} ms   wall {wall:6.2f} s")
+
+
+def run_sync(pricer, symbol, n, threads):
+    samples = []
+
+    def one(_):
+        t = time.perf_counter()
+        pricer.ltp(symbol)
+        samples.append(time.perf_counter() - t)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(n)))
+    _report(f"sync, {threads} threads", time.perf_counter() - t0, samples)
+
+
+async def run_async(pricer, symbol, n):
+    samples = []
+
+    async def one():
+        t = time.perf_counter()
+        await pricer.altp(symbol)
+        samples.append(time.perf_counter() - t)
+
+    await pricer.altp(symbol)  # warm the connection pool
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    _report("async, aiohttp pool", time.perf_counter() - t0, samples)
+    await pricer.aclose()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=400)
+    ap.add_argument("--threads", type=int, default=40)
+    ap.add_argument("--latency", default="fixed:50")
+    ap.add_argument("--port", type=int, default=8799)
+    args = ap.parse_args()
+
+    root = f"http://127.0.0.1:{args.port}"
+    os.environ["KITE_ROOT"] = root
+    server = subprocess.Popen(
+        [sys.executable, "-m", "tools.fake_kite", "--port", str(args.port), "--latency", args.latency,
+         "--stocks", "0"],
+    )
+    try:
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(f"{root}/_fake/stats")
+                break
+            except OSError:
+                time.sleep(0.1)
+
+        from app.brokers.zerodha_data import ZerodhaData
+
+        pricer = ZerodhaData(api_key="bench", access_token="bench")
+        symbol = "NSE:NIFTY 50"
+        print(f"{args.requests} concurrent LTP calls, broker latency {args.latency}")
+        run_sync(pricer, symbol, args.requests, args.threads)
+        asyncio.run(run_async(pricer, symbol, args.requests))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
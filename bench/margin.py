@@ -0,0 +1,73 @@
+# bench/margin.py
+"""
+Margin-estimator cost on a synthetic book of short strangles and hedges across
+the index underlyings: full-book scenario evaluation, a single what-if against
+the cached book (the pre-trade check), and a vectorized what-if over a whole
+chain of candidate strikes.
+
+    python -m bench.margin --positions 40 --rounds 2000
+"""
+import argparse
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+
+def main():
+    from app.risk.margin import MarginEstimator
+    from app.strategy.runner import LOT_SIZES, STRIKE_STEPS
+    from app.symbols import format_option, spot_symbol
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--positions", type=int, default=40)
+    ap.add_argument("--rounds", type=int, default=2000)
+    ap.add_argument("--candidates", type=int, default=80, help="strikes in the vectorized what-if")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(5)
+    spots = {"NIFTY": 24500.0, "BANKNIFTY": 55000.0, "FINNIFTY": 26000.0, "MIDCPNIFTY": 13000.0}
+    expiry = date.today() + timedelta(days=6)
+    est = MarginEstimator(max_age=3600)
+    est.update({spot_symbol(u): s for u, s in spots.items()})
+
+    positions = []
+    names = list(spots)
+    for i in range(args.positions):
+        u = names[i % len(names)]
+        step = STRIKE_STEPS[u]
+        off = int(rng.integers(2, 12)) * step
+        kind = "CE" if i % 2 else "PE"
+        strike = round(spots[u] / step) * step + (off if kind == "CE" else -off)
+        side = "BUY" if rng.random() < 0.25 else "SELL"
+        positions.append(SimpleNamespace(symbol=format_option(u, expiry, strike, kind), side=side, qty=LOT_SIZES[u]))
+
+    t0 = time.perf_counter()
+    for _ in range(20):
+        est._book = None
+        report = est.portfolio(positions)
+    print(f"{args.positions} positions, 4 underlyings: margin {report['total']:,.0f} "
+          f"(span {report['span']:,.0f}, exposure {report['exposure']:,.0f})")
+    print(f"full book:            {(time.perf_counter() - t0) / 20 * 1000:7.3f} ms")
+
+    cand = format_option("NIFTY", expiry, 25500, "CE")
+    est.what_if(cand, "SELL", 75, positions=positions)
+    samples = np.empty(args.rounds)
+    for i in range(args.rounds):
+        t0 = time.perf_counter()
+        est.what_if(cand, "SELL", 75, positions=positions)
+        samples[i] = time.perf_counter() - t0
+    print(f"what-if (one order):  {np.median(samples) * 1e6:7.1f} us p50  {np.percentile(samples, 99) * 1e6:7.1f} us p99")
+
+    strikes = round(spots["NIFTY"] / 50) * 50 + 50 * np.arange(-args.candidates // 2, args.candidates // 2)
+    chain = [format_option("NIFTY", expiry, k, "CE" if k >= spots["NIFTY"] else "PE") for k in strikes]
+    t0 = time.perf_counter()
+    for _ in range(100):
+        est.what_if_many(chain, "SELL", 75, positions=positions)
+    ms = (time.perf_counter() - t0) / 100 * 1000
+    print(f"what-if ({len(chain)} strikes): {ms:7.3f} ms  ({ms / len(chain) * 1000:.1f} us/strike)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# bench/recorder.py
+"""
+Tick-recorder cost: time spent on the hot path per recorded price, and the
+on-disk size per row once chunks are compressed, for a synthetic option
+stream across a few underlyings.
+
+    python -m bench.recorder --rows 2000000 --symbols 400
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+
+def main():
+    from app.recorder import TICK, TickRecorder, load
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--symbols", type=int, default=400)
+    ap.add_argument("--batch", type=int, default=50, help="prices per record_many call")
+    ap.add_argument("--chunk-rows", type=int, default=65536)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(3)
+    names = ["NIFTY", "BANKNIFTY", "FINNIFTY", "MIDCPNIFTY"]
+    symbols = [f"NFO:{names[i % 4]}25AUG{20000 + 50 * i}{'CE' if i % 2 else 'PE'}" for i in range(args.symbols)]
+    price = rng.uniform(5, 500, args.symbols)
+    batches = []
+    for _ in range(200):
+        idx = rng.choice(args.symbols, args.batch, replace=False)
+        price[idx] = np.maximum(0.05, np.round(price[idx] * (1 + rng.normal(0, 0.002, args.batch)), 2))
+        batches.append({symbols[i]: float(price[i]) for i in idx})
+
+    root = tempfile.mkdtemp(prefix="ticks-")
+    try:
+        rec = TickRecorder(root, chunk_rows=args.chunk_rows, flush_seconds=1.0)
+        rec.start()
+        n = 0
+        t0 = time.perf_counter()
+        while n < args.rows:
+            rec.record_many(batches[(n // args.batch) % len(batches)], TICK)
+            n += args.batch
+        hot = time.perf_counter() - t0
+        rec.close()
+        total = time.perf_counter() - t0
+        s = rec.stats()
+        print(f"{n} rows, {args.symbols} symbols, batches of {args.batch}")
+        print(f"hot path:   {hot / n * 1e9:7.0f} ns/row   ({n / hot:,.0f} rows/s)")
+        print(f"incl flush: {total / n * 1e9:7.0f} ns/row   {s['chunks']} chunks, {s['bytes_per_row']} bytes/row")
+
+        t0 = time.perf_counter()
+        cols = load(root)
+        print(f"read back:  {len(cols['ts'])} rows in {time.perf_counter() - t0:.2f} s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
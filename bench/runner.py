@@ -0,0 +1,101 @@
+# bench/runner.py
+"""
+Strategy-runner throughput with synthetic chains: how many chain evaluations
+(IV solve + deltas + decision, per underlying snapshot) per second the worker
+pool sustains while prices stream into the shared PriceBoard, for 1..N
+worker processes. Orders go to a stub that fills everything.
+
+    python -m bench.runner --underlyings 8 --strikes 60 --seconds 5
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+
+
+def _chains(n, strikes):
+    from app.greeks import bs_price
+    from app.strategy.runner import synthetic_chain
+
+    rng = np.random.default_rng(7)
+    chains = []
+    for i in range(n):
+        spot = float(rng.uniform(500, 50000))
+        spec = synthetic_chain(f"SYN{i}", spot, strikes_each_side=strikes)
+        spec.lot_size = 50
+        chains.append((spec, spot))
+    return chains, bs_price
+
+
+async def run(workers, chains, bs_price, seconds):
+    from app.strategy.runner import StrategyRunner
+    from app.strategy.strangle import StrangleConfig
+    from datetime import time as dtime
+
+    async def fill(intent):
+        return {"ok": True, "price": intent["price"], "position_id": 1}
+
+    specs = [s for s, _ in chains]
+    runner = StrategyRunner(specs, fill, workers=workers,
+                            config=StrangleConfig(entry_at=dtime(0, 0), exit_at=dtime(23, 59), expiry_exit_at=dtime(23, 59)))
+    runner.start()
+    rng = np.random.default_rng(1)
+    t = 3 / 365
+
+    def make_tick():
+        prices = {}
+        for spec, spot in chains:
+            s = spot * (1 + rng.normal(0, 0.001))
+            vol = 0.15 + 0.5 * np.log(spec.strikes / s) ** 2
+            ce = bs_price(s, spec.strikes, t, vol, True)
+            pe = bs_price(s, spec.strikes, t, vol, False)
+            prices[spec.spot_symbol] = s
+            prices.update(zip(spec.ce_symbols, ce.tolist()))
+            prices.update(zip(spec.pe_symbols, pe.tolist()))
+        return prices
+
+    # Precomputed snapshots, so the writer side costs next to nothing and the workers saturate
+    ticks = [make_tick() for _ in range(20)]
+
+    # warm up: wait for every worker to import and report
+    runner.update(ticks[0])
+    while len(runner.stats.workers) < len(runner.shards):
+        await asyncio.sleep(0.1)
+    start_evals = runner.status()["evals"]
+    start_busy = sum(w["busy_s"] for w in runner.stats.workers.values())
+    t0 = time.perf_counter()
+    updates = 0
+    while time.perf_counter() - t0 < seconds:
+        runner.update(ticks[updates % len(ticks)])
+        updates += 1
+        await asyncio.sleep(0.002)
+    await asyncio.sleep(1.2)  # last stats report
+    evals = runner.status()["evals"] - start_evals
+    busy = sum(w["busy_s"] for w in runner.stats.workers.values()) - start_busy
+    await runner.stop()
+    return evals / seconds, updates / seconds, busy / max(evals, 1) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--underlyings", type=int, default=8)
+    ap.add_argument("--strikes", type=int, default=60, help="strikes each side of ATM")
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    chains, bs_price = _chains(args.underlyings, args.strikes)
+    print(f"{args.underlyings} underlyings x {2 * args.strikes + 1} strikes, {os.cpu_count()} CPUs")
+    counts = sorted({2 ** i for i in range(args.max_workers.bit_length()) if 2 ** i <= args.max_workers} | {args.max_workers})
+    base = None
+    for w in counts:
+        rate, updates, ms = asyncio.run(run(w, chains, bs_price, args.seconds))
+        base = base or rate
+        print(f"workers {w:>2}: {rate:8.0f} chain evals/s  ({rate / base:4.2f}x)   {ms:5.2f} ms/eval   "
+              f"board updates {updates:6.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# bench/scheduler.py
+"""
+Scheduler timing jitter while the API is under load. Runs the app in-process
+on uvicorn (mock broker, throwaway SQLite DB), adds a probe job firing every
+`--every` seconds, and hammers the API with concurrent requests from a
+separate load-generator process meanwhile.
+
+    python -m bench.scheduler --seconds 10 --concurrency 50
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+PATHS = ["/broker/ltp?symbol=NFO:NIFTY25JAN23000CE", "/broker/positions", "/broker/pnl", "/scheduler/jobs"]
+
+
+def load(root, api_key, seconds, concurrency, out):
+    import aiohttp
+
+    async def go():
+        done = 0
+
+        async def client(session, i):
+            nonlocal done
+            end = time.perf_counter() + seconds
+            while time.perf_counter() < end:
+                async with session.get(root + PATHS[i % len(PATHS)]) as r:
+                    await r.read()
+                done += 1
+                i += 1
+
+        async with aiohttp.ClientSession(headers={"x-api-key": api_key}) as session:
+            await session.post(root + "/broker/order", json={"symbol": "NFO:NIFTY25JAN23000CE", "side": "SELL", "qty": 50})
+            await asyncio.gather(*(client(session, i) for i in range(concurrency)))
+        out.put(done)
+
+    asyncio.run(go())
+
+
+async def run(args):
+    import uvicorn
+
+    from app import state
+    from app.main import app, API_KEY
+    from app.scheduler import Every
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    serve = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    async def probe():
+        pass
+
+    probes = {"async job": "bench-probe", "sync job": "bench-probe-sync"}
+    state.scheduler.add("bench-probe", probe, Every(args.every))
+    state.scheduler.add("bench-probe-sync", lambda: None, Every(args.every))
+    await asyncio.sleep(args.every * 20)
+    for label, name in probes.items():
+        job = state.scheduler.get(name)
+        print(f"idle, {label:<10} jitter {_fmt(job.jitter)}")
+        job.jitter.clear()
+
+    out = mp.Queue()
+    gen = mp.Process(target=load, args=(f"http://127.0.0.1:{args.port}", API_KEY, args.seconds, args.concurrency, out))
+    gen.start()
+    while gen.is_alive():
+        await asyncio.sleep(0.1)
+    done = out.get()
+
+    print(f"under load ({done / args.seconds:.0f} req/s over {args.concurrency} connections):")
+    for label, name in probes.items():
+        job = state.scheduler.get(name)
+        print(f"  {label:<16} jitter {_fmt(job.jitter)}, missed {job.missed}")
+    server.should_exit = True
+    await serve
+
+
+def _fmt(samples):
+    from app.scheduler import _summary
+    s = _summary(samples)
+    return f"p50 {s['p50']} ms, p99 {s['p99']} ms, max {s['max']} ms ({s['samples']} runs)"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--every", type=float, default=0.1)
+    ap.add_argument("--port", type=int, default=8798)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tmp}/bench.db")
+    os.environ.setdefault("JOURNAL_PATH", f"{tmp}/orders.journal")
+    os.environ.setdefault("BROKER", "mock")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
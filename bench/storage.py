@@ -0,0 +1,96 @@
+# bench/storage.py
+"""
+Hot-path query cost as trade history grows: builds a scratch SQLite DB through
+the migrations, fills it with `--months` of closed strangles plus a few open
+positions, then times the open-position lookup (book_fill / risk checks) and
+today's positions (P&L) before and after archiving everything older than
+`--keep-days`.
+
+    python -m bench.storage --months 24 --per-day 100
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def _timed(fn, rounds):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - t0) / rounds * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--months", type=int, default=24)
+    ap.add_argument("--per-day", type=int, default=100, help="closed positions per trading day")
+    ap.add_argument("--keep-days", type=int, default=90)
+    ap.add_argument("--rounds", type=int, default=500)
+    args = ap.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="storage-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    from sqlalchemy import insert
+    from app import archive
+    from app.db import SessionLocal, init_db
+    from app.model import Position
+    from app.order_model import Order
+    from app.pnl import todays_positions
+
+    init_db()
+    rng = random.Random(1)
+    now = datetime.utcnow()
+    positions, orders = [], []
+    pid = oid = 0
+    for day in range(args.months * 30, 0, -1):
+        opened = now - timedelta(days=day, hours=6)
+        if opened.weekday() >= 5:
+            continue
+        for _ in range(args.per_day):
+            pid += 1
+            sym = f"NFO:NIFTY{rng.randrange(20000, 26000, 50)}{rng.choice('CP')}E"
+            closed = opened + timedelta(minutes=rng.randrange(5, 360))
+            positions.append(dict(id=pid, symbol=sym, side="SELL", qty=75, avg_price=100.0, status="CLOSED",
+                                  opened_at=opened, closed_at=closed))
+            for side, at in (("SELL", opened), ("BUY", closed)):
+                oid += 1
+                orders.append(dict(id=oid, position_id=pid, symbol=sym, side=side, qty=75, price=100.0,
+                                   status="FILLED", created_at=at))
+    open_syms = [f"NFO:NIFTY{24000 + 50 * i}CE" for i in range(20)]
+    for sym in open_syms:
+        pid += 1
+        positions.append(dict(id=pid, symbol=sym, side="SELL", qty=75, avg_price=100.0, status="OPEN",
+                              opened_at=now, closed_at=None))
+    with SessionLocal() as db:
+        db.execute(insert(Position), positions)
+        db.execute(insert(Order), orders)
+        db.commit()
+    print(f"{len(positions):,} positions / {len(orders):,} orders over {args.months} months ({path})")
+
+    def open_lookup():
+        with SessionLocal() as db:
+            db.query(Position).filter(Position.symbol == rng.choice(open_syms), Position.status == "OPEN").first()
+
+    def today():
+        with SessionLocal() as db:
+            todays_positions(db)
+
+    before = _timed(open_lookup, args.rounds), _timed(today, args.rounds)
+    t0 = time.perf_counter()
+    res = archive.archive_closed(SessionLocal, args.keep_days, batch=5000)
+    took = time.perf_counter() - t0
+    after = _timed(open_lookup, args.rounds), _timed(today, args.rounds)
+    print(f"archived {res['positions']:,} positions / {res['orders']:,} orders in {res['batches']} batches, {took:.1f} s")
+    print(f"{'':22}{'before':>10}{'after':>10}")
+    print(f"{'open position lookup':22}{before[0]:8.0f}us{after[0]:8.0f}us")
+    print(f"{'today positions':22}{before[1]:8.0f}us{after[1]:8.0f}us")
+    with SessionLocal() as db:
+        print(archive.stats(db))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# bench/volsurface.py
+"""
+Vol-surface refit cost on synthetic NIFTY weekly + monthly chains priced from
+known SVI smiles: cold fit, refit after quote noise inside the tolerance
+(skipped), warm-started refit after a vol move, and interpolated IV reads.
+Also reports how far the fitted smile is from the true one.
+
+    python -m bench.volsurface --strikes 40 --rounds 200
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+
+def _chain(volsurface, greeks, runner, spot, expiry, strikes_each_side, params, now):
+    spec = runner.synthetic_chain("NIFTY", spot, strikes_each_side, today=now.date(), expiry=expiry)
+    t = greeks.year_fraction(expiry, now)
+    fwd = spot * np.exp(greeks.RATE * t)
+    vol = np.sqrt(volsurface.svi_w(np.log(spec.strikes / fwd), params) / t)
+    ce = greeks.bs_price(spot, spec.strikes, t, vol, True)
+    pe = greeks.bs_price(spot, spec.strikes, t, vol, False)
+    return spec, ce, pe
+
+
+def main():
+    from app import greeks, volsurface
+    from app.pnl import IST
+    from app.strategy import runner
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--strikes", type=int, default=40, help="strikes each side of ATM")
+    ap.add_argument("--rounds", type=int, default=200)
+    ap.add_argument("--tol", type=float, default=0.002)
+    args = ap.parse_args()
+
+    now = datetime(2025, 8, 11, 10, 30, tzinfo=IST)     # a Monday
+    spot = 24500.0
+    weekly, monthly = now.date() + timedelta(days=3), now.date() + timedelta(days=17)
+    true = {weekly: np.array((0.0004, 0.012, -0.45, 0.004, 0.02)),
+            monthly: np.array((0.0015, 0.030, -0.40, 0.010, 0.05))}
+    rng = np.random.default_rng(11)
+
+    def quotes(shift=0.0, noise=0.0):
+        prices, specs = {}, []
+        for exp, p in true.items():
+            q = p.copy()
+            q[0] += shift
+            spec, ce, pe = _chain(volsurface, greeks, runner, spot, exp, args.strikes, q, now)
+            ce = np.round(ce * (1 + rng.normal(0, noise, ce.shape)), 2) if noise else ce
+            pe = np.round(pe * (1 + rng.normal(0, noise, pe.shape)), 2) if noise else pe
+            prices.update(zip(spec.ce_symbols, ce.tolist()))
+            prices.update(zip(spec.pe_symbols, pe.tolist()))
+            specs.append(spec)
+        prices[specs[0].spot_symbol] = spot
+        return specs, prices
+
+    svc = volsurface.VolSurfaceService(tol=args.tol)
+    specs, prices = quotes()
+    svc.track("NIFTY", specs)
+    print(f"NIFTY weekly + monthly, {2 * args.strikes + 1} strikes each, tol {args.tol}")
+
+    svc.update(prices)
+    t0 = time.perf_counter()
+    svc.refit(now)
+    print(f"cold fit:            {(time.perf_counter() - t0) * 1000:7.2f} ms")
+    for exp, p in true.items():
+        spec = next(s for s in specs if s.expiry == exp)
+        t = greeks.year_fraction(exp, now)
+        fwd = spot * np.exp(greeks.RATE * t)
+        truth = np.sqrt(volsurface.svi_w(np.log(spec.strikes / fwd), p) / t)
+        err = np.max(np.abs(svc.iv("NIFTY", spec.strikes, exp) - truth))
+        print(f"  {exp}: max |iv - true| {err:.2e}")
+
+    timings = {"skipped": [], "refit": []}
+    for i in range(args.rounds):
+        shift = 0.00002 * (i % 2 and 1 or -1) if i % 4 == 0 else 0.0
+        _, prices = quotes(shift=shift, noise=0.0005)
+        svc.update(prices)
+        t0 = time.perf_counter()
+        res = svc.refit(now)
+        ms = (time.perf_counter() - t0) * 1000
+        timings["refit" if res["fitted"] else "skipped"].append(ms)
+    for kind, xs in timings.items():
+        if xs:
+            print(f"{kind + ':':<20} {np.median(xs):7.2f} ms p50  {np.percentile(xs, 99):7.2f} ms p99  ({len(xs)} rounds)")
+
+    strikes = rng.uniform(22000, 27000, 100_000)
+    mid = weekly + timedelta(days=7)
+    t0 = time.perf_counter()
+    for k in strikes[:20_000]:
+        svc.iv("NIFTY", k, mid)
+    print(f"iv() scalar, interp: {(time.perf_counter() - t0) / 20_000 * 1e6:7.2f} us/call")
+    t0 = time.perf_counter()
+    svc.iv("NIFTY", strikes, weekly)
+    print(f"iv() vector:         {(time.perf_counter() - t0) / len(strikes) * 1e9:7.1f} ns/strike")
+    print(svc.stats())
+
+
+if __name__ == "__main__":
+    main()
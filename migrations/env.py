@@ -0,0 +1,48 @@
+# migrations/env.py
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.db import Base, engine
+import app.model  # noqa: F401  (register tables on Base.metadata)
+import app.order_model  # noqa: F401
+import app.summary_model  # noqa: F401
+import app.archive_model  # noqa: F401
+import app.trigger_model  # noqa: F401
+
+config = context.config
+
+# The app runs migrations in-process at startup; only the CLI configures logging
+if config.config_file_name is not None and not config.attributes.get("embedded"):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=engine.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=connection.dialect.name == "sqlite",  # SQLite ALTERs go through table copies
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
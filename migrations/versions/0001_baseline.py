@@ -0,0 +1,86 @@
+"""baseline: positions, orders, daily_summary
+
+Matches the schema the app used to build with create_all(). Databases created
+that way have the tables but no alembic_version row, so every step here checks
+what already exists and only fills the gaps (including orders.journal_id,
+which older databases lack).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    insp = sa.inspect(op.get_bind())
+    tables = set(insp.get_table_names())
+
+    if "positions" not in tables:
+        op.create_table(
+            "positions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("symbol", sa.String(), nullable=False),
+            sa.Column("side", sa.String(), nullable=False),
+            sa.Column("qty", sa.Integer(), nullable=False),
+            sa.Column("avg_price", sa.Float(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("opened_at", sa.DateTime(), nullable=True),
+            sa.Column("closed_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_positions_id", "positions", ["id"])
+        op.create_index("ix_positions_symbol", "positions", ["symbol"])
+
+    if "orders" not in tables:
+        op.create_table(
+            "orders",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("position_id", sa.Integer(), sa.ForeignKey("positions.id"), nullable=False),
+            sa.Column("symbol", sa.String(), nullable=False),
+            sa.Column("side", sa.String(), nullable=False),
+            sa.Column("qty", sa.Integer(), nullable=False),
+            sa.Column("price", sa.Float(), nullable=False),
+            sa.Column("status", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("journal_id", sa.String(), nullable=True),
+        )
+        op.create_index("ix_orders_id", "orders", ["id"])
+        op.create_index("ix_orders_position_id", "orders", ["position_id"])
+        op.create_index("ix_orders_journal_id", "orders", ["journal_id"], unique=True)
+    else:
+        if "journal_id" not in {c["name"] for c in insp.get_columns("orders")}:
+            op.add_column("orders", sa.Column("journal_id", sa.String(), nullable=True))
+        if "ix_orders_journal_id" not in {i["name"] for i in insp.get_indexes("orders")}:
+            op.create_index("ix_orders_journal_id", "orders", ["journal_id"], unique=True)
+
+    if "daily_summary" not in tables:
+        op.create_table(
+            "daily_summary",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("underlying", sa.String(), nullable=False),
+            sa.Column("expiry", sa.Date(), nullable=True),
+            sa.Column("positions", sa.Integer(), nullable=False),
+            sa.Column("wins", sa.Integer(), nullable=False),
+            sa.Column("losses", sa.Integer(), nullable=False),
+            sa.Column("realised", sa.Float(), nullable=False),
+            sa.Column("gross_profit", sa.Float(), nullable=False),
+            sa.Column("gross_loss", sa.Float(), nullable=False),
+            sa.Column("premium_sold", sa.Float(), nullable=False),
+            sa.Column("refreshed_at", sa.DateTime(), nullable=True),
+            sa.UniqueConstraint("day", "underlying", "expiry", name="uq_daily_summary_key"),
+        )
+        op.create_index("ix_daily_summary_id", "daily_summary", ["id"])
+        op.create_index("ix_daily_summary_day", "daily_summary", ["day"])
+
+
+def downgrade() -> None:
+    op.drop_table("daily_summary")
+    op.drop_table("orders")
+    op.drop_table("positions")
@@ -0,0 +1,70 @@
+"""trade storage: access-path indexes and monthly archive tables
+
+- positions (status, symbol): the open position for a symbol (book_fill, risk checks)
+- positions (status, closed_at): closed-by-date scans (analytics, archival)
+- positions (opened_at), orders (created_at): date-range P&L queries
+- positions_archive / orders_archive: cold storage filled by app/archive.py.
+  Range-partitioned by month on Postgres (partitions are created on demand by
+  the archival job); plain indexed tables on SQLite.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_positions_status_symbol", "positions", ["status", "symbol"])
+    op.create_index("ix_positions_status_closed_at", "positions", ["status", "closed_at"])
+    op.create_index("ix_positions_opened_at", "positions", ["opened_at"])
+    op.create_index("ix_orders_created_at", "orders", ["created_at"])
+
+    op.create_table(
+        "positions_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("closed_at", sa.DateTime(), nullable=False),
+        sa.Column("symbol", sa.String(), nullable=False),
+        sa.Column("side", sa.String(), nullable=False),
+        sa.Column("qty", sa.Integer(), nullable=False),
+        sa.Column("avg_price", sa.Float(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("opened_at", sa.DateTime(), nullable=True),
+        sa.Column("archived_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id", "closed_at"),
+        postgresql_partition_by="RANGE (closed_at)",
+    )
+    op.create_index("ix_positions_archive_closed_at", "positions_archive", ["closed_at"])
+    op.create_index("ix_positions_archive_symbol", "positions_archive", ["symbol"])
+
+    op.create_table(
+        "orders_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("position_id", sa.Integer(), nullable=False),
+        sa.Column("symbol", sa.String(), nullable=False),
+        sa.Column("side", sa.String(), nullable=False),
+        sa.Column("qty", sa.Integer(), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("journal_id", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id", "created_at"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.create_index("ix_orders_archive_position_id", "orders_archive", ["position_id"])
+    op.create_index("ix_orders_archive_created_at", "orders_archive", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("orders_archive")
+    op.drop_table("positions_archive")
+    op.drop_index("ix_orders_created_at", table_name="orders")
+    op.drop_index("ix_positions_opened_at", table_name="positions")
+    op.drop_index("ix_positions_status_closed_at", table_name="positions")
+    op.drop_index("ix_positions_status_symbol", table_name="positions")
@@ -0,0 +1,26 @@
+"""drop the single-column positions.symbol index
+
+ix_positions_status_symbol (0002) serves every symbol lookup on positions
+(they all filter on status too), so ix_positions_symbol only costs writes.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Databases created before migrations may not have it
+    if "ix_positions_symbol" in {i["name"] for i in sa.inspect(op.get_bind()).get_indexes("positions")}:
+        op.drop_index("ix_positions_symbol", table_name="positions")
+
+
+def downgrade() -> None:
+    op.create_index("ix_positions_symbol", "positions", ["symbol"])
@@ -0,0 +1,85 @@
+# tests/conftest.py
+import os
+import tempfile
+
+# app.db builds its engine from DATABASE_URL at import: point it at a scratch DB first
+_TMP = tempfile.mkdtemp(prefix="optionbot-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP}/app.db"
+os.environ.setdefault("JOURNAL_PATH", os.path.join(_TMP, "orders.journal"))
+os.environ.setdefault("RECORDER_PATH", os.path.join(_TMP, "ticks"))
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+import app.model  # noqa: F401  (register tables on Base.metadata)
+import app.order_model  # noqa: F401
+import app.summary_model  # noqa: F401
+import app.archive_model  # noqa: F401
+import app.trigger_model  # noqa: F401
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """A fresh SQLite DB with the current schema, per test."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'book.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def open_position(session_factory):
+    """Opens a position (symbol, side, qty, avg_price) and returns its id."""
+    from app.book import book_fill
+
+    def open_(symbol="NFO:NIFTY25APR24000CE", side="SELL", qty=75, price=100.0):
+        with session_factory() as db:
+            pos, _ = book_fill(db, symbol, side, qty, price)
+            db.commit()
+            return pos.id
+    return open_
+
+
+@pytest.fixture
+def closed_position(session_factory):
+    """Books a round trip (entry, exit) closed at `closed_at` (naive UTC) and returns the position id."""
+    from app.model import Position
+    from app.order_model import Order
+
+    def add(symbol, side, qty, entry, exit_, closed_at):
+        opened_at = closed_at - timedelta(hours=1)
+        with session_factory() as db:
+            pos = Position(symbol=symbol, side=side, qty=qty, avg_price=entry, status="CLOSED",
+                           opened_at=opened_at, closed_at=closed_at)
+            db.add(pos)
+            db.flush()
+            exit_side = "BUY" if side == "SELL" else "SELL"
+            db.add_all([
+                Order(position_id=pos.id, symbol=symbol, side=side, qty=qty, price=entry, created_at=opened_at),
+                Order(position_id=pos.id, symbol=symbol, side=exit_side, qty=qty, price=exit_, created_at=closed_at),
+            ])
+            db.commit()
+            return pos.id
+    return add
+
+
+@pytest.fixture
+def client():
+    """The app (mock broker) on a fresh database and order journal."""
+    from fastapi.testclient import TestClient
+
+    from app.config import JOURNAL_PATH
+    from app.db import engine
+
+    engine.dispose()
+    for path in (engine.url.database, JOURNAL_PATH):
+        if os.path.exists(path):
+            os.remove(path)
+    from app.main import app
+    with TestClient(app, headers={"x-api-key": "supersecret123"}) as c:
+        yield c
+    engine.dispose()
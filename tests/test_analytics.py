@@ -0,0 +1,89 @@
+# tests/test_analytics.py
+from datetime import date, datetime
+
+import pytest
+
+from app import analytics, archive
+from app.summary_model import DailySummary
+
+CE = "NFO:NIFTY25APR24000CE"
+BANK = "NFO:BANKNIFTY25APR52000PE"
+
+
+@pytest.fixture
+def book(closed_position):
+    # All times naive UTC; IST = UTC + 5:30
+    closed_position(CE, "SELL", 75, 100.0, 60.0, datetime(2025, 3, 3, 9, 0))        # +3000 on Mar 3
+    closed_position(BANK, "SELL", 30, 200.0, 250.0, datetime(2025, 3, 4, 9, 0))     # -1500 on Mar 4
+    closed_position(CE, "SELL", 75, 50.0, 40.0, datetime(2025, 3, 4, 19, 0))        # +750 on Mar 5 (00:30 IST)
+
+
+def test_refresh_and_daily(session_factory, book):
+    with session_factory() as db:
+        assert analytics.refresh_range(db, date(2025, 3, 1), date(2025, 3, 31)) == 3
+        db.commit()
+        rows = analytics.daily(db, date(2025, 3, 1), date(2025, 3, 31))
+    assert [(r["day"], r["pnl"], r["cum_pnl"], r["drawdown"]) for r in rows] == [
+        ("2025-03-03", 3000.0, 3000.0, 0.0),
+        ("2025-03-04", -1500.0, 1500.0, -1500.0),
+        ("2025-03-05", 750.0, 2250.0, -750.0),
+    ]
+
+
+def test_summary_and_breakdown(session_factory, book):
+    with session_factory() as db:
+        analytics.refresh_range(db, date(2025, 3, 1), date(2025, 3, 31))
+        db.commit()
+        s = analytics.summary(db, date(2025, 3, 1), date(2025, 3, 31))
+        by_und = analytics.breakdown(db, "underlying", date(2025, 3, 1), date(2025, 3, 31))
+        nifty = analytics.summary(db, date(2025, 3, 1), date(2025, 3, 31), underlying="nifty")
+    assert (s["realised"], s["positions"], s["wins"], s["losses"]) == (2250.0, 3, 2, 1)
+    assert (s["profit_factor"], s["max_drawdown"], s["best_day"], s["worst_day"]) == (2.5, -1500.0, 3000.0, -1500.0)
+    assert s["premium_sold"] == 75 * 100 + 30 * 200 + 75 * 50
+    assert [(r["underlying"], r["pnl"], r["positions"]) for r in by_und] == [("BANKNIFTY", -1500.0, 1), ("NIFTY", 3750.0, 2)]
+    assert (nifty["realised"], nifty["days"]) == (3750.0, 2)
+
+
+def test_refresh_replaces_rows(session_factory, book, closed_position):
+    with session_factory() as db:
+        analytics.refresh_range(db, date(2025, 3, 1), date(2025, 3, 31))
+        db.commit()
+    closed_position(CE, "SELL", 75, 10.0, 20.0, datetime(2025, 3, 3, 10, 0))        # -750, same day and key
+    with session_factory() as db:
+        analytics.refresh_range(db, date(2025, 3, 3), date(2025, 3, 3))
+        db.commit()
+        row = db.query(DailySummary).filter(DailySummary.day == date(2025, 3, 3)).one()
+        assert (row.positions, row.realised, row.wins, row.losses) == (2, 2250.0, 1, 1)
+        assert db.query(DailySummary).count() == 3
+
+
+def test_realised_on_matches_summary(session_factory, book):
+    with session_factory() as db:
+        assert analytics.realised_on(db, date(2025, 3, 4)) == -1500.0
+        assert analytics.realised_on(db, date(2025, 3, 5)) == 750.0
+        assert analytics.realised_on(db, date(2025, 3, 6)) == 0
+
+
+def test_refresh_incremental_only_touches_new_days(session_factory, book, closed_position):
+    with session_factory() as db:
+        assert analytics.refresh_incremental(db) == ["2025-03-03..2025-03-05"]
+        db.commit()
+        assert analytics.refresh_incremental(db) == []
+    closed_position(BANK, "SELL", 30, 100.0, 90.0, datetime.utcnow())
+    with session_factory() as db:
+        today = analytics._to_ist(datetime.utcnow()).date()
+        assert analytics.refresh_incremental(db) == [f"{today}..{today}"]
+
+
+def test_archived_positions_still_count(session_factory, book):
+    archive.archive_closed(session_factory, older_than_days=0, now=datetime(2025, 3, 4, 12, 0))
+    with session_factory() as db:
+        assert archive.stats(db)["archived_positions"] == 2
+        analytics.refresh_range(db, date(2025, 3, 1), date(2025, 3, 31))
+        db.commit()
+        assert analytics.summary(db, date(2025, 3, 1), date(2025, 3, 31))["realised"] == 2250.0
+
+
+def test_runs_collapse_contiguous_days():
+    days = [date(2025, 3, 5), date(2025, 3, 3), date(2025, 3, 4), date(2025, 3, 9)]
+    assert analytics._runs(days) == [(date(2025, 3, 3), date(2025, 3, 5)), (date(2025, 3, 9), date(2025, 3, 9))]
@@ -0,0 +1,79 @@
+# tests/test_archive.py
+from datetime import date, datetime
+
+from app import archive
+from app.archive_model import OrderArchive, PositionArchive
+from app.model import Position
+from app.order_model import Order
+
+CE = "NFO:NIFTY25APR24000CE"
+
+
+def test_moves_old_closed_positions_with_their_orders(session_factory, closed_position, open_position):
+    old = [closed_position(CE, "SELL", 75, 100.0, 60.0, datetime(2025, m, 3, 9, 0)) for m in (1, 2, 3)]
+    recent = closed_position(CE, "SELL", 75, 100.0, 60.0, datetime(2025, 6, 3, 9, 0))
+    live = open_position("NFO:NIFTY25JUN24000PE")
+
+    total = archive.archive_closed(session_factory, 90, batch=2, now=datetime(2025, 6, 10))
+    assert (total["positions"], total["orders"], total["batches"]) == (3, 6, 2)
+    with session_factory() as db:
+        assert sorted(p.id for p in db.query(Position)) == [recent, live]
+        assert sorted(p.id for p in db.query(PositionArchive)) == old
+        assert db.query(Order).filter(Order.position_id.in_(old)).count() == 0
+        assert db.query(OrderArchive).count() == 6
+        s = archive.stats(db)
+    assert (s["hot_positions"], s["hot_open_positions"], s["archived_positions"]) == (2, 1, 3)
+    assert s["newest_archived_close"] == datetime(2025, 3, 3, 9, 0)
+
+
+def test_archived_rows_keep_their_values(session_factory, closed_position):
+    pid = closed_position(CE, "SELL", 75, 100.0, 60.0, datetime(2025, 1, 3, 9, 0))
+    with session_factory() as db:
+        db.query(Order).filter(Order.position_id == pid, Order.side == "BUY").update({"journal_id": "txn-1",
+                                                                                      "created_at": None})
+        db.commit()
+    archive.archive_closed(session_factory, 30, now=datetime(2025, 6, 1))
+    with session_factory() as db:
+        p = db.query(PositionArchive).one()
+        assert (p.id, p.symbol, p.side, p.qty, p.avg_price, p.status) == (pid, CE, "SELL", 75, 100.0, "CLOSED")
+        exit_ = db.query(OrderArchive).filter(OrderArchive.side == "BUY").one()
+        assert exit_.journal_id == "txn-1"
+        assert exit_.created_at == datetime(2025, 1, 3, 9, 0)      # filed under the position's close
+
+
+def test_nothing_to_archive(session_factory, open_position):
+    open_position()
+    total = archive.archive_closed(session_factory, 0)
+    assert (total["positions"], total["batches"]) == (0, 0)
+
+
+def test_months_span_the_range():
+    assert list(archive._months(datetime(2024, 11, 20), datetime(2025, 2, 1))) == [
+        date(2024, 11, 1), date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1)]
+
+
+class _DDL:
+    """Stands in for a Postgres session: records the statements."""
+
+    def __init__(self):
+        from sqlalchemy.dialects import postgresql
+        self.dialect = postgresql.dialect()
+        self.sql = []
+
+    def get_bind(self):
+        return self
+
+    def execute(self, stmt):
+        self.sql.append(str(stmt))
+
+
+def test_partition_ddl_quotes_identifiers():
+    db = _DDL()
+    archive._ensure_partitions(db, "orders_archive", {date(2025, 12, 1)})
+    archive._ensure_partitions(db, "Orders Archive", {date(2025, 1, 1)})
+    assert db.sql == [
+        "CREATE TABLE IF NOT EXISTS orders_archive_2025_12 PARTITION OF orders_archive "
+        "FOR VALUES FROM ('2025-12-01') TO ('2026-01-01')",
+        'CREATE TABLE IF NOT EXISTS "Orders Archive_2025_01" PARTITION OF "Orders Archive" '
+        "FOR VALUES FROM ('2025-01-01') TO ('2025-02-01')",
+    ]
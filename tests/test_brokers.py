@@ -0,0 +1,134 @@
+# tests/test_brokers.py
+import asyncio
+import socket
+import threading
+import time
+from datetime import date
+
+import pytest
+import uvicorn
+
+from app.brokers.base import Broker
+from app.brokers.kite_http import KiteHTTP
+from app.brokers.paper import PaperBroker
+from app.brokers.zerodha import ZerodhaBroker
+from tools.fake_kite import Settings, create_app
+
+kite_exceptions = pytest.importorskip("kiteconnect.exceptions")
+
+NIFTY = "NSE:NIFTY 50"
+
+
+@pytest.fixture(scope="module")
+def kite_root():
+    """fake_kite on a real socket, so the pooled aiohttp client is exercised end to end."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    config = uvicorn.Config(create_app(Settings(stocks=0, weeklies=1, monthlies=1)),
+                            host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        assert time.monotonic() < deadline, "fake_kite did not start"
+        time.sleep(0.05)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(5)
+
+
+@pytest.fixture
+def zerodha(kite_root):
+    broker = ZerodhaBroker("key", "secret", "token")
+    broker.http = KiteHTTP("key", "token", root=kite_root)
+    return broker
+
+
+def _run(broker, coro):
+    async def go():
+        try:
+            return await coro
+        finally:
+            await broker.aclose()
+    return asyncio.run(go())
+
+
+def test_native_ltp_is_one_batched_call(zerodha):
+    calls = []
+    ltp = zerodha.http.ltp
+
+    async def counting(symbols):
+        calls.append(list(symbols))
+        return await ltp(symbols)
+
+    zerodha.http.ltp = counting
+    prices = _run(zerodha, zerodha.altp_many([NIFTY, NIFTY, "NSE:NOPE"]))
+    assert calls == [[NIFTY, "NSE:NOPE"]]
+    assert list(prices) == [NIFTY] and prices[NIFTY] > 0
+
+
+def test_native_orders_and_kite_errors(zerodha):
+    async def go():
+        filled = await zerodha.aplace_order(NIFTY, "BUY", 1)
+        resting = await zerodha.aplace_order(NIFTY, "SELL", 1, order_type="LIMIT", price=10 ** 9)
+        cancelled = await zerodha.acancel_order(resting["order_id"])
+        with pytest.raises(kite_exceptions.InputException, match="CANCELLED"):
+            await zerodha.acancel_order(resting["order_id"])
+        with pytest.raises(kite_exceptions.InputException):
+            await zerodha.aplace_order("NSE:NOPE", "BUY", 1)
+        return filled, cancelled
+
+    filled, cancelled = _run(zerodha, go())
+    assert filled["status"] == "PLACED" and filled["tradingsymbol"] == "NIFTY 50"
+    assert isinstance(filled["order_id"], str)
+    assert cancelled["status"] == "CANCELED"
+
+
+def test_instruments_parsed_like_kiteconnect(zerodha):
+    rows = _run(zerodha, zerodha.ainstruments("NFO"))
+    opt = next(r for r in rows if r["instrument_type"] == "CE")
+    assert isinstance(opt["instrument_token"], int) and isinstance(opt["lot_size"], int)
+    assert isinstance(opt["strike"], float) and isinstance(opt["expiry"], date)
+
+
+class SyncOnly(Broker):
+    def __init__(self):
+        self.calls = []
+
+    def ltp(self, symbol):
+        self.calls.append(symbol)
+        return float(len(symbol))
+
+    def place_order(self, symbol, side, qty, order_type="MARKET", price=None, product="MIS", variety="regular"):
+        return {"symbol": symbol, "side": side, "qty": qty, "order_type": order_type}
+
+    def cancel_order(self, order_id):
+        return {"order_id": order_id}
+
+
+def test_default_async_variants_wrap_the_sync_calls():
+    b = SyncOnly()
+
+    async def go():
+        return (await b.altp_many(["A", "BB", "A"]), await b.aquote(["A"]),
+                await b.aplace_order("A", "BUY", 1, order_type="LIMIT"), await b.acancel_order("7"))
+
+    prices, quote, order, cancel = asyncio.run(go())
+    assert prices == {"A": 1.0, "BB": 2.0} and sorted(b.calls) == ["A", "A", "BB"]
+    assert quote == {"A": {"last_price": 1.0}}
+    assert order["order_type"] == "LIMIT" and cancel == {"order_id": "7"}
+    with pytest.raises(NotImplementedError):
+        asyncio.run(b.ainstruments())
+
+
+def test_paper_async_orders_fill_at_the_pricer(session_factory):
+    class Pricer:
+        async def altp(self, symbol):
+            return 42.0
+
+    b = PaperBroker(session_factory, Pricer())
+    order = asyncio.run(b.aplace_order("NFO:X", "SELL", 75))
+    assert order["status"] == "FILLED" and b.positions[-1]["avg_price"] == 42.0
+    assert asyncio.run(b.acancel_order(order["id"]))["status"] == "CANCELLED"
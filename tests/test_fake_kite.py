@@ -0,0 +1,69 @@
+# tests/test_fake_kite.py
+import math
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from tools.fake_kite import OrderStore, PricePath, Settings, create_app
+
+
+def _order(order_id, status="COMPLETE"):
+    return {"order_id": order_id, "tradingsymbol": "NIFTY 50", "status": status}
+
+
+@pytest.fixture
+def client():
+    with TestClient(create_app(Settings(stocks=0, weeklies=1, monthlies=1))) as c:
+        yield c
+
+
+def _place(client, **form):
+    data = {"exchange": "NSE", "tradingsymbol": "NIFTY 50", "transaction_type": "BUY", "quantity": 1,
+            "order_type": "MARKET", **form}
+    return client.post("/orders/regular", data=data).json()["data"]["order_id"]
+
+
+def test_order_lifecycle(client):
+    filled = _place(client)
+    resting = _place(client, order_type="LIMIT", price=1)
+    assert client.get(f"/orders/{filled}").json()["data"][0]["status"] == "COMPLETE"
+    assert client.delete(f"/orders/regular/{resting}").json()["status"] == "success"
+    assert client.get(f"/orders/{resting}").json()["data"][0]["status"] == "CANCELLED"
+    again = client.delete(f"/orders/regular/{resting}").json()
+    assert again["message"] == "Order cannot be cancelled as it is CANCELLED"
+    assert client.get("/orders/nope").status_code == 400
+    assert [o["order_id"] for o in client.get("/orders").json()["data"]] == [filled, resting]
+
+
+def test_store_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "orders.db")
+    a, b = OrderStore(path, 100), OrderStore(path, 100)
+    a.add(_order("1", "OPEN"))
+    assert b.get("1")["status"] == "OPEN"
+    assert b.cancel("1") == "OPEN"
+    assert a.get("1")["status"] == "CANCELLED"
+    assert a.cancel("1") == "CANCELLED"
+    assert a.cancel("2") is None
+
+
+def test_finished_orders_are_evicted_past_the_cap():
+    store = OrderStore("", 3)
+    store.add(_order("open", "OPEN"))
+    for i in range(6):
+        store.add(_order(str(i)))
+    assert [o["order_id"] for o in store.all()] == ["open", "3", "4", "5"]
+    assert store.count() == 4
+
+
+def test_prices_keep_moving_past_the_first_days():
+    path = PricePath(25000.0, 0.15, seed=7, step_ms=100, epoch=0.0)
+    day = 86400.0
+    expected = 0.15 * math.sqrt(60 / (365 * day))       # std of 1-minute log returns
+    for d in (0, 3, 30, 365):
+        prices = np.array([path.at(d * day + 3600 + 60 * i) for i in range(121)])
+        assert 0.6 * expected < np.std(np.diff(np.log(prices))) < 1.6 * expected
+    # Random access: the same timestamp prices the same however the path was walked
+    again = PricePath(25000.0, 0.15, seed=7, step_ms=100, epoch=0.0)
+    assert again.at(30 * day + 3600) == path.at(30 * day + 3600)
+    assert again.at(day) == path.at(day)
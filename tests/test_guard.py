@@ -0,0 +1,101 @@
+# tests/test_guard.py
+from datetime import datetime
+
+import pytest
+
+from app.book import book_fill
+from app.model import Position
+from app.order_model import Order
+from app.risk.guard import RiskGuard, RiskRejected
+
+CE = "NFO:NIFTY25APR24000CE"
+PE = "NFO:NIFTY25APR23000PE"
+
+
+def _book(session_factory, symbol, side, qty, price, journal_id=None):
+    with session_factory() as db:
+        pos, order = book_fill(db, symbol, side, qty, price, journal_id=journal_id)
+        db.commit()
+        return pos.id
+
+
+def _positions(session_factory):
+    with session_factory() as db:
+        return [(p.symbol, p.side, p.qty, p.status) for p in db.query(Position).order_by(Position.id)]
+
+
+# ---------- book_fill netting ----------
+def test_same_side_fill_averages_in(session_factory):
+    a = _book(session_factory, CE, "SELL", 75, 100.0)
+    b = _book(session_factory, CE, "SELL", 25, 80.0)
+    assert a == b
+    with session_factory() as db:
+        pos = db.get(Position, a)
+        assert (pos.qty, pos.avg_price) == (100, 95.0)
+
+
+def test_opposite_fill_reduces_then_closes(session_factory):
+    pid = _book(session_factory, CE, "SELL", 75, 100.0)
+    _book(session_factory, CE, "BUY", 25, 90.0)
+    assert _positions(session_factory) == [(CE, "SELL", 50, "OPEN")]
+    _book(session_factory, CE, "BUY", 50, 80.0)
+    assert _positions(session_factory) == [(CE, "SELL", 50, "CLOSED")]
+    with session_factory() as db:
+        assert db.get(Position, pid).closed_at is not None
+
+
+def test_larger_opposite_fill_flips(session_factory):
+    _book(session_factory, CE, "SELL", 75, 100.0)
+    _book(session_factory, CE, "BUY", 100, 90.0, journal_id="t1")
+    assert _positions(session_factory) == [(CE, "SELL", 75, "CLOSED"), (CE, "BUY", 25, "OPEN")]
+    with session_factory() as db:
+        orders = [(o.position_id, o.side, o.qty, o.journal_id) for o in db.query(Order).order_by(Order.id)]
+    assert orders == [(1, "SELL", 75, None), (1, "BUY", 75, "t1"), (2, "BUY", 25, "t1:flip")]
+
+
+# ---------- guard ----------
+def test_limits_on_adding_exposure(session_factory):
+    guard = RiskGuard(session_factory, max_open_positions=2, max_qty_per_underlying=150)
+    _book(session_factory, CE, "SELL", 75, 100.0)
+    hold = guard.reserve(PE, "SELL", 75)
+    assert (hold.underlying, hold.qty) == ("NIFTY", 75)
+    with pytest.raises(RiskRejected, match="quantity limit"):
+        guard.reserve(CE, "SELL", 1)                  # 75 held + 75 in flight
+    with pytest.raises(RiskRejected, match="max open positions"):
+        guard.reserve("NFO:BANKNIFTY25APR52000PE", "SELL", 30)
+    guard.release(hold)
+    assert guard.reserve(CE, "SELL", 75).qty == 75
+    assert guard.stats()["rejected"] == 2
+
+
+def test_reducing_orders_pass_while_halted(session_factory):
+    guard = RiskGuard(session_factory, max_qty_per_underlying=100)
+    _book(session_factory, CE, "SELL", 75, 100.0)
+    guard.halt("test")
+    hold = guard.reserve(CE, "BUY", 75)
+    assert hold.qty == 0
+    guard.release(hold)
+    with pytest.raises(RiskRejected, match="test"):
+        guard.reserve(PE, "SELL", 75)
+    guard.resume()
+    assert guard.reserve(PE, "SELL", 25).qty == 25
+
+
+def test_excess_beyond_open_qty_is_checked(session_factory):
+    guard = RiskGuard(session_factory, max_qty_per_underlying=100)
+    _book(session_factory, CE, "SELL", 75, 100.0)
+    guard.halt("test")
+    with pytest.raises(RiskRejected):
+        guard.reserve(CE, "BUY", 80)                  # would flip to a 5-lot long
+    guard.resume()
+    assert guard.reserve(CE, "BUY", 150).qty == 75    # 75 nets off, 75 adds
+    with pytest.raises(RiskRejected, match="quantity limit"):
+        guard.reserve(CE, "BUY", 210)
+
+
+def test_daily_loss_limit_halts(session_factory, closed_position):
+    guard = RiskGuard(session_factory, max_daily_loss=1000)
+    closed_position(CE, "SELL", 75, 100.0, 120.0, datetime.utcnow())     # -1500 today
+    with pytest.raises(RiskRejected, match="daily loss"):
+        guard.reserve(PE, "SELL", 75)
+    assert guard.stats()["halted"].startswith("daily loss")
@@ -0,0 +1,199 @@
+# tests/test_journal.py
+import json
+
+import pytest
+
+from app.book import apply_journal_entry, book_close
+from app.journal import ABANDONED, OrderJournal
+from app.model import Position
+from app.order_model import Order
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "orders.journal")
+
+
+@pytest.fixture
+def open_journal(journal_path, session_factory):
+    journals = []
+
+    def open_(start=True, **kw):
+        j = OrderJournal(journal_path, session_factory, apply_journal_entry, fsync_ms=0.5, **kw)
+        if start:
+            j.start()
+        journals.append(j)
+        return j
+    yield open_
+    for j in journals:
+        if not j._closed:
+            j.close()
+
+
+def _records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def _orders(session_factory):
+    with session_factory() as db:
+        return [(o.symbol, o.side, o.qty, o.price, o.journal_id) for o in db.query(Order).order_by(Order.id)]
+
+
+def test_acked_order_is_replayed_on_recovery(open_journal, session_factory):
+    j = open_journal()
+    txn = j.begin("order", {"symbol": "NFO:X", "side": "SELL", "qty": 75})
+    j.ack(txn, {"price": 101.5})
+    j.close()                                      # crash before the DB commit
+
+    j = open_journal(start=False)
+    assert j.recover() == 1
+    assert _orders(session_factory) == [("NFO:X", "SELL", 75, 101.5, txn)]
+    j.close()
+
+    j = open_journal(start=False)
+    assert j.recover() == 0                        # persisted record written by the replay
+
+
+def test_replay_is_idempotent(open_journal, session_factory):
+    j = open_journal()
+    txn = j.begin("order", {"symbol": "NFO:X", "side": "BUY", "qty": 50})
+    j.ack(txn, {"price": 10.0})
+    with session_factory() as db:                  # request path committed, but done() never got written
+        apply_journal_entry(db, "order", {"symbol": "NFO:X", "side": "BUY", "qty": 50, "price": 10.0}, txn)
+        db.commit()
+    j.close()
+
+    j = open_journal(start=False)
+    assert j.recover() == 1
+    assert len(_orders(session_factory)) == 1
+
+
+def test_intent_without_ack_is_abandoned(open_journal, session_factory, journal_path):
+    j = open_journal()
+    txn = j.begin("order", {"symbol": "NFO:X", "side": "SELL", "qty": 75})
+    j.close()
+
+    j = open_journal(start=False)
+    assert j.recover() == 0
+    assert j.stats()["abandoned"] == 1
+    j.close()
+    assert _orders(session_factory) == []
+    last = _records(journal_path)[-1]
+    assert (last["txn"], last["type"]) == (txn, ABANDONED)
+
+    j = open_journal(start=False)
+    j.recover()
+    assert j.stats()["abandoned"] == 0             # reported once
+
+
+def test_failed_and_done_entries_are_not_replayed(open_journal, session_factory):
+    j = open_journal()
+    failed = j.begin("order", {"symbol": "NFO:X", "side": "SELL", "qty": 75})
+    j.fail(failed, "rejected")
+    booked = j.begin("order", {"symbol": "NFO:Y", "side": "SELL", "qty": 75})
+    j.ack(booked, {"price": 5.0})
+    j.done(booked)
+    assert j.stats()["open"] == 0
+    j.close()
+
+    j = open_journal(start=False)
+    assert j.recover() == 0
+    assert _orders(session_factory) == []
+
+
+def test_torn_tail_is_ignored(open_journal, session_factory, journal_path):
+    j = open_journal()
+    txn = j.begin("order", {"symbol": "NFO:X", "side": "SELL", "qty": 75})
+    j.ack(txn, {"price": 99.0})
+    j.close()
+    with open(journal_path, "a", encoding="utf-8") as f:
+        f.write('{"txn": "abc", "type": "ac')
+
+    j = open_journal(start=False)
+    assert j.recover() == 1
+    assert len(_orders(session_factory)) == 1
+
+
+def test_torn_tail_is_cut_before_new_appends(open_journal, session_factory, journal_path):
+    j = open_journal()
+    j.close()
+    with open(journal_path, "a", encoding="utf-8") as f:
+        f.write('{"txn": "abc", "type": "ac')
+
+    j = open_journal(start=False)
+    assert j.recover() == 0
+    j.start()
+    txn = j.begin("order", {"symbol": "NFO:X", "side": "SELL", "qty": 75})
+    j.ack(txn, {"price": 99.0})
+    j.close()                                      # crash before the DB commit
+    assert [r["txn"] for r in _records(journal_path)] == [txn, txn]
+
+    j = open_journal(start=False)
+    assert j.recover() == 1
+    assert _orders(session_factory) == [("NFO:X", "SELL", 75, 99.0, txn)]
+
+
+def test_close_entry_replays_onto_open_position(open_journal, session_factory, open_position):
+    pid = open_position("NFO:X", "SELL", 75, 100.0)
+    j = open_journal()
+    txn = j.log("close", {"position_id": pid, "price": 60.0})
+    j.close()
+
+    j = open_journal(start=False)
+    assert j.recover() == 1
+    with session_factory() as db:
+        pos = db.get(Position, pid)
+        assert pos.status == "CLOSED"
+        assert db.query(Order).filter(Order.journal_id == txn).one().price == 60.0
+
+
+def test_close_of_closed_position_is_skipped(session_factory, open_position):
+    pid = open_position("NFO:X", "SELL", 75, 100.0)
+    with session_factory() as db:
+        book_close(db, db.get(Position, pid), 50.0, journal_id="first")
+        db.commit()
+        apply_journal_entry(db, "close", {"position_id": pid, "price": 40.0}, "second")
+        db.commit()
+        assert db.query(Order).filter(Order.position_id == pid).count() == 2   # entry + first exit
+
+
+def test_drainer_books_acked_entries(open_journal, session_factory):
+    j = open_journal(drain_min_age=0.0)
+    txn = j.log("order", {"symbol": "NFO:X", "side": "SELL", "qty": 75, "price": 3.0})
+    assert j.drain(min_age=60) == 0                # too young
+    assert j.drain(min_age=0) == 1
+    assert _orders(session_factory) == [("NFO:X", "SELL", 75, 3.0, txn)]
+    assert j.stats()["open"] == 0
+
+
+def test_bad_entry_does_not_block_the_batch(open_journal, session_factory):
+    j = open_journal()
+    j.log("bogus", {})
+    good = j.log("order", {"symbol": "NFO:X", "side": "SELL", "qty": 75, "price": 3.0})
+    assert j.drain(min_age=0) == 1
+    assert [o[4] for o in _orders(session_factory)] == [good]
+    assert j.stats()["open"] == 1
+
+
+def test_begin_does_not_wait_for_fsync(open_journal):
+    j = open_journal(start=False)                  # no flusher: a durable append would block
+    txn = j.begin("order", {"symbol": "NFO:X", "side": "SELL", "qty": 75})
+    assert j.stats()["open"] == 1
+    j.fail(txn, "test")
+
+
+def test_ack_is_durable(open_journal, journal_path):
+    j = open_journal()
+    txn = j.begin("order", {"symbol": "NFO:X", "side": "SELL", "qty": 75})
+    j.ack(txn, {"price": 1.0})
+    # On disk once ack returns, before any close/flush of ours
+    assert [r["type"] for r in _records(journal_path)] == ["intent", "ack"]
+    assert j.stats()["fsyncs"] >= 1
+
+
+def test_closed_journal_rejects_writes(open_journal):
+    j = open_journal()
+    j.close()
+    with pytest.raises(RuntimeError):
+        j.begin("order", {})
@@ -0,0 +1,110 @@
+# tests/test_margin.py
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.pnl import IST
+from app.risk.margin import N_SCENARIOS, MarginEstimator
+from app.symbols import format_option
+
+EXPIRY = datetime.now(IST).date() + timedelta(days=10)
+NIFTY, BANK = 24500.0, 52000.0
+
+
+def opt(name, strike, kind):
+    return format_option(name, EXPIRY, strike, kind)
+
+
+def pos(symbol, side, qty):
+    return SimpleNamespace(symbol=symbol, side=side, qty=qty)
+
+
+@pytest.fixture
+def est():
+    m = MarginEstimator(price_scan=0.06, vol_scan=0.04, exposure_pct=0.02, default_vol=0.15, max_age=60)
+    m.update({"NSE:NIFTY 50": NIFTY, "NSE:NIFTY BANK": BANK})
+    return m
+
+
+STRANGLE = [pos(opt("NIFTY", 25000, "CE"), "SELL", 75), pos(opt("NIFTY", 24000, "PE"), "SELL", 75)]
+WINGS = [pos(opt("NIFTY", 25500, "CE"), "BUY", 75), pos(opt("NIFTY", 23500, "PE"), "BUY", 75)]
+
+
+def test_short_option_charges_span_and_exposure(est):
+    m = est.portfolio([STRANGLE[0]])
+    assert m["span"] > 0
+    assert m["exposure"] == pytest.approx(0.02 * NIFTY * 75)
+    assert m["premium"] == 0
+    assert m["total"] == pytest.approx(m["span"] + m["exposure"])
+
+
+def test_long_option_risk_is_capped_by_premium(est):
+    m = est.portfolio([WINGS[0]])
+    assert m["exposure"] == 0 and m["premium"] > 0
+    assert m["span"] <= m["premium"] + 1e-6
+
+
+def test_hedges_offset_within_an_underlying(est):
+    naked = est.portfolio(STRANGLE)["span"]
+    hedged = est.portfolio(STRANGLE + WINGS)["span"]
+    assert hedged < naked
+    # A strangle's two sides never lose in the same scenario
+    assert naked < est.portfolio(STRANGLE[:1])["span"] + est.portfolio(STRANGLE[1:])["span"]
+
+
+def test_no_credit_across_underlyings(est):
+    bank = [pos(opt("BANKNIFTY", 51000, "PE"), "BUY", 30)]
+    both = est.portfolio(STRANGLE[:1] + bank)
+    assert both["span"] == pytest.approx(est.portfolio(STRANGLE[:1])["span"] + est.portfolio(bank)["span"], abs=0.02)
+    assert set(both["underlyings"]) == {"NIFTY", "BANKNIFTY"}
+
+
+def test_futures_charge_exposure_either_side(est):
+    fut = f"NFO:NIFTY{EXPIRY:%y}{EXPIRY:%b}FUT".upper()
+    for side in ("BUY", "SELL"):
+        m = est.portfolio([pos(fut, side, 75)])
+        assert m["exposure"] == pytest.approx(0.02 * NIFTY * 75)
+        assert m["span"] == pytest.approx(0.06 * NIFTY * 75, rel=1e-6)   # a full scan range beats 35% of 2x
+
+
+def test_what_if_matches_the_book_with_the_order(est):
+    cand = opt("NIFTY", 25200, "CE")
+    w = est.what_if(cand, "SELL", 75, positions=STRANGLE)
+    assert w["before"] == est.portfolio(STRANGLE)["total"]
+    assert w["after"] == pytest.approx(est.portfolio(STRANGLE + [pos(cand, "SELL", 75)])["total"], abs=0.02)
+    assert w["increment"] == pytest.approx(w["after"] - w["before"], abs=0.02)
+
+
+def test_buying_a_hedge_lowers_margin(est):
+    w = est.what_if(WINGS[0].symbol, "BUY", 75, positions=STRANGLE)
+    assert w["increment"] < 0 and w["premium"] > 0
+    # Closing a short does too
+    assert est.what_if(STRANGLE[0].symbol, "BUY", 75, positions=STRANGLE)["increment"] < 0
+
+
+def test_what_if_many_matches_single_what_ifs(est):
+    cands = [opt("NIFTY", k, "CE") for k in (24800, 25000, 25200)] + [opt("BANKNIFTY", 53000, "CE")]
+    many = est.what_if_many(cands, "SELL", 75, positions=STRANGLE)
+    assert many == [est.what_if(c, "SELL", 75, positions=STRANGLE) for c in cands]
+
+
+def test_quoted_price_values_the_leg(est):
+    sym = opt("NIFTY", 25000, "CE")
+    assert est.what_if(sym, "BUY", 75, price=20.0, positions=[])["premium"] == 1500.0
+    cheap = est.legs([(sym, -75, 20.0)])
+    rich = est.legs([(sym, -75, 200.0)])
+    assert rich.vol[0] > cheap.vol[0]                          # implied from the quote
+
+
+def test_open_book_is_cached_until_positions_change(est):
+    a = est.book(STRANGLE)
+    assert est.book(list(STRANGLE)) is a
+    b = est.book(STRANGLE + WINGS)
+    assert b is not a and b.pnl.shape == (N_SCENARIOS, 1)
+
+
+def test_empty_book(est):
+    assert est.portfolio([])["total"] == 0
+    assert est.what_if(opt("NIFTY", 25000, "CE"), "SELL", 75, positions=[])["before"] == 0
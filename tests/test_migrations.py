@@ -0,0 +1,83 @@
+# tests/test_migrations.py
+import os
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+
+from app.db import ALEMBIC_INI, Base, engine, init_db
+
+
+@pytest.fixture
+def cfg():
+    """Alembic against app.db.engine, starting from an empty database."""
+    engine.dispose()
+    if os.path.exists(engine.url.database):
+        os.remove(engine.url.database)
+    c = Config(str(ALEMBIC_INI))
+    c.set_main_option("script_location", str(ALEMBIC_INI.parent / "migrations"))
+    c.attributes["embedded"] = True
+    yield c
+    engine.dispose()
+
+
+def _tables():
+    return set(inspect(engine).get_table_names()) - {"alembic_version"}
+
+
+def _indexes(table):
+    return {ix["name"] for ix in inspect(engine).get_indexes(table)}
+
+
+def _revision():
+    with engine.connect() as conn:
+        return MigrationContext.configure(conn).get_current_revision()
+
+
+def test_upgrade_matches_models(cfg):
+    command.upgrade(cfg, "head")
+    assert _tables() == set(Base.metadata.tables)
+    with engine.connect() as conn:
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+    assert "ix_positions_symbol" not in _indexes("positions")
+    assert {"ix_positions_status_symbol", "ix_positions_status_closed_at"} <= _indexes("positions")
+
+
+def test_every_step_downgrades_and_upgrades(cfg):
+    revisions = [s.revision for s in reversed(list(ScriptDirectory.from_config(cfg).walk_revisions()))]
+    assert revisions[0] == "0001"
+    for rev in revisions:
+        command.upgrade(cfg, rev)
+        assert _revision() == rev
+    for prev in reversed([None] + revisions[:-1]):
+        command.downgrade(cfg, prev or "base")
+        assert _revision() == prev
+    assert _tables() == set()
+    command.upgrade(cfg, "head")
+    assert _revision() == revisions[-1]
+
+
+def test_adopts_a_legacy_create_all_database(cfg):
+    # Schema as create_all built it before migrations: no alembic_version, no journal_id
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE positions (id INTEGER PRIMARY KEY, symbol VARCHAR NOT NULL, side VARCHAR NOT NULL,"
+                          " qty INTEGER NOT NULL, avg_price FLOAT NOT NULL, status VARCHAR NOT NULL,"
+                          " opened_at DATETIME, closed_at DATETIME)"))
+        conn.execute(text("CREATE INDEX ix_positions_symbol ON positions (symbol)"))
+        conn.execute(text("CREATE TABLE orders (id INTEGER PRIMARY KEY, position_id INTEGER NOT NULL REFERENCES positions(id),"
+                          " symbol VARCHAR NOT NULL, side VARCHAR NOT NULL, qty INTEGER NOT NULL, price FLOAT NOT NULL,"
+                          " status VARCHAR, created_at DATETIME)"))
+        conn.execute(text("INSERT INTO positions VALUES (1, 'NFO:X', 'SELL', 75, 100, 'OPEN', NULL, NULL)"))
+        conn.execute(text("INSERT INTO orders VALUES (1, 1, 'NFO:X', 'SELL', 75, 100, 'FILLED', NULL)"))
+
+    init_db(retries=1)
+    init_db(retries=1)                                         # idempotent
+    assert _tables() == set(Base.metadata.tables)
+    assert "journal_id" in {c["name"] for c in inspect(engine).get_columns("orders")}
+    assert "ix_positions_symbol" not in _indexes("positions")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT symbol, qty FROM positions")).all() == [("NFO:X", 75)]
@@ -0,0 +1,155 @@
+# tests/test_readcache.py
+import gzip
+import json
+import time
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.model import Position
+from app.order_model import Order
+from app.readcache import ReadCache, _etag_match
+
+
+@pytest.fixture
+def cache():
+    return ReadCache(max_bytes=1 << 20, gzip_min=256)
+
+
+@pytest.fixture
+def http(cache):
+    """A tiny app serving one read model from a mutable payload."""
+    data = {"rows": [1, 2, 3]}
+    builds = []
+    app = FastAPI()
+
+    @app.get("/rows")
+    def rows(request: Request):
+        def build():
+            builds.append(1)
+            return data["rows"]
+        return cache.respond(request, "rows", build)
+
+    with TestClient(app) as c:
+        c.data, c.builds = data, builds
+        yield c
+
+
+# ---------- versions and entries ----------
+def test_lookup_follows_the_version(cache):
+    assert cache.lookup("a", cache.version("a")) is None
+    cache.put("a", 0, {"x": 1})
+    assert cache.lookup("a", 0).body == b'{"x":1}'
+    cache.bump("a")
+    assert cache.version("a") == 1
+    assert cache.lookup("a", 1) is None
+    s = cache.stats()["models"]["a"]
+    assert (s["hits"], s["misses"], s["version"], s["cached_version"]) == (1, 2, 1, 0)
+
+
+def test_max_age_serves_a_recent_stale_entry(cache):
+    cache.put("pnl", 0, [1])
+    cache.bump("pnl")
+    assert cache.lookup("pnl", 1, max_age=60) is not None
+    assert cache.lookup("pnl", 1, max_age=0.0) is None
+
+
+def test_slow_build_does_not_replace_a_newer_one(cache):
+    cache.put("a", 2, "new")
+    cache.put("a", 1, "old")
+    assert cache.lookup("a", 2).body == b'"new"'
+
+
+def test_lru_bounded_by_bytes():
+    cache = ReadCache(max_bytes=350, gzip_min=10_000)              # room for three 102-byte bodies
+    for name in "abc":
+        cache.put(name, 0, "x" * 100)
+    cache.lookup("a", 0)
+    cache.put("d", 0, "x" * 100)                                  # evicts b, the least recently used
+    assert [n for n in "abcd" if cache.lookup(n, 0)] == ["a", "c", "d"]
+    assert cache.stats()["evictions"] == 1 and cache.stats()["bytes"] == 306
+    big = cache.put("e", 0, "x" * 1000)                           # larger than the cache: served, not kept
+    assert big.body and cache.lookup("e", 0) is None
+
+
+def test_gzip_only_above_threshold(cache):
+    assert cache.put("small", 0, "x").gz is None
+    big = cache.put("big", 0, list(range(500)))
+    assert gzip.decompress(big.gz) == big.body
+
+
+def test_etag_match():
+    assert _etag_match('"a", W/"b"', '"b"')
+    assert _etag_match("*", '"x"')
+    assert not _etag_match('"a"', '"b"')
+    assert not _etag_match(None, '"b"')
+
+
+# ---------- HTTP ----------
+def test_etag_and_304(http, cache):
+    r = http.get("/rows")
+    assert r.json() == [1, 2, 3] and r.headers["cache-control"] == "private, no-cache"
+    etag = r.headers["etag"]
+    again = http.get("/rows", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert len(http.builds) == 1
+    http.data["rows"] = [4]
+    cache.bump("rows")
+    fresh = http.get("/rows", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.json() == [4] and fresh.headers["etag"] != etag
+    assert cache.stats()["models"]["rows"]["not_modified"] == 1
+
+
+def test_gzip_response(http):
+    http.data["rows"] = list(range(1000))
+    r = http.get("/rows", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.json() == list(range(1000))                           # the client inflates it
+    plain = http.get("/rows", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and plain.headers["etag"] == r.headers["etag"]
+
+
+# ---------- invalidation ----------
+def test_commits_bump_the_watched_models(cache, session_factory):
+    cache.watch(session_factory, {Position: ("positions", "pnl"), Order: ("orders",)})
+    try:
+        with session_factory() as db:
+            db.add(Position(symbol="NFO:X", side="SELL", qty=75, avg_price=10.0, status="OPEN"))
+            db.flush()
+            db.rollback()
+        assert cache.version("positions") == 0
+        with session_factory() as db:
+            db.add(Position(symbol="NFO:X", side="SELL", qty=75, avg_price=10.0, status="OPEN"))
+            db.commit()
+        assert (cache.version("positions"), cache.version("pnl"), cache.version("orders")) == (1, 1, 0)
+        with session_factory() as db:
+            db.query(Position).all()
+            db.commit()                                            # nothing written
+        assert cache.version("positions") == 1
+    finally:
+        cache.unwatch()
+    with session_factory() as db:
+        db.add(Position(symbol="NFO:Y", side="SELL", qty=75, avg_price=10.0, status="OPEN"))
+        db.commit()
+    assert cache.version("positions") == 1
+
+
+# ---------- endpoints ----------
+def test_positions_endpoint_invalidated_by_orders(client):
+    first = client.get("/broker/positions")
+    etag = first.headers["etag"]
+    assert first.json() == []
+    assert client.get("/broker/positions", headers={"If-None-Match": etag}).status_code == 304
+    client.post("/broker/order", json={"symbol": "NFO:NIFTY25APR24000CE", "side": "SELL", "qty": 75})
+    after = client.get("/broker/positions", headers={"If-None-Match": etag})
+    assert after.status_code == 200 and [p["symbol"] for p in after.json()] == ["NFO:NIFTY25APR24000CE"]
+
+
+def test_pnl_build_does_not_invalidate_itself(client):
+    client.post("/broker/order", json={"symbol": "NFO:NIFTY25APR24000CE", "side": "SELL", "qty": 75})
+    client.get("/broker/pnl")
+    model = client.get("/cache").json()["models"]["pnl"]
+    assert model["cached_version"] == model["version"]
+    client.get("/broker/pnl")
+    assert client.get("/cache").json()["models"]["pnl"]["hits"] == 1
@@ -0,0 +1,79 @@
+# tests/test_recorder.py
+import glob
+import os
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from app.pnl import IST
+from app.recorder import LTP, QUOTE, TICK, TickRecorder, load
+
+CE = "NFO:NIFTY25APR24000CE"
+PE = "NFO:NIFTY25APR23000PE"
+BANK = "NFO:BANKNIFTY25APR52000PE"
+
+
+def ns(*args):
+    return int(datetime(*args, tzinfo=IST).timestamp()) * 1_000_000_000
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    recs = []
+
+    def make(**kw):
+        rec = TickRecorder(str(tmp_path / "ticks"), **{"flush_seconds": 60, **kw})
+        rec.start()
+        recs.append(rec)
+        return rec
+    yield make
+    for rec in recs:
+        rec.close()
+
+
+def test_round_trip(recorder, tmp_path):
+    rec = recorder()
+    t0 = ns(2025, 3, 7, 9, 15)
+    rec.record_many({CE: 101.5, PE: 88.0, BANK: 300.0}, LTP, ts=t0)
+    rec.record(CE, 102.0, TICK, ts=t0 + 1)
+    rec.record("NSE:NIFTY 50", 22000.0, QUOTE, ts=t0 + 2)
+    rec.close()
+
+    root = str(tmp_path / "ticks")
+    nifty = load(root, underlying="NIFTY")
+    assert list(nifty["symbol"]) == [CE, PE, CE, "NSE:NIFTY 50"]
+    assert list(nifty["price"]) == [101.5, 88.0, 102.0, 22000.0]
+    assert list(nifty["source"]) == [LTP, LTP, TICK, QUOTE]
+    assert list(load(root, symbols=[CE])["ts"]) == [t0, t0 + 1]
+    assert list(load(root, underlying="banknifty")["symbol"]) == [BANK]
+    assert rec.stats()["flushed"] == 5
+
+
+def test_full_buffers_become_chunks(recorder, tmp_path):
+    rec = recorder(chunk_rows=4)
+    t0 = ns(2025, 3, 7, 9, 15)
+    for i in range(10):
+        rec.record(CE, float(i), ts=t0 + i)
+    rec.close()
+    parts = glob.glob(str(tmp_path / "ticks" / "date=2025-03-07" / "underlying=NIFTY" / "part-*.npz"))
+    assert len(parts) == 3                                   # 4 + 4 + the 2 left on close
+    assert list(load(str(tmp_path / "ticks"))["price"]) == [float(i) for i in range(10)]
+    assert rec.stats()["chunks"] == 3
+
+
+def test_partitions_follow_the_ist_day(recorder, tmp_path):
+    rec = recorder()
+    rec.record(CE, 1.0, ts=ns(2025, 3, 7, 23, 59))
+    rec.record(CE, 2.0, ts=ns(2025, 3, 8, 0, 1))
+    rec.close()
+    root = str(tmp_path / "ticks")
+    assert sorted(os.listdir(root)) == ["date=2025-03-07", "date=2025-03-08"]
+    assert list(load(root, start=date(2025, 3, 8))["price"]) == [2.0]
+    assert list(load(root, end=date(2025, 3, 7))["price"]) == [1.0]
+
+
+def test_load_of_nothing_is_empty(tmp_path):
+    out = load(str(tmp_path / "none"))
+    assert all(len(v) == 0 for v in out.values())
+    assert out["ts"].dtype == np.int64
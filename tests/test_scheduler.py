@@ -0,0 +1,163 @@
+# tests/test_scheduler.py
+import asyncio
+import time as _time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.pnl import IST
+from app.scheduler import RUN, SKIP, Cron, Every, Scheduler, _parse_days
+
+
+def ist(*args):
+    return datetime(*args, tzinfo=IST)
+
+
+def run_for(seconds, setup):
+    """Starts a scheduler, lets `setup(s)` add jobs, runs it for `seconds` and returns it stopped."""
+    async def main():
+        s = Scheduler(max_sleep=0.5)
+        setup(s)
+        s.start()
+        await asyncio.sleep(seconds)
+        await s.stop()
+        return s
+    return asyncio.run(main())
+
+
+def ago(minutes):
+    return (datetime.now(IST) - timedelta(minutes=minutes)).strftime("%H:%M:%S")
+
+
+# ---------- specs ----------
+def test_parse_days():
+    assert _parse_days(None) == frozenset(range(7))
+    assert _parse_days("mon-fri") == frozenset(range(5))
+    assert _parse_days("mon,wed,sun") == frozenset({0, 2, 6})
+    assert _parse_days([1, 3]) == frozenset({1, 3})
+
+
+def test_cron_skips_weekends_and_orders_times():
+    c = Cron(["15:30", "09:20"], days="mon-fri")
+    fri = ist(2025, 3, 7, 10, 0)
+    assert c.next_after(fri) == ist(2025, 3, 7, 15, 30)
+    assert c.next_after(ist(2025, 3, 7, 15, 30)) == ist(2025, 3, 10, 9, 20)   # strictly after, then Monday
+
+
+def test_cron_when_filter():
+    c = Cron("09:20", days=None, when=lambda d: d.weekday() == 1)   # e.g. expiry Tuesdays
+    assert c.next_after(ist(2025, 3, 5, 0, 0)) == ist(2025, 3, 11, 9, 20)
+
+
+def test_every_aligns_to_window():
+    e = Every(300, "09:15", "15:30", days="mon-fri")
+    assert e.next_after(ist(2025, 3, 7, 8, 0)) == ist(2025, 3, 7, 9, 15)
+    assert e.next_after(ist(2025, 3, 7, 9, 17, 30)) == ist(2025, 3, 7, 9, 20)
+    assert e.next_after(ist(2025, 3, 7, 15, 25)) == ist(2025, 3, 7, 15, 30)       # window end is inclusive
+    assert e.next_after(ist(2025, 3, 7, 15, 30)) == ist(2025, 3, 10, 9, 15)
+
+
+def test_every_whole_day_rolls_over():
+    e = Every(3600)
+    assert e.next_after(ist(2025, 3, 7, 23, 30)) == ist(2025, 3, 8, 0, 0)
+    with pytest.raises(ValueError):
+        Every(0)
+
+
+# ---------- timing ----------
+def test_interval_job_fires_on_time():
+    runs = []
+    s = run_for(0.55, lambda s: s.add("tick", lambda: runs.append(_time.monotonic()), Every(0.05)))
+    job = s.jobs()[0]
+    assert 6 <= len(runs) <= 12
+    assert job["runs"] == len(runs) and job["errors"] == 0
+    assert job["jitter_ms"]["p50"] < 20
+
+
+def test_async_job_runs_on_the_loop():
+    seen = []
+
+    async def job():
+        seen.append(asyncio.get_running_loop())
+
+    run_for(0.2, lambda s: s.add("a", job, Every(0.05)))
+    assert seen and all(loop is seen[0] for loop in seen)
+
+
+def test_max_instances_skips_overlapping_runs():
+    s = run_for(0.4, lambda s: s.add("slow", lambda: _time.sleep(0.25), Every(0.05)))
+    job = s.jobs()[0]
+    assert job["busy"] > 0
+    assert job["runs"] <= 2
+
+
+def test_errors_are_counted():
+    def boom():
+        raise RuntimeError("nope")
+
+    s = run_for(0.15, lambda s: s.add("boom", boom, Every(0.05)))
+    job = s.jobs()[0]
+    assert job["errors"] >= 1 and job["runs"] == 0
+    assert job["last_error"] == "RuntimeError: nope"
+
+
+def test_pause_and_remove():
+    runs = {"p": 0, "r": 0}
+
+    def setup(s):
+        s.add("p", lambda: runs.__setitem__("p", runs["p"] + 1), Every(0.05))
+        s.add("r", lambda: runs.__setitem__("r", runs["r"] + 1), Every(0.05))
+        s.pause("p")
+        assert s.remove("r") and not s.remove("r")
+
+    run_for(0.2, setup)
+    assert runs == {"p": 0, "r": 0}
+
+
+def test_run_now_respects_max_instances():
+    async def main():
+        s = Scheduler()
+        s.add("slow", lambda: _time.sleep(0.2), Cron("00:00", days=[]))   # never scheduled
+        s.start()
+        first, second = s.run_now("slow"), s.run_now("slow")
+        await s.stop()
+        return first, second, s.jobs()[0]["runs"]
+
+    assert asyncio.run(main()) == (True, False, 1)                     # stop waited for it
+
+
+def test_duplicate_and_bad_jobs_are_rejected():
+    s = Scheduler()
+    s.add("a", lambda: None, Every(1))
+    with pytest.raises(ValueError):
+        s.add("a", lambda: None, Every(1))
+    with pytest.raises(ValueError):
+        s.add("b", lambda: None, Every(1), misfire="later")
+
+
+# ---------- misfires at start-up ----------
+def test_missed_run_within_grace_fires_once_at_startup():
+    runs = []
+    s = run_for(0.2, lambda s: s.add("eod", lambda: runs.append(1), Cron([ago(20), ago(5)], days=None),
+                                     misfire=RUN, grace=3600))
+    job = s.get("eod")
+    assert runs == [1]
+    assert job.next_run > datetime.now(IST)
+    assert job.jitter[0] >= 5 * 60 - 1                                  # late by the downtime since the last slot
+
+
+@pytest.mark.parametrize("misfire, grace", [(SKIP, 3600), (RUN, 60)])
+def test_missed_run_outside_grace_or_skip_does_not_fire(misfire, grace):
+    runs = []
+    run_for(0.2, lambda s: s.add("eod", lambda: runs.append(1), Cron(ago(5), days=None),
+                                 misfire=misfire, grace=grace))
+    assert runs == []
+
+
+def test_late_dispatch_with_skip_counts_a_miss():
+    s = Scheduler()
+    job = s.add("j", lambda: None, Every(60), misfire=SKIP, grace=1.0)
+    now = _time.monotonic()
+    s._dispatch(job, now - 5, now)
+    assert (job.missed, job.running) == (1, 0)
+    s._pool.shutdown()
@@ -0,0 +1,207 @@
+# tests/test_squareoff.py
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.book import apply_journal_entry, book_fill
+from app.brokers.ratelimit import TokenBucket
+from app.journal import OrderJournal
+from app.model import Position
+from app.risk.squareoff import FAILED, FILLED, SKIPPED, SquareOff
+from app.risk.triggers import ABOVE, TriggerEngine
+
+
+class FakeBroker:
+    """Async broker with a fixed order latency; records order sequence and peak concurrency."""
+
+    def __init__(self, latency=0.02, fail=()):
+        self.latency = latency
+        self.fail = set(fail)
+        self.orders = []
+        self.inflight = 0
+        self.peak = 0
+
+    async def altp_many(self, symbols):
+        return {s: 50.0 for s in symbols}
+
+    async def aplace_order(self, symbol, side, qty, **kw):
+        self.inflight += 1
+        self.peak = max(self.peak, self.inflight)
+        try:
+            await asyncio.sleep(self.latency)
+            if symbol in self.fail:
+                raise RuntimeError("rejected")
+            self.orders.append((symbol, side, qty))
+            return {"order_id": len(self.orders), "status": "COMPLETE"}
+        finally:
+            self.inflight -= 1
+
+
+@pytest.fixture
+def book(session_factory):
+    """Opens positions: [(symbol, side, qty)] -> ids."""
+    def open_(legs):
+        with session_factory() as db:
+            ids = [book_fill(db, s, side, q, 100.0)[0].id for s, side, q in legs]
+            db.commit()
+        return ids
+    return open_
+
+
+@pytest.fixture
+def run(session_factory, tmp_path):
+    """Runs a square-off to completion; returns (SquareOff, events)."""
+    journal = OrderJournal(str(tmp_path / "orders.journal"), session_factory, apply_journal_entry, fsync_ms=0.5)
+    journal.start()
+    triggers = TriggerEngine(on_exit=lambda *a: None)
+
+    def run_(broker, rate=0.0, burst=None, concurrency=10, underlying=None, claim=()):
+        for pid in claim:
+            triggers.claim(pid)
+
+        async def main():
+            so = SquareOff(session_factory, broker, journal, triggers, TokenBucket(rate, burst),
+                           concurrency, underlying=underlying).start()
+            return so, [ev async for ev in so.follow()]
+        return asyncio.run(main())
+
+    run_.triggers = triggers
+    run_.journal = journal
+    yield run_
+    triggers.shutdown()
+    journal.close()
+
+
+def strangles(*names):
+    legs = []
+    for n in names:
+        legs += [(f"NFO:{n}25APR1000CE", "SELL", 75), (f"NFO:{n}25APR900PE", "SELL", 75),
+                 (f"NFO:{n}25APR1200CE", "BUY", 75), (f"NFO:{n}25APR700PE", "BUY", 75)]
+    return legs
+
+
+def _open(session_factory):
+    with session_factory() as db:
+        return sorted(p.symbol for p in db.query(Position).filter(Position.status == "OPEN"))
+
+
+def test_closes_the_whole_book_shorts_first(session_factory, book, run):
+    book(strangles("NIFTY", "BANKNIFTY"))
+    broker = FakeBroker()
+    so, events = run(broker)
+    assert _open(session_factory) == []
+    sides = [side for _, side, _ in broker.orders]
+    assert sides == ["BUY"] * 4 + ["SELL"] * 4                   # shorts bought back before hedges are sold
+    assert so.summary()["filled"] == 8
+    assert [e["event"] for e in events][:2] == ["snapshot", "priced"]
+    assert events[-1]["event"] == "done" and events[-1]["running"] is False
+    assert run.journal.stats()["open"] == 0
+    assert run.triggers.claimed() == set()                      # claims dropped once booked
+
+
+def test_concurrency_and_order_rate_are_bounded(session_factory, book, run):
+    book([(f"NFO:NIFTY25APR{1000 + 50 * i}CE", "SELL", 75) for i in range(12)])
+    broker = FakeBroker(latency=0.05)
+    t0 = time.monotonic()
+    so, _ = run(broker, rate=40, burst=4, concurrency=3)
+    elapsed = time.monotonic() - t0
+    assert broker.peak == 3
+    assert elapsed >= (12 - 4) / 40                              # the bucket paced the orders after the burst
+    assert so.summary()["filled"] == 12 and _open(session_factory) == []
+
+
+def test_hedge_stays_while_its_short_is_open(session_factory, book, run):
+    book(strangles("NIFTY", "BANKNIFTY"))
+    broker = FakeBroker(fail={"NFO:NIFTY25APR1000CE"})
+    so, events = run(broker)
+    status = {leg.symbol: leg.status for leg in so.legs}
+    assert status["NFO:NIFTY25APR1000CE"] == FAILED
+    assert status["NFO:NIFTY25APR1200CE"] == status["NFO:NIFTY25APR700PE"] == SKIPPED
+    assert all(status[s] == FILLED for s in status if "BANKNIFTY" in s)
+    assert _open(session_factory) == ["NFO:NIFTY25APR1000CE", "NFO:NIFTY25APR1200CE", "NFO:NIFTY25APR700PE"]
+    assert run.triggers.claimed() == set()                      # failed and skipped legs released
+    assert any(e["event"] == FAILED and e["error"] == "rejected" for e in events)
+
+
+def test_one_underlying_only(session_factory, book, run):
+    book(strangles("NIFTY", "BANKNIFTY"))
+    so, _ = run(FakeBroker(), underlying="banknifty")
+    assert so.summary()["legs"] == 4
+    assert all("BANKNIFTY" not in s for s in _open(session_factory)) and len(_open(session_factory)) == 4
+
+
+def test_positions_already_being_exited_are_skipped(session_factory, book, run):
+    ids = book(strangles("NIFTY", "BANKNIFTY"))
+    so, events = run(FakeBroker(), claim=[ids[0]])
+    assert any(e["event"] == SKIPPED and e["position_id"] == ids[0] for e in events)
+    # The trigger owning the NIFTY short may not have filled yet: its hedges are held too
+    assert _open(session_factory) == ["NFO:NIFTY25APR1000CE", "NFO:NIFTY25APR1200CE", "NFO:NIFTY25APR700PE"]
+    assert so.summary()["skipped"] == 3 and so.summary()["filled"] == 5
+    assert run.triggers.claimed() == {ids[0]}                    # still the trigger's
+
+
+def test_an_error_in_one_exit_fails_only_that_leg(session_factory, book, run, monkeypatch):
+    book(strangles("NIFTY", "BANKNIFTY"))
+    begin = run.journal.begin
+
+    def flaky(kind, data):
+        if data["symbol"] == "NFO:BANKNIFTY25APR900PE":
+            raise OSError("disk full")
+        return begin(kind, data)
+    monkeypatch.setattr(run.journal, "begin", flaky)
+    so, events = run(FakeBroker())
+    status = {leg.symbol: leg.status for leg in so.legs}
+    assert status["NFO:BANKNIFTY25APR900PE"] == FAILED
+    assert status["NFO:BANKNIFTY25APR1200CE"] == status["NFO:BANKNIFTY25APR700PE"] == SKIPPED
+    assert all(status[s] == FILLED for s in status if "BANKNIFTY" not in s)
+    assert run.triggers.claimed() == set()
+    assert events[-1]["event"] == "done" and not any(e["event"] == "error" for e in events)
+
+
+def test_fills_are_booked_in_few_transactions(session_factory, book, run):
+    book([(f"NFO:NIFTY25APR{1000 + 50 * i}CE", "SELL", 75) for i in range(30)])
+    so, _ = run(FakeBroker(latency=0.01))
+    assert so.summary()["transactions"] <= 2
+    assert _open(session_factory) == []
+
+
+def test_triggers_cannot_fire_during_square_off(session_factory, book, run):
+    (pid,) = book([("NFO:NIFTY25APR1000CE", "SELL", 75)])
+    run.triggers.add(pid, "NFO:NIFTY25APR1000CE", "SL", ABOVE, 60)
+    broker = FakeBroker()
+    run(broker)
+    assert run.triggers.on_price("NFO:NIFTY25APR1000CE", 100) == 0
+    assert len(broker.orders) == 1
+
+
+def test_token_bucket_bursts_then_paces():
+    async def main():
+        bucket = TokenBucket(rate=50, burst=5)
+        t0 = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        burst = time.monotonic() - t0
+        for _ in range(5):
+            await bucket.acquire()
+        return burst, time.monotonic() - t0, bucket.stats()
+
+    burst, total, stats = asyncio.run(main())
+    assert burst < 0.01
+    assert total >= 5 / 50 * 0.9
+    assert stats["acquired"] == 10 and stats["waited_s"] > 0
+
+
+# ---------- endpoint ----------
+def test_endpoint_halts_entries_and_streams_progress(client):
+    entry = {"symbol": "NFO:NIFTY25APR24000CE", "side": "SELL", "qty": 75}
+    assert client.post("/broker/order", json=entry).status_code == 200
+    events = [json.loads(line) for line in client.post("/broker/squareoff").text.splitlines()]
+    assert events[-1]["event"] == "done" and events[-1]["filled"] == 1
+    assert client.get("/risk").json()["halted"] == "square-off"
+    assert client.post("/broker/order", json=entry).status_code == 403
+    report = client.get("/broker/squareoff").json()
+    assert [p["status"] for p in report["positions"]] == ["filled"]
+    client.post("/risk/resume")
+    assert client.post("/broker/order", json=entry).status_code == 200
@@ -0,0 +1,100 @@
+# tests/test_strangle.py
+import asyncio
+import threading
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from app.pnl import IST
+from app.strategy.runner import synthetic_chain
+from app.strategy.strangle import DONE, OPEN, Leg, Strangle
+
+NOW = datetime(2026, 10, 19, 10, 0, tzinfo=IST)     # a Monday, the day before the weekly expiry
+
+
+@pytest.fixture
+def strangle():
+    spec = synthetic_chain("NIFTY", 25000.0, 5, today=date(2026, 10, 19))
+    s = Strangle(spec, state=OPEN, day=NOW.date())
+    s.legs = {"CE": Leg("CE", spec.ce_symbols[7], 7, 75, state="OPEN", entry=10.0, position_id=1)}
+    return s
+
+
+def _snapshot(s, ce_premium):
+    n = len(s.spec.strikes)
+    ce, pe = np.full(n, 5.0), np.full(n, 5.0)
+    ce[s.legs["CE"].index] = ce_premium
+    return s.on_prices(NOW, 25000.0, ce, pe)
+
+
+def _fill(s, intent, res):
+    """What the runner sends back for an intent's result."""
+    s.on_fill({"underlying": intent["underlying"], "leg": intent["leg"], "action": intent["action"],
+               "ok": bool(res.get("ok")), "in_progress": bool(res.get("in_progress")),
+               "price": res.get("price"), "position_id": res.get("position_id")})
+
+
+def test_stop_sends_one_exit(strangle):
+    assert _snapshot(strangle, 12.0) == []
+    [intent] = _snapshot(strangle, 25.0)
+    assert intent["action"] == "exit" and intent["side"] == "BUY" and intent["position_id"] == 1
+    assert _snapshot(strangle, 30.0) == []           # EXITING until the result comes back
+
+
+def test_rejected_exit_is_retried(strangle):
+    [intent] = _snapshot(strangle, 25.0)
+    _fill(strangle, intent, {"ok": False, "error": "broker down"})
+    assert len(_snapshot(strangle, 25.0)) == 1
+
+
+def test_exit_in_progress_elsewhere_is_not_resent(strangle):
+    [intent] = _snapshot(strangle, 25.0)
+    _fill(strangle, intent, {"ok": False, "in_progress": True, "error": "exit already in progress"})
+    assert strangle.legs["CE"].state == "EXITING"
+    assert _snapshot(strangle, 30.0) == []
+
+
+def _open_position(client):
+    client.post("/broker/order", json={"symbol": "NFO:NIFTY26OCT25000CE", "side": "SELL", "qty": 75})
+    return client.get("/broker/positions").json()[0]["id"]
+
+
+def test_leg_closed_externally_stops_the_strategy(client, strangle):
+    from app.main import _strategy_order
+
+    pid = _open_position(client)
+    strangle.legs["CE"].position_id = pid
+    assert client.post(f"/broker/positions/{pid}/close").status_code == 200
+
+    [intent] = _snapshot(strangle, 25.0)
+    res = asyncio.run(_strategy_order(intent))
+    assert res["ok"] and res["position_id"] == pid
+    _fill(strangle, intent, res)
+    assert strangle.legs["CE"].state == "CLOSED" and strangle.state == DONE
+    assert _snapshot(strangle, 40.0) == []
+
+
+def test_exit_waits_for_the_path_that_owns_it(client, strangle):
+    from app import state
+    from app.book import book_close
+    from app.db import SessionLocal
+    from app.main import _strategy_order
+    from app.model import Position
+
+    pid = _open_position(client)
+    strangle.legs["CE"].position_id = pid
+    assert state.triggers.claim(pid)                 # a fired trigger owns the exit
+
+    def trigger_books_it():
+        with SessionLocal() as db:
+            book_close(db, db.get(Position, pid), 24.0)
+            db.commit()
+        state.triggers.forget([pid])
+    threading.Timer(0.3, trigger_books_it).start()
+
+    [intent] = _snapshot(strangle, 25.0)
+    res = asyncio.run(_strategy_order(intent))
+    assert res["ok"]
+    _fill(strangle, intent, res)
+    assert strangle.state == DONE and _snapshot(strangle, 40.0) == []
@@ -0,0 +1,139 @@
+# tests/test_trigger_store.py
+import pytest
+
+from app.book import book_close
+from app.model import Position
+from app.risk import trigger_store
+from app.risk.triggers import ABOVE, BELOW, TriggerEngine
+from app.trigger_model import TriggerRow
+
+
+@pytest.fixture
+def new_engine():
+    engines = []
+
+    def make():
+        engines.append(TriggerEngine(on_exit=lambda *a: None))
+        return engines[-1]
+    yield make
+    for e in engines:
+        e.shutdown()
+
+
+def _close(session_factory, position_id, price=50.0):
+    with session_factory() as db:
+        book_close(db, db.get(Position, position_id), price)
+        db.commit()
+
+
+def test_restore_rearms_under_original_ids(session_factory, open_position, new_engine):
+    ce = open_position("NFO:CE")
+    pe = open_position("NFO:PE")
+    before = new_engine()
+    armed = [
+        before.add(ce, "NFO:CE", "SL", ABOVE, 150),
+        before.add_trailing(pe, "NFO:PE", ABOVE, 20, anchor=100),
+        before.add_combined({ce: "NFO:CE", pe: "NFO:PE"}, ABOVE, 260),
+    ]
+    with session_factory() as db:
+        for t in armed:
+            trigger_store.save(db, t)
+        db.commit()
+
+    after = new_engine()
+    with session_factory() as db:
+        assert trigger_store.restore(db, after) == 3
+        db.commit()
+    assert sorted(after.list(), key=lambda t: t["id"]) == sorted(before.list(), key=lambda t: t["id"])
+    assert after.add(ce, "NFO:CE", "TARGET", BELOW, 10).id == 4
+    assert after.on_price("NFO:PE", 120) == 1      # trailing stop came back at 120
+
+
+def test_restore_drops_triggers_of_closed_positions(session_factory, open_position, new_engine):
+    ce = open_position("NFO:CE")
+    pe = open_position("NFO:PE")
+    before = new_engine()
+    with session_factory() as db:
+        trigger_store.save(db, before.add(ce, "NFO:CE", "SL", ABOVE, 150))
+        trigger_store.save(db, before.add(pe, "NFO:PE", "SL", ABOVE, 150))
+        trigger_store.save(db, before.add_combined({ce: "NFO:CE", pe: "NFO:PE"}, ABOVE, 260))
+        db.commit()
+    _close(session_factory, pe)
+
+    after = new_engine()
+    with session_factory() as db:
+        assert trigger_store.restore(db, after) == 1
+        db.commit()
+    with session_factory() as db:
+        assert [r.id for r in db.query(TriggerRow)] == [1]
+    assert [t["position_id"] for t in after.list()] == [ce]
+
+
+def test_prune_forgets_claims_of_closed_positions(session_factory, open_position, new_engine):
+    a = open_position("NFO:A")
+    b = open_position("NFO:B")
+    engine = new_engine()
+    with session_factory() as db:
+        trigger_store.save(db, engine.add(a, "NFO:A", "SL", ABOVE, 150))
+        trigger_store.save(db, engine.add(b, "NFO:B", "SL", ABOVE, 150))
+        db.commit()
+    assert engine.claim(a) and engine.claim(b)
+    _close(session_factory, a)
+
+    with session_factory() as db:
+        assert trigger_store.prune(db, engine) == 1
+        db.commit()
+    assert engine.claimed() == {b}                 # b's exit is still in flight
+    with session_factory() as db:
+        assert [r.position_ids for r in db.query(TriggerRow)] == [str(b)]
+
+
+def test_delete(session_factory, open_position, new_engine):
+    pid = open_position()
+    engine = new_engine()
+    with session_factory() as db:
+        t = engine.add(pid, "NFO:X", "SL", ABOVE, 150)
+        trigger_store.save(db, t)
+        db.commit()
+        trigger_store.delete(db, [t.id])
+        trigger_store.delete(db, [])
+        db.commit()
+        assert db.query(TriggerRow).count() == 0
+
+
+def test_trailing_stop_restarts_where_it_ratcheted_to(session_factory, open_position, new_engine):
+    pid = open_position("NFO:CE")
+    before = new_engine()
+    with session_factory() as db:
+        trigger_store.save(db, before.add_trailing(pid, "NFO:CE", ABOVE, 20, anchor=100))
+        db.commit()
+    for price in (95, 80, 90):                     # low of 80: stop ratchets from 120 to 100
+        before.on_price("NFO:CE", price)
+    with session_factory() as db:
+        assert trigger_store.save_anchors(db, before) == 1
+        db.commit()
+        assert trigger_store.save_anchors(db, before) == 0     # nothing moved since
+
+    after = new_engine()
+    with session_factory() as db:
+        assert trigger_store.restore(db, after) == 1
+        db.commit()
+    [t] = after.list()
+    assert (t["anchor"], t["level"]) == (80, 100)
+    assert after.on_price("NFO:CE", 100) == 1
+
+
+def test_save_anchors_skips_unsaved_and_removed_triggers(session_factory, open_position, new_engine):
+    a = open_position("NFO:A")
+    b = open_position("NFO:B")
+    engine = new_engine()
+    ta = engine.add_trailing(a, "NFO:A", BELOW, 5, anchor=50)     # armed, row not written yet
+    tb = engine.add_trailing(b, "NFO:B", BELOW, 5, anchor=50)
+    engine.on_price("NFO:A", 60)
+    engine.on_price("NFO:B", 60)
+    engine.remove(tb.id)
+    with session_factory() as db:
+        assert trigger_store.save_anchors(db, engine) == 1
+        db.commit()
+        assert db.query(TriggerRow).count() == 0
+    assert ta.anchor == 60
@@ -0,0 +1,211 @@
+# tests/test_triggers.py
+import asyncio
+import threading
+
+import pytest
+
+from app.risk.triggers import ABOVE, BELOW, TriggerEngine
+
+
+class Exits:
+    """on_exit recorder for the engine's worker pool."""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def __call__(self, position_id, trigger, price):
+        with self._lock:
+            self.calls.append((position_id, trigger.kind, price))
+        if self.fail:
+            raise RuntimeError("broker down")
+
+
+@pytest.fixture
+def exits():
+    return Exits()
+
+
+@pytest.fixture
+def engine(exits):
+    eng = TriggerEngine(on_exit=exits)
+    yield eng
+    eng.shutdown()
+
+
+def fired(engine, exits):
+    engine.shutdown()    # waits for the dispatched exits
+    return sorted(exits.calls)
+
+
+def test_above_fires_crossed_levels_only(engine, exits):
+    for pid in range(10):
+        engine.add(pid, "X", "SL", ABOVE, 100 + pid)
+    assert engine.on_price("X", 99.5) == 0
+    assert engine.on_price("X", 104.5) == 5
+    assert [c[0] for c in fired(engine, exits)] == [0, 1, 2, 3, 4]
+    assert engine.stats()["armed"] == 5
+
+
+def test_level_is_inclusive(engine, exits):
+    engine.add(1, "X", "SL", ABOVE, 100)
+    engine.add(2, "X", "SL", BELOW, 90)
+    assert engine.on_price("X", 100) == 1
+    assert engine.on_price("X", 90) == 1
+    assert fired(engine, exits) == [(1, "SL", 100.0), (2, "SL", 90.0)]
+
+
+def test_below_fires_on_fall(engine, exits):
+    engine.add(1, "X", "SL", BELOW, 95)
+    engine.add(2, "X", "SL", BELOW, 90)
+    engine.add(3, "Y", "SL", BELOW, 95)
+    assert engine.on_price("X", 93) == 1
+    assert fired(engine, exits) == [(1, "SL", 93.0)]
+
+
+def test_first_trigger_claims_the_position(engine, exits):
+    engine.add(1, "X", "SL", ABOVE, 110)
+    engine.add(1, "X", "TARGET", BELOW, 90)
+    engine.on_price("X", 120)
+    assert engine.on_price("X", 80) == 0           # target went with the claim
+    assert engine.claimed() == {1}
+    with pytest.raises(ValueError):
+        engine.add(1, "X", "SL", ABOVE, 130)
+    assert fired(engine, exits) == [(1, "SL", 120.0)]
+
+
+def test_manual_claim_blocks_trigger(engine, exits):
+    engine.add(1, "X", "SL", ABOVE, 110)
+    assert engine.claim(1)
+    assert not engine.claim(1)
+    assert engine.on_price("X", 120) == 0
+    assert fired(engine, exits) == []
+
+
+def test_trailing_stop_ratchets_down_for_short(engine, exits):
+    trig = engine.add_trailing(1, "X", ABOVE, 5, anchor=100)
+    assert trig.level == 105
+    engine.on_price("X", 98)
+    assert (trig.anchor, trig.level) == (98, 103)
+    engine.on_price("X", 101)                      # a rise never loosens it
+    assert (trig.anchor, trig.level) == (98, 103)
+    engine.on_price("X", 96)
+    assert trig.level == 101
+    assert engine.on_price("X", 101) == 1
+    assert fired(engine, exits) == [(1, "TRAIL", 101.0)]
+
+
+def test_trailing_stop_ratchets_up_for_long(engine, exits):
+    trig = engine.add_trailing(1, "X", BELOW, 5, anchor=100)
+    engine.on_price("X", 104)
+    assert trig.level == 99
+    engine.on_price("X", 102)
+    assert trig.level == 99
+    assert engine.on_price("X", 99) == 1
+    assert fired(engine, exits) == [(1, "TRAIL", 99.0)]
+
+
+def test_trailing_anchor_starts_from_last_price(engine):
+    engine.add(9, "X", "SL", ABOVE, 1000)          # indexes X
+    engine.on_price("X", 90)
+    trig = engine.add_trailing(1, "X", ABOVE, 5, anchor=100)
+    assert (trig.anchor, trig.level) == (90, 95)
+
+
+def test_trailing_stops_keep_index_sorted(engine, exits):
+    a = engine.add_trailing(1, "X", ABOVE, 5, anchor=100)
+    b = engine.add_trailing(2, "X", ABOVE, 10, anchor=100)
+    c = engine.add(3, "X", "SL", ABOVE, 104)
+    engine.on_price("X", 97)                       # a -> 102, b -> 107, c stays 104
+    assert (a.level, b.level, c.level) == (102, 107, 104)
+    assert engine.on_price("X", 103) == 1
+    assert engine.on_price("X", 105) == 1
+    assert engine.on_price("X", 107) == 1
+    assert [c[0] for c in fired(engine, exits)] == [1, 2, 3]
+
+
+def test_combined_premium_stop(engine, exits):
+    combo = engine.add_combined({1: "CE", 2: "PE"}, ABOVE, 200)
+    assert engine.on_price("CE", 150) == 0         # PE not seen yet
+    assert engine.on_price("PE", 40) == 0
+    assert combo.to_dict()["combined"] == 190
+    assert engine.on_price("PE", 55) == 2
+    assert fired(engine, exits) == [(1, "COMBINED", 55.0), (2, "COMBINED", 55.0)]
+
+
+def test_remove_and_clear_position(engine, exits):
+    t = engine.add(1, "X", "SL", ABOVE, 100)
+    engine.add(2, "X", "SL", ABOVE, 100)
+    engine.add(2, "X", "TARGET", BELOW, 50)
+    assert engine.remove(t.id)
+    assert not engine.remove(t.id)
+    engine.clear_position(2)
+    assert engine.stats()["armed"] == 0
+    assert engine.on_price("X", 200) == 0
+
+
+def test_failed_exit_releases_claim():
+    exits = Exits(fail=True)
+    engine = TriggerEngine(on_exit=exits)
+    engine.add(1, "X", "SL", ABOVE, 100)
+    engine.on_price("X", 100)
+    engine.shutdown()
+    s = engine.stats()
+    assert (s["fired"], s["failed"], s["claimed"]) == (0, 1, 0)
+    assert engine.claim(1)
+
+
+def test_forget_drops_claims(engine):
+    engine.add(1, "X", "SL", ABOVE, 100)
+    engine.add(2, "X", "SL", ABOVE, 100)
+    engine.on_price("X", 100)
+    assert engine.claimed() == {1, 2}
+    engine.forget([1, 2, 3])
+    assert engine.claimed() == set()
+
+
+def test_latency_recorded_when_order_placed(engine):
+    engine.add(1, "X", "SL", ABOVE, 100)
+    engine.on_price("X", 100)
+    engine.order_placed(2)                         # never fired: no sample
+    assert engine.stats()["trigger_to_order_ms"]["samples"] == 0
+    engine.order_placed(1)
+    engine.order_placed(1)                         # one sample per fire
+    lat = engine.stats()["trigger_to_order_ms"]
+    assert lat["samples"] == 1 and lat["p50"] >= 0
+
+
+def test_coroutine_exit_runs_on_loop():
+    async def main():
+        done = asyncio.Event()
+        seen = []
+
+        async def on_exit(position_id, trigger, price):
+            seen.append((position_id, price, asyncio.get_running_loop()))
+            done.set()
+
+        engine = TriggerEngine(on_exit=on_exit, loop=asyncio.get_running_loop())
+        engine.add(1, "X", "SL", ABOVE, 100)
+        # Ticks arrive from other threads too
+        await asyncio.to_thread(engine.on_price, "X", 101)
+        await asyncio.wait_for(done.wait(), 2)
+        await asyncio.sleep(0)
+        engine.shutdown()
+        return seen, engine.stats()
+
+    seen, stats = asyncio.run(main())
+    assert [(p, px) for p, px, _ in seen] == [(1, 101.0)]
+    assert stats["fired"] == 1
+
+
+def test_restore_id_keeps_ids_unique(engine):
+    engine.add(1, "X", "SL", ABOVE, 100, restore_id=7)
+    with pytest.raises(ValueError):
+        engine.add(2, "X", "SL", ABOVE, 100, restore_id=7)
+    assert engine.add(3, "X", "SL", ABOVE, 100).id == 8
+
+
+def test_combined_needs_two_legs(engine):
+    with pytest.raises(ValueError):
+        engine.add_combined({1: "CE"}, ABOVE, 100)
@@ -0,0 +1,155 @@
+# tests/test_volsurface.py
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.greeks import RATE, bs_price, year_fraction
+from app.pnl import IST
+from app.strategy.runner import synthetic_chain
+from app.volsurface import VolSurfaceService, fit_svi, surface_expiries, svi_w
+
+NOW = datetime(2025, 8, 11, 10, 30, tzinfo=IST)     # a Monday
+SPOT = 24500.0
+WEEKLY, MONTHLY = NOW.date() + timedelta(days=3), NOW.date() + timedelta(days=17)
+TRUE = {WEEKLY: np.array((0.0004, 0.012, -0.45, 0.004, 0.02)),
+        MONTHLY: np.array((0.0015, 0.030, -0.40, 0.010, 0.05))}
+
+
+def true_vol(expiry, strikes, params=None):
+    t = year_fraction(expiry, NOW)
+    fwd = SPOT * np.exp(RATE * t)
+    return np.sqrt(svi_w(np.log(np.asarray(strikes) / fwd), TRUE[expiry] if params is None else params) / t)
+
+
+def quotes(shift=0.0, noise=0.0, seed=3):
+    """Chain specs and prices from the TRUE smiles, `shift` added to a, relative `noise` on prices."""
+    rng = np.random.default_rng(seed)
+    specs, prices = [], {}
+    for exp, p in TRUE.items():
+        spec = synthetic_chain("NIFTY", SPOT, 30, today=NOW.date(), expiry=exp)
+        q = p + np.array((shift, 0, 0, 0, 0))
+        t = year_fraction(exp, NOW)
+        vol = true_vol(exp, spec.strikes, q)
+        for syms, is_call in ((spec.ce_symbols, True), (spec.pe_symbols, False)):
+            px = bs_price(SPOT, spec.strikes, t, vol, is_call) * (1 + rng.normal(0, noise, len(syms)) if noise else 1)
+            prices.update(zip(syms, px.tolist()))
+        specs.append(spec)
+    prices[specs[0].spot_symbol] = SPOT
+    return specs, prices
+
+
+@pytest.fixture
+def svc():
+    specs, prices = quotes()
+    s = VolSurfaceService(tol=0.002)
+    s.track("NIFTY", specs)
+    s.update(prices)
+    assert s.refit(NOW) == {"fitted": 2, "skipped": 0}
+    return s
+
+
+# ---------- SVI ----------
+def test_fit_recovers_known_smile():
+    k = np.linspace(-0.15, 0.1, 40)
+    p = TRUE[MONTHLY]
+    fitted, iters = fit_svi(k, svi_w(k, p))
+    assert np.max(np.abs(svi_w(k, fitted) - svi_w(k, p))) < 1e-7
+    assert iters <= 100
+
+
+def test_warm_start_converges_faster():
+    k = np.linspace(-0.15, 0.1, 40)
+    cold_p, cold = fit_svi(k, svi_w(k, TRUE[MONTHLY]))
+    moved = TRUE[MONTHLY] + np.array((0.0002, 0, 0, 0, 0))
+    warm_p, warm = fit_svi(k, svi_w(k, moved), p0=cold_p)
+    assert warm < cold
+    assert np.max(np.abs(svi_w(k, warm_p) - svi_w(k, moved))) < 1e-7
+
+
+def test_fit_stays_in_valid_region():
+    k = np.linspace(-0.2, 0.2, 15)
+    w = np.abs(np.random.default_rng(0).normal(0.002, 0.001, k.size))
+    a, b, rho, m, s = fit_svi(k, w)[0]
+    assert b >= 0 and abs(rho) < 1 and s > 0
+    assert a + b * s * np.sqrt(1 - rho * rho) >= -1e-12         # w >= 0 at its minimum
+
+
+# ---------- service ----------
+def test_fitted_surface_prices_true_vols(svc):
+    strikes = np.arange(23500, 25500, 100.0)
+    for exp in (WEEKLY, MONTHLY):
+        assert np.max(np.abs(svc.iv("NIFTY", strikes, exp) - true_vol(exp, strikes))) < 2e-3
+    assert svc.iv("NIFTY", 24500.0, MONTHLY) == pytest.approx(float(true_vol(MONTHLY, [24500.0])[0]), abs=2e-3)
+
+
+def test_unchanged_quotes_are_not_refitted(svc):
+    svc.update(quotes()[1])
+    assert svc.refit(NOW) == {"fitted": 0, "skipped": 0}
+
+
+def test_noise_inside_tolerance_skips_the_refit(svc):
+    before = svc.snapshot("NIFTY")["expiries"][MONTHLY.isoformat()]["smile"]
+    svc.update(quotes(noise=0.0005)[1])
+    assert svc.refit(NOW) == {"fitted": 0, "skipped": 2}
+    assert svc.snapshot("NIFTY")["expiries"][MONTHLY.isoformat()]["smile"] == before
+
+
+def test_vol_move_beyond_tolerance_refits(svc):
+    svc.update(quotes(shift=0.0003)[1])
+    assert svc.refit(NOW) == {"fitted": 2, "skipped": 0}
+    strikes = np.arange(23500, 25500, 100.0)
+    moved = TRUE[MONTHLY] + np.array((0.0003, 0, 0, 0, 0))
+    assert np.max(np.abs(svc.iv("NIFTY", strikes, MONTHLY) - true_vol(MONTHLY, strikes, moved))) < 2e-3
+    snap = svc.snapshot("NIFTY")["expiries"][MONTHLY.isoformat()]
+    assert (snap["fits"], snap["smile"]["iterations"] <= 20) == (2, True)     # warm-started
+
+
+def test_interpolates_total_variance_between_expiries(svc):
+    mid = WEEKLY + timedelta(days=7)
+    lo, hi = svc.iv("NIFTY", 24500.0, WEEKLY), svc.iv("NIFTY", 24500.0, MONTHLY)
+    assert min(lo, hi) <= svc.iv("NIFTY", 24500.0, mid) <= max(lo, hi)
+    assert svc.iv("NIFTY", 24500.0, MONTHLY + timedelta(days=30)) == pytest.approx(hi, rel=0.05)
+
+
+def test_too_few_quotes_do_not_fit():
+    specs, prices = quotes()
+    s = VolSurfaceService()
+    s.track("NIFTY", specs[:1])
+    s.update({sym: prices[sym] for sym in specs[0].ce_symbols[-3:]})
+    assert s.refit(NOW) == {"fitted": 0, "skipped": 1}
+    with pytest.raises(KeyError):
+        s.iv("NIFTY", 24500.0, WEEKLY)
+
+
+def test_surface_expiries_adds_the_monthly():
+    exps = [date(2025, 8, 12), date(2025, 8, 19), date(2025, 8, 26), date(2025, 9, 2), date(2025, 9, 30)]
+    assert surface_expiries(exps, 2) == [date(2025, 8, 12), date(2025, 8, 19), date(2025, 8, 26)]
+    assert surface_expiries(exps[:2], 1) == [date(2025, 8, 12)]
+
+
+def test_reads_during_a_refit_see_one_consistent_surface():
+    """A reader racing the refit that adds a second expiry gets either surface, never a mix of the two."""
+    specs, prices = quotes()
+    weekly = set(specs[0].ce_symbols) | set(specs[0].pe_symbols)
+    expected = true_vol(MONTHLY, [24500.0])[0]
+    for _ in range(20):
+        s = VolSurfaceService()
+        s.track("NIFTY", specs)
+        s.update({sym: px for sym, px in prices.items() if sym not in weekly})
+        s.refit(NOW)
+        assert s._underlyings["NIFTY"].surface[0] == (MONTHLY,)
+        s.update(prices)
+        done, seen = threading.Event(), []
+
+        def read():
+            while not done.is_set():
+                seen.append(s.iv("NIFTY", 24500.0, MONTHLY))
+        reader = threading.Thread(target=read)
+        reader.start()
+        s.refit(NOW)
+        done.set()
+        reader.join()
+        assert s._underlyings["NIFTY"].surface[0] == (WEEKLY, MONTHLY)
+        assert all(abs(v - expected) < 2e-3 for v in seen)
@@ -0,0 +1,613 @@
+# tools/fake_kite.py
+"""
+Local stand-in for the Kite Connect REST API and ticker websocket, for
+offline load and latency testing.
+
+    python -m tools.fake_kite --port 8765 --latency lognormal:15,0.5 --throttle-rate 0.01
+
+Then point the app at it with KITE_ROOT=http://127.0.0.1:8765; the ticker
+websocket is at ws://127.0.0.1:8765/ws (KiteTicker(..., root=...)).
+
+Prices follow a seeded GBM per underlying on a fixed time grid, so every
+worker process (and every run with the same seed) sees the same path.
+Option prices are Black-Scholes off that path with a simple skewed smile.
+Orders live in one SQLite file that all workers share (a temp file unless
+--orders-db is given), so any worker can answer for any order.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import calendar
+import io
+import itertools
+import json
+import math
+import os
+import random
+import sqlite3
+import struct
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# Kite segment codes carried in the low byte of instrument_token
+SEG_NSE, SEG_NFO, SEG_INDICES = 1, 2, 9
+
+# name -> (index tradingsymbol on NSE, spot, strike step, annual vol)
+INDICES = {
+    "NIFTY": ("NIFTY 50", 25000.0, 50, 0.13),
+    "BANKNIFTY": ("NIFTY BANK", 55000.0, 100, 0.16),
+    "FINNIFTY": ("NIFTY FIN SERVICE", 26000.0, 50, 0.15),
+    "MIDCPNIFTY": ("NIFTY MID SELECT", 13000.0, 25, 0.18),
+}
+WEEKLY_CODES = "123456789OND"
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+CSV_COLUMNS = [
+    "instrument_token", "exchange_token", "tradingsymbol", "name", "last_price", "expiry",
+    "strike", "tick_size", "lot_size", "instrument_type", "segment", "exchange",
+]
+
+
+# ---------- settings ----------
+@dataclass
+class Settings:
+    seed: int = 7
+    latency: str = "fixed:0"          # fixed:ms | uniform:lo,hi | normal:mean,std | lognormal:median,sigma
+    error_rate: float = 0.0           # fraction of REST calls answered with HTTP 500
+    throttle_rate: float = 0.0        # fraction of REST calls answered with HTTP 429
+    step_ms: int = 100                # price grid resolution
+    tick_ms: int = 250                # websocket tick interval
+    stocks: int = 180                 # synthetic stock underlyings with monthly options
+    weeklies: int = 4
+    monthlies: int = 3
+    strike_range: float = 0.30        # strikes listed within +/- this fraction of spot
+    expiry_weekday: int = 1           # 0=Mon ... 1=Tue (NSE index expiries)
+    orders_db: str = ""               # SQLite file shared by the workers ("" = in memory, one worker)
+    max_orders: int = 100000          # COMPLETE/CANCELLED orders older than the newest this many are evicted
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        s = cls()
+        for f in s.__dataclass_fields__:
+            raw = os.getenv(f"FAKE_KITE_{f.upper()}")
+            if raw is not None:
+                setattr(s, f, type(getattr(s, f))(raw))
+        return s
+
+    def to_env(self) -> None:
+        for f in self.__dataclass_fields__:
+            os.environ[f"FAKE_KITE_{f.upper()}"] = str(getattr(self, f))
+
+
+def make_latency(spec: str, rng: random.Random):
+    """Returns a zero-arg callable giving a latency sample in seconds."""
+    kind, _, args = spec.partition(":")
+    vals = [float(v) for v in args.split(",") if v] or [0.0]
+    if kind == "fixed":
+        return lambda: vals[0] / 1000.0
+    if kind == "uniform":
+        return lambda: rng.uniform(vals[0], vals[1]) / 1000.0
+    if kind == "normal":
+        return lambda: max(0.0, rng.gauss(vals[0], vals[1])) / 1000.0
+    if kind == "lognormal":
+        mu = math.log(max(vals[0], 1e-6))
+        return lambda: rng.lognormvariate(mu, vals[1]) / 1000.0
+    raise ValueError(f"unknown latency spec: {spec}")
+
+
+# ---------- pricing ----------
+def _ncdf(x: float) -> float:
+    return 0.5 * (1.0 + math.erf(x / math.sqrt(2.0)))
+
+
+def bs_price(spot: float, strike: float, t: float, vol: float, is_call: bool, r: float = 0.065) -> float:
+    if t <= 0 or vol <= 0:
+        return max(0.0, spot - strike) if is_call else max(0.0, strike - spot)
+    sq = vol * math.sqrt(t)
+    d1 = (math.log(spot / strike) + (r + 0.5 * vol * vol) * t) / sq
+    d2 = d1 - sq
+    if is_call:
+        return spot * _ncdf(d1) - strike * math.exp(-r * t) * _ncdf(d2)
+    return strike * math.exp(-r * t) * _ncdf(-d2) - spot * _ncdf(-d1)
+
+
+def smile_vol(base: float, spot: float, strike: float, t: float) -> float:
+    k = math.log(strike / spot) / max(math.sqrt(t), 0.05)
+    return max(0.03, base * (1.0 - 0.35 * k + 0.6 * k * k))
+
+
+class PricePath:
+    """
+    Seeded GBM on a fixed grid anchored at UTC midnight. Random access: the
+    Brownian path is built from per-block increments plus a Brownian bridge
+    inside the current block, so any timestamp costs O(BLOCK) at most. Block
+    increments are drawn lazily, CHUNK blocks at a time, so the path runs on
+    for as long as the server does.
+    """
+    BLOCK = 1024
+    CHUNK = 4096                              # blocks per lazily drawn chunk (~5 days at 100 ms steps)
+
+    def __init__(self, spot: float, vol: float, seed: int, step_ms: int, epoch: float):
+        self.spot = spot
+        self.seed = seed
+        self.step = step_ms / 1000.0
+        self.epoch = epoch
+        dt = self.step / (365 * 86400)
+        self._drift = -0.5 * vol * vol * dt
+        self._diff = vol * math.sqrt(dt)
+        self._wb = np.zeros(1)                # W at each block boundary drawn so far
+        self._frac = np.arange(self.BLOCK + 1) / self.BLOCK
+        self._block = -1
+        self._bridge = None
+
+    def _extend(self, b: int) -> None:
+        while len(self._wb) < b + 2:
+            chunk = (len(self._wb) - 1) // self.CHUNK
+            inc = np.random.default_rng([self.seed, 0, chunk]).standard_normal(self.CHUNK) * math.sqrt(self.BLOCK)
+            self._wb = np.concatenate((self._wb, self._wb[-1] + np.cumsum(inc)))
+
+    def _w(self, n: int) -> float:
+        b, r = divmod(max(n, 0), self.BLOCK)
+        if b != self._block:
+            self._extend(b)
+            z = np.random.default_rng([self.seed, b + 1]).standard_normal(self.BLOCK)
+            walk = np.concatenate(([0.0], np.cumsum(z)))
+            self._bridge = self._wb[b] + walk + self._frac * (self._wb[b + 1] - self._wb[b] - walk[-1])
+            self._block = b
+        return float(self._bridge[r])
+
+    def at(self, ts: float) -> float:
+        n = int((ts - self.epoch) / self.step)
+        return self.spot * math.exp(self._drift * n + self._diff * self._w(n))
+
+
+@dataclass
+class Instrument:
+    token: int
+    exchange_token: int
+    tradingsymbol: str
+    name: str
+    exchange: str
+    segment: str
+    instrument_type: str
+    expiry: Optional[date] = None
+    strike: float = 0.0
+    lot_size: int = 1
+    tick_size: float = 0.05
+
+    @property
+    def key(self) -> str:
+        return f"{self.exchange}:{self.tradingsymbol}"
+
+
+def _expiry_dates(today: date, weekday: int, weeklies: int, monthlies: int) -> Tuple[List[date], List[date]]:
+    weekly, d = [], today + timedelta(days=(weekday - today.weekday()) % 7)
+    while len(weekly) < weeklies:
+        weekly.append(d)
+        d += timedelta(days=7)
+    monthly, y, m = [], today.year, today.month
+    while len(monthly) < monthlies:
+        last = date(y, m, calendar.monthrange(y, m)[1])
+        exp = last - timedelta(days=(last.weekday() - weekday) % 7)
+        if exp >= today:
+            monthly.append(exp)
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return weekly, monthly
+
+
+def option_symbol(name: str, expiry: date, monthly: bool, strike: float, kind: str) -> str:
+    strike_s = f"{strike:g}"
+    if monthly:
+        return f"{name}{expiry:%y}{MONTHS[expiry.month - 1]}{strike_s}{kind}"
+    return f"{name}{expiry:%y}{WEEKLY_CODES[expiry.month - 1]}{expiry:%d}{strike_s}{kind}"
+
+
+# ---------- market ----------
+class Market:
+    def __init__(self, settings: Settings):
+        self.s = settings
+        now = time.time()
+        self.epoch = now - (now % 86400)
+        self.today = datetime.now(IST).date()
+        self.instruments: List[Instrument] = []
+        self.by_key: Dict[str, Instrument] = {}
+        self.by_token: Dict[int, Instrument] = {}
+        self.paths: Dict[str, PricePath] = {}
+        self.base_vol: Dict[str, float] = {}
+        self.spot_name: Dict[str, str] = {}  # NSE key of the underlying -> name
+        self._build()
+        self._csv: Dict[str, bytes] = {}
+
+    def _add(self, inst: Instrument) -> None:
+        self.instruments.append(inst)
+        self.by_key[inst.key] = inst
+        self.by_token[inst.token] = inst
+
+    def _build(self) -> None:
+        s, rng = self.s, random.Random(self.s.seed)
+        exch_tok = itertools.count(1001)
+        underlyings = [(n, sym, spot, step, vol, SEG_INDICES, 75) for n, (sym, spot, step, vol) in INDICES.items()]
+        for i in range(s.stocks):
+            spot = round(rng.uniform(100, 5000), 1)
+            step = 5 if spot < 500 else 10 if spot < 1500 else 20 if spot < 3000 else 50
+            underlyings.append((f"SYN{i + 1:03d}", f"SYN{i + 1:03d}", spot, step, rng.uniform(0.2, 0.45),
+                                SEG_NSE, int(rng.choice([250, 500, 700, 1000, 1250]))))
+
+        weekly, monthly = _expiry_dates(self.today, s.expiry_weekday, s.weeklies, s.monthlies)
+        for u, (name, sym, spot, step, vol, seg, lot) in enumerate(underlyings):
+            et = next(exch_tok)
+            segment = "INDICES" if seg == SEG_INDICES else "NSE"
+            self._add(Instrument((et << 8) | seg, et, sym, name if seg != SEG_INDICES else sym, "NSE",
+                                 segment, "EQ", lot_size=1))
+            self.paths[name] = PricePath(spot, vol, s.seed * 1_000_003 + u, s.step_ms, self.epoch)
+            self.base_vol[name] = vol
+            self.spot_name[f"NSE:{sym}"] = name
+
+            expiries = {d: d in monthly for d in (weekly if seg == SEG_INDICES else [])}
+            expiries.update((d, True) for d in monthly)
+            lo = math.ceil(spot * (1 - s.strike_range) / step) * step
+            hi = math.floor(spot * (1 + s.strike_range) / step) * step
+            strikes = [float(k) for k in range(int(lo), int(hi) + 1, step)]
+            for exp, is_monthly in sorted(expiries.items()):
+                for k in strikes:
+                    for kind in ("CE", "PE"):
+                        et = next(exch_tok)
+                        self._add(Instrument((et << 8) | SEG_NFO, et, option_symbol(name, exp, is_monthly, k, kind),
+                                             name, "NFO", "NFO-OPT", kind, expiry=exp, strike=k, lot_size=lot))
+
+    # ---------- prices ----------
+    def spot(self, name: str, ts: Optional[float] = None) -> float:
+        return self.paths[name].at(ts or time.time())
+
+    def price(self, inst: Instrument, ts: Optional[float] = None) -> float:
+        ts = ts or time.time()
+        if inst.segment != "NFO-OPT":
+            return round(self.spot(self.spot_name[inst.key], ts), 2)
+        spot = self.spot(inst.name, ts)
+        expiry_ts = datetime.combine(inst.expiry, datetime.min.time(), IST).timestamp() + 15.5 * 3600
+        t = max(expiry_ts - ts, 0.0) / (365 * 86400)
+        vol = smile_vol(self.base_vol[inst.name], spot, inst.strike, t)
+        px = bs_price(spot, inst.strike, t, vol, inst.instrument_type == "CE")
+        return max(0.05, round(round(px / inst.tick_size) * inst.tick_size, 2))
+
+    # ---------- instrument dump ----------
+    def csv(self, exchange: Optional[str] = None) -> bytes:
+        key = exchange or "*"
+        if key not in self._csv:
+            buf = io.StringIO()
+            buf.write(",".join(CSV_COLUMNS) + "\n")
+            for i in self.instruments:
+                if exchange and i.exchange != exchange:
+                    continue
+                buf.write(
+                    f"{i.token},{i.exchange_token},{i.tradingsymbol},{i.name},0,"
+                    f"{i.expiry.isoformat() if i.expiry else ''},{i.strike:g},{i.tick_size},{i.lot_size},"
+                    f"{i.instrument_type},{i.segment},{i.exchange}\n"
+                )
+            self._csv[key] = buf.getvalue().encode()
+        return self._csv[key]
+
+
+# ---------- orders ----------
+class OrderStore:
+    """Order book shared across worker processes. Finished orders beyond `cap` recent ones are evicted."""
+
+    def __init__(self, path: str, cap: int):
+        self.cap = cap
+        self.db = sqlite3.connect(path or ":memory:", timeout=10, isolation_level=None, check_same_thread=False)
+        if path:
+            self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=OFF")
+        self.db.execute("CREATE TABLE IF NOT EXISTS orders (seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                        " order_id TEXT UNIQUE NOT NULL, status TEXT NOT NULL, data TEXT NOT NULL)")
+
+    def add(self, order: dict) -> None:
+        seq = self.db.execute("INSERT INTO orders (order_id, status, data) VALUES (?, ?, ?)",
+                              (order["order_id"], order["status"], json.dumps(order))).lastrowid
+        if seq > self.cap:
+            self.db.execute("DELETE FROM orders WHERE seq <= ? AND status IN ('COMPLETE', 'CANCELLED')",
+                            (seq - self.cap,))
+
+    def get(self, order_id: str) -> Optional[dict]:
+        row = self.db.execute("SELECT status, data FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+        return self._order(row) if row else None
+
+    def cancel(self, order_id: str) -> Optional[str]:
+        """Cancels an OPEN order; returns the status it was found in (None if unknown)."""
+        cur = self.db.execute("UPDATE orders SET status = 'CANCELLED' WHERE order_id = ? AND status = 'OPEN'",
+                              (order_id,))
+        if cur.rowcount:
+            return "OPEN"
+        row = self.db.execute("SELECT status FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+        return row[0] if row else None
+
+    def all(self) -> List[dict]:
+        return [self._order(r) for r in self.db.execute("SELECT status, data FROM orders ORDER BY seq")]
+
+    def count(self) -> int:
+        return self.db.execute("SELECT count(*) FROM orders").fetchone()[0]
+
+    @staticmethod
+    def _order(row) -> dict:
+        order = json.loads(row[1])
+        order["status"] = row[0]
+        return order
+
+
+# ---------- app ----------
+class FaultInjection:
+    """
+    Latency / 429 / 500 injection for REST calls. Plain ASGI: BaseHTTPMiddleware
+    costs more per request than the handlers themselves.
+    """
+
+    def __init__(self, app, settings: Settings, latency, rng: random.Random, stats: dict):
+        self.app = app
+        self.settings = settings
+        self.latency = latency
+        self.rng = rng
+        self.stats = stats
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/_fake"):
+            return await self.app(scope, receive, send)
+        self.stats["requests"] += 1
+        delay = self.latency()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        roll = self.rng.random()
+        if roll < self.settings.throttle_rate:
+            self.stats["throttled"] += 1
+            return await _err(429, "Too many requests", "NetworkException")(scope, receive, send)
+        if roll < self.settings.throttle_rate + self.settings.error_rate:
+            self.stats["errors"] += 1
+            return await _err(500, "Something went wrong (injected)", "GeneralException")(scope, receive, send)
+        return await self.app(scope, receive, send)
+
+
+def _ok(data) -> JSONResponse:
+    return JSONResponse({"status": "success", "data": data})
+
+
+def _err(status: int, message: str, error_type: str) -> JSONResponse:
+    return JSONResponse({"status": "error", "message": message, "error_type": error_type, "data": None},
+                        status_code=status)
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    settings = settings or Settings.from_env()
+    market = Market(settings)
+    rng = random.Random(settings.seed ^ os.getpid())
+    latency = make_latency(settings.latency, rng)
+    orders = OrderStore(settings.orders_db, settings.max_orders)
+    order_ids = itertools.count(1)
+    stats = {"requests": 0, "errors": 0, "throttled": 0, "started": time.time()}
+
+    app = FastAPI(title="Fake Kite Connect")
+    app.state.market = market
+
+    app.add_middleware(FaultInjection, settings=settings, latency=latency, rng=rng, stats=stats)
+
+    def _lookup(keys: List[str]) -> Dict[str, Instrument]:
+        return {k: market.by_key[k] for k in keys if k in market.by_key}
+
+    # ---------- session / user ----------
+    @app.post("/session/token")
+    async def session_token(request: Request):
+        form = await request.form()
+        rt = form.get("request_token") or "token"
+        return _ok({
+            "user_id": "FK0001",
+            "user_name": "Fake Kite",
+            "access_token": f"fake-{rt}",
+            "refresh_token": "",
+            "public_token": "fake-public",
+            "login_time": datetime.now(IST).strftime("%Y-%m-%d %H:%M:%S"),
+            "exchanges": ["NSE", "NFO"],
+            "products": ["CNC", "NRML", "MIS"],
+            "order_types": ["MARKET", "LIMIT", "SL", "SL-M"],
+        })
+
+    @app.get("/user/profile")
+    async def profile():
+        return _ok({"user_id": "FK0001", "user_name": "Fake Kite", "exchanges": ["NSE", "NFO"]})
+
+    # ---------- market data ----------
+    @app.get("/quote/ltp")
+    async def quote_ltp(request: Request):
+        now = time.time()
+        found = _lookup(request.query_params.getlist("i"))
+        return _ok({k: {"instrument_token": i.token, "last_price": market.price(i, now)} for k, i in found.items()})
+
+    @app.get("/quote/ohlc")
+    async def quote_ohlc(request: Request):
+        now = time.time()
+        out = {}
+        for k, i in _lookup(request.query_params.getlist("i")).items():
+            px = market.price(i, now)
+            out[k] = {"instrument_token": i.token, "last_price": px,
+                      "ohlc": {"open": px, "high": px, "low": px, "close": px}}
+        return _ok(out)
+
+    @app.get("/quote")
+    async def quote(request: Request):
+        now = time.time()
+        ts = datetime.now(IST).strftime("%Y-%m-%d %H:%M:%S")
+        out = {}
+        for k, i in _lookup(request.query_params.getlist("i")).items():
+            px = market.price(i, now)
+            tick = i.tick_size
+            out[k] = {
+                "instrument_token": i.token,
+                "timestamp": ts,
+                "last_trade_time": ts,
+                "last_price": px,
+                "last_quantity": i.lot_size,
+                "volume": 0,
+                "average_price": px,
+                "buy_quantity": 0,
+                "sell_quantity": 0,
+                "oi": 0,
+                "net_change": 0.0,
+                "ohlc": {"open": px, "high": px, "low": px, "close": px},
+                "depth": {
+                    "buy": [{"price": round(max(px - (n + 1) * tick, 0.05), 2), "quantity": i.lot_size, "orders": 1}
+                            for n in range(5)],
+                    "sell": [{"price": round(px + (n + 1) * tick, 2), "quantity": i.lot_size, "orders": 1}
+                             for n in range(5)],
+                },
+            }
+        return _ok(out)
+
+    @app.get("/instruments")
+    async def instruments_all():
+        return Response(market.csv(), media_type="text/csv")
+
+    @app.get("/instruments/{exchange}")
+    async def instruments(exchange: str):
+        return Response(market.csv(exchange.upper()), media_type="text/csv")
+
+    # ---------- orders ----------
+    @app.post("/orders/{variety}")
+    async def place_order(variety: str, request: Request):
+        form = await request.form()
+        key = f"{form.get('exchange')}:{form.get('tradingsymbol')}"
+        inst = market.by_key.get(key)
+        if inst is None:
+            return _err(400, f"Invalid `tradingsymbol` {key}", "InputException")
+        order_type = (form.get("order_type") or "MARKET").upper()
+        ltp = market.price(inst)
+        price = float(form.get("price") or 0)
+        side = (form.get("transaction_type") or "").upper()
+        marketable = order_type == "MARKET" or (side == "BUY" and price >= ltp) or (side == "SELL" and price <= ltp)
+        order_id = f"{os.getpid()}{next(order_ids):09d}"
+        orders.add({
+            "order_id": order_id,
+            "variety": variety,
+            "exchange": inst.exchange,
+            "tradingsymbol": inst.tradingsymbol,
+            "instrument_token": inst.token,
+            "transaction_type": side,
+            "quantity": int(form.get("quantity") or 0),
+            "product": form.get("product"),
+            "order_type": order_type,
+            "price": price,
+            "status": "COMPLETE" if marketable else "OPEN",
+            "average_price": ltp if marketable else 0.0,
+            "order_timestamp": datetime.now(IST).strftime("%Y-%m-%d %H:%M:%S"),
+        })
+        return _ok({"order_id": order_id})
+
+    @app.delete("/orders/{variety}/{order_id}")
+    async def cancel_order(variety: str, order_id: str):
+        status = orders.cancel(order_id)
+        if status is None:
+            return _err(400, "Invalid order_id", "InputException")
+        if status != "OPEN":
+            return _err(400, f"Order cannot be cancelled as it is {status}", "InputException")
+        return _ok({"order_id": order_id})
+
+    @app.get("/orders")
+    async def list_orders():
+        return _ok(orders.all())
+
+    @app.get("/orders/{order_id}")
+    async def order_history(order_id: str):
+        o = orders.get(order_id)
+        if o is None:
+            return _err(400, "Invalid order_id", "InputException")
+        return _ok([o])
+
+    # ---------- ticker ----------
+    @app.websocket("/ws")
+    async def ticker(ws: WebSocket):
+        await ws.accept()
+        modes: Dict[int, str] = {}
+
+        async def reader():
+            while True:
+                msg = json.loads(await ws.receive_text())
+                action, value = msg.get("a"), msg.get("v")
+                if action == "subscribe":
+                    for t in value:
+                        modes.setdefault(int(t), "quote")
+                elif action == "unsubscribe":
+                    for t in value:
+                        modes.pop(int(t), None)
+                elif action == "mode":
+                    mode, tokens = value
+                    for t in tokens:
+                        modes[int(t)] = "ltp" if mode == "ltp" else "quote"
+
+        task = asyncio.create_task(reader())
+        try:
+            while not task.done():
+                await asyncio.sleep(settings.tick_ms / 1000.0)
+                if not modes:
+                    await ws.send_bytes(b"\x00")  # heartbeat
+                    continue
+                now = time.time()
+                packets = []
+                for token, mode in list(modes.items()):
+                    inst = market.by_token.get(token)
+                    if inst is None:
+                        continue
+                    packets.append(_packet(inst, market.price(inst, now), mode))
+                body = struct.pack(">H", len(packets)) + b"".join(struct.pack(">H", len(p)) + p for p in packets)
+                await ws.send_bytes(body)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            task.cancel()
+
+    @app.get("/_fake/stats")
+    async def fake_stats():
+        up = time.time() - stats["started"]
+        return {**stats, "uptime_s": round(up, 1), "rps": round(stats["requests"] / up, 1) if up else None,
+                "instruments": len(market.instruments), "orders": orders.count()}
+
+    return app
+
+
+def _packet(inst: Instrument, price: float, mode: str) -> bytes:
+    """Kite binary tick: ltp = 8 bytes, quote = 44 bytes (28 for indices). Prices in paise."""
+    p = int(round(price * 100))
+    if mode == "ltp":
+        return struct.pack(">ii", inst.token, p)
+    if inst.segment == "INDICES":
+        return struct.pack(">7i", inst.token, p, p, p, p, p, 0)
+    return struct.pack(">11i", inst.token, p, inst.lot_size, p, 0, 0, 0, p, p, p, p)
+
+
+def main() -> None:
+    d = Settings()
+    ap = argparse.ArgumentParser(description="Fake Kite Connect server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=1)
+    for name, f in d.__dataclass_fields__.items():
+        ap.add_argument(f"--{name.replace('_', '-')}", type=type(getattr(d, name)), default=getattr(d, name))
+    args = ap.parse_args()
+    if args.workers > 1 and not args.orders_db:
+        # Each worker is its own process: orders must be visible to all of them
+        args.orders_db = os.path.join(tempfile.mkdtemp(prefix="fake_kite_"), "orders.db")
+
+    import uvicorn
+
+    Settings(**{k: getattr(args, k) for k in d.__dataclass_fields__}).to_env()
+    uvicorn.run("tools.fake_kite:create_app", factory=True, host=args.host, port=args.port,
+                workers=args.workers, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()